@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Atlas de sprites em disco, abertos com memory-mapping (np.load(mmap_mode='r')).
+Usado pelo criar_video_album.py para não refazer a FASE 1 (decodificar, achar o
+rosto, recortar, redimensionar e aplicar a máscara) quando nada mudou.
+
+Há dois níveis:
+
+- AtlasFotos: uma linha (altura, largura, 3) por FOTO, identificada pelo hash
+  do conteúdo do arquivo. Um índice por tamanho de célula e política de
+  corte, com as fotos em lotes que só são acrescentados (fotos novas na pasta
+  não reescrevem as antigas). Serve para qualquer grid/semente que use essas fotos.
+- Atlas da grade: um único array contíguo (2, N, altura, largura, 3) com as
+  versões original [0] e com máscara [1] de cada CÉLULA de um vídeo. A chave
+  combina os hashes das fotos de cada célula, o tamanho da célula, a política
+  de corte e a máscara. Com ele a re-renderização começa a escrever frames
+  quase imediatamente, e os processos de renderização compartilham as mesmas
+  páginas do arquivo (sem copiar as fotos).
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+
+# Versão do formato dos atlas (mudou = atlas antigos são ignorados)
+# v2: máscara misturada em uint8 (cv2.addWeighted) em vez de float
+# v3: fotos guardadas em BGR (a ordem de canais do codificador)
+VERSAO_FORMATO_ATLAS = 3
+
+# Lotes de um AtlasFotos: acima disso, os lotes são juntados num arquivo só
+MAXIMO_LOTES_ATLAS = 16
+
+# Atlas de grade guardados: cada sorteio sem --seed gera uma grade nova, então
+# só os usados mais recentemente ficam (os demais são apagados ao salvar um novo)
+ATLAS_GRADE_MANTIDOS = 8
+
+
+def _gravar_atomico(caminho, array):
+    """Grava um .npy via arquivo temporário + rename (nunca deixa um atlas pela metade)"""
+    temporario = caminho + '.tmp.npy'
+    destino = np.lib.format.open_memmap(temporario, mode='w+', dtype=np.uint8, shape=array.shape)
+    destino[...] = array
+    destino.flush()
+    del destino
+    os.replace(temporario, caminho)
+
+
+class AtlasFotos:
+    """
+    Fotos preparadas (já no tamanho da célula) indexadas pelo hash do conteúdo.
+
+    As fotos ficam em lotes <pasta>/fotos_<largura>x<altura>_<politica>_<n>.npy
+    e o índice (hash -> lote e linha) num .json com o mesmo prefixo. Fotos
+    novas vão para um lote novo, sem reescrever os existentes; com mais de
+    MAXIMO_LOTES_ATLAS lotes, eles são juntados num só (uma vez a cada tantos
+    acréscimos, não a cada foto nova).
+    """
+
+    def __init__(self, pasta, largura_foto, altura_foto, politica_corte):
+        """
+        Args:
+            pasta: Pasta dos atlas (criada se não existir)
+            largura_foto, altura_foto: Tamanho da célula
+            politica_corte: Texto que identifica como as fotos foram recortadas
+                            (detector, margem de decodificação, filtro...)
+        """
+        self.pasta = pasta
+        self.forma_foto = (altura_foto, largura_foto, 3)
+        assinatura = f"v{VERSAO_FORMATO_ATLAS}|{politica_corte}"
+        sufixo = hashlib.sha1(assinatura.encode('utf-8')).hexdigest()[:12]
+        self._prefixo = f"fotos_{largura_foto}x{altura_foto}_{sufixo}"
+        self.caminho_indice = os.path.join(pasta, self._prefixo + '.json')
+        self._linhas = {}  # hash -> (lote, linha)
+        self._nomes_lotes = []  # Arquivo .npy de cada lote
+        self._lotes = []  # Lotes abertos memory-mapped
+        self._proximo_lote = 0  # Número do próximo arquivo de lote
+        self._carregar()
+
+    def _carregar(self):
+        if not os.path.exists(self.caminho_indice):
+            return
+        try:
+            with open(self.caminho_indice, 'r', encoding='utf-8') as arquivo:
+                indice = json.load(arquivo)
+            if 'lotes' not in indice:
+                # Formato antigo: hash -> linha de um único <prefixo>.npy
+                indice = {'lotes': [self._prefixo + '.npy'], 'proximo_lote': 0,
+                          'linhas': {hash_foto: [0, linha] for hash_foto, linha in indice.items()}}
+            lotes = [np.load(os.path.join(self.pasta, nome), mmap_mode='r') for nome in indice['lotes']]
+            linhas = {hash_foto: (int(lote), int(linha)) for hash_foto, (lote, linha) in indice['linhas'].items()}
+            proximo_lote = int(indice['proximo_lote'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return  # Atlas corrompido: é refeito
+        if any(lote.shape[1:] != self.forma_foto for lote in lotes) or \
+                any(lote >= len(lotes) or linha >= lotes[lote].shape[0] for lote, linha in linhas.values()):
+            return
+        self._linhas = linhas
+        self._nomes_lotes = list(indice['lotes'])
+        self._lotes = lotes
+        self._proximo_lote = proximo_lote
+
+    def __contains__(self, hash_foto):
+        return hash_foto in self._linhas
+
+    def __len__(self):
+        return len(self._linhas)
+
+    def obter(self, hashes):
+        """Retorna as fotos (len(hashes), altura, largura, 3) - todos os hashes devem existir"""
+        posicoes = [self._linhas[hash_foto] for hash_foto in hashes]
+        fotos = np.empty((len(posicoes),) + self.forma_foto, dtype=np.uint8)
+        for numero, lote in enumerate(self._lotes):
+            destinos = [i for i, (lote_foto, _) in enumerate(posicoes) if lote_foto == numero]
+            if destinos:
+                fotos[destinos] = lote[[posicoes[i][1] for i in destinos]]
+        return fotos
+
+    def adicionar(self, hashes, fotos):
+        """Grava as fotos novas (hashes ainda não presentes) num lote novo e atualiza o índice"""
+        novos = {}
+        for hash_foto, foto in zip(hashes, fotos):
+            if hash_foto not in self._linhas:
+                novos.setdefault(hash_foto, foto)
+        if not novos:
+            return
+        os.makedirs(self.pasta, exist_ok=True)
+        numero = len(self._lotes)
+        self._lotes.append(self._gravar_lote(np.stack(list(novos.values()))))
+        for linha, hash_foto in enumerate(novos):
+            self._linhas[hash_foto] = (numero, linha)
+        antigos = self._compactar() if len(self._lotes) > MAXIMO_LOTES_ATLAS else []
+        self._salvar_indice()
+        # Só depois que o índice não aponta mais para eles
+        for nome in antigos:
+            try:
+                os.remove(os.path.join(self.pasta, nome))
+            except OSError:
+                pass
+
+    def _gravar_lote(self, fotos):
+        """Grava um arquivo de lote novo e o retorna aberto memory-mapped"""
+        nome = f"{self._prefixo}_{self._proximo_lote:04d}.npy"
+        self._proximo_lote += 1
+        caminho = os.path.join(self.pasta, nome)
+        _gravar_atomico(caminho, fotos)
+        self._nomes_lotes.append(nome)
+        return np.load(caminho, mmap_mode='r')
+
+    def _compactar(self):
+        """Junta todos os lotes num só. Retorna os arquivos antigos (a apagar)"""
+        ordem = list(self._linhas)
+        combinado = self.obter(ordem)
+        antigos = self._nomes_lotes
+        self._nomes_lotes, self._lotes = [], []  # Libera os mapeamentos antigos (Windows)
+        self._lotes = [self._gravar_lote(combinado)]
+        self._linhas = {hash_foto: (0, linha) for linha, hash_foto in enumerate(ordem)}
+        return antigos
+
+    def _salvar_indice(self):
+        temporario = self.caminho_indice + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump({'lotes': self._nomes_lotes, 'proximo_lote': self._proximo_lote,
+                       'linhas': {hash_foto: list(posicao) for hash_foto, posicao in self._linhas.items()}},
+                      arquivo)
+        os.replace(temporario, self.caminho_indice)
+
+
+def chave_atlas_grade(hashes_celulas, largura_foto, altura_foto, politica_corte, hash_mascara,
+                      transparencia_mascara, largura_video, altura_video):
+    """Chave (hash) do atlas de um grid: muda se qualquer foto, a célula, o corte ou a máscara mudar"""
+    descricao = json.dumps([
+        VERSAO_FORMATO_ATLAS, largura_foto, altura_foto, politica_corte,
+        hash_mascara, transparencia_mascara, largura_video, altura_video, list(hashes_celulas),
+    ])
+    return hashlib.sha1(descricao.encode('utf-8')).hexdigest()
+
+
+def caminho_atlas_grade(pasta, chave):
+    return os.path.join(pasta, f"grade_{chave}.npy")
+
+
+def abrir_atlas_grade(pasta, chave):
+    """Abre (memory-mapped, só leitura) o atlas (2, N, altura, largura, 3) do grid, ou None"""
+    caminho = caminho_atlas_grade(pasta, chave)
+    if not os.path.exists(caminho):
+        return None
+    try:
+        atlas = np.load(caminho, mmap_mode='r')
+        os.utime(caminho)  # Marca como usado agora (a limpeza mantém os mais recentes)
+        return atlas
+    except (OSError, ValueError):
+        return None
+
+
+def limpar_atlas_grade(pasta, manter=ATLAS_GRADE_MANTIDOS, preservar=None):
+    """Apaga os atlas de grade mais antigos (pela data de modificação/uso),
+    deixando os `manter` mais recentes. Retorna quantos foram apagados."""
+    try:
+        grades = [entrada for entrada in os.scandir(pasta)
+                  if entrada.name.startswith('grade_') and entrada.name.endswith('.npy') and entrada.is_file()]
+    except OSError:
+        return 0
+    grades.sort(key=lambda entrada: entrada.stat().st_mtime_ns, reverse=True)
+    apagados = 0
+    for entrada in grades[max(0, manter):]:
+        if entrada.path == preservar:
+            continue
+        try:
+            os.remove(entrada.path)
+            apagados += 1
+        except OSError:
+            pass  # Em uso por outro processo (Windows): fica para a próxima limpeza
+    return apagados
+
+
+def salvar_atlas_grade(pasta, chave, fotos_originais, fotos_com_mascara, manter=ATLAS_GRADE_MANTIDOS):
+    """Grava as duas versões de todas as células em um único array contíguo e o
+    reabre memory-mapped (os processos de renderização passam a ler do arquivo).
+    Depois apaga os atlas de grade antigos, deixando os `manter` mais recentes."""
+    os.makedirs(pasta, exist_ok=True)
+    caminho = caminho_atlas_grade(pasta, chave)
+    _gravar_atomico(caminho, np.stack([fotos_originais, fotos_com_mascara]))
+    limpar_atlas_grade(pasta, manter, preservar=caminho)
+    return np.load(caminho, mmap_mode='r')
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do criar_video_album.py com um acervo sintético de fotos.
+
+Gera (uma vez, reproduzível pela semente) uma pasta de fotos falsas - com
+quantidade, megapixels e formatos configuráveis, parte delas com um "rosto"
+desenhado - e mede SEPARADAMENTE as 3 fases do criar_video_album:
+
+- FASE 1 (preparação): decodificar, achar o rosto, recortar, redimensionar e
+  aplicar a máscara em todas as células + montar o grid final
+- FASE 2 (planejamento): sortear ondas, direções, tamanhos e trajetórias
+- FASE 3 (geração): renderizar os frames e codificar o vídeo
+
+para cada resolução de VIDEOS_PARA_GERAR e cada tamanho de célula (56px até
+28px = grids cada vez mais densos). Cada caso roda num processo novo, com
+caches vazios, para que o pico de memória (RSS) e os caches de um caso não
+contaminem o seguinte. O resultado vai para um JSON que serve de base de
+comparação para as próximas execuções (--comparar).
+
+Uso:
+    python benchmark_mosaico.py --saida benchmark_base.json
+    python benchmark_mosaico.py --comparar benchmark_base.json --saida benchmark_novo.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from metricas import pico_rss_mb
+
+
+# Versão do formato do JSON de resultados
+VERSAO_FORMATO_BENCHMARK = 1
+
+# Acervo sintético (padrões da linha de comando)
+PASTA_ACERVO = os.path.join(".cache_mosaico", "benchmark", "acervo")
+QUANTIDADE_FOTOS = 120
+MEGAPIXELS_FOTOS = 2.0
+FORMATOS_FOTOS = ('jpg', 'png', 'webp')
+FRACAO_COM_ROSTO = 0.5
+SEMENTE_ACERVO = 1234
+
+# Casos medidos
+TAMANHOS_CELULA = (56, 42, 28)  # Do grid padrão (56px) até o dobro de densidade por lado (28px)
+MAX_FRAMES = 150  # Frames renderizados na FASE 3 (0 = o vídeo inteiro)
+
+EXTENSOES_PIL = {'jpg': 'JPEG', 'png': 'PNG', 'webp': 'WEBP', 'bmp': 'BMP'}
+
+
+def _desenhar_rosto(imagem, rng):
+    """Desenha um "rosto" simples (oval cor de pele, olhos, sobrancelhas e boca)"""
+    altura, largura = imagem.shape[:2]
+    lado = int(min(largura, altura) * rng.uniform(0.2, 0.4))
+    centro_x = int(rng.uniform(lado, largura - lado))
+    centro_y = int(rng.uniform(lado, altura - lado))
+    pele = tuple(int(c) for c in rng.integers(150, 230, 3))
+    escuro = (40, 30, 30)
+    cv2.ellipse(imagem, (centro_x, centro_y), (int(lado * 0.40), int(lado * 0.52)), 0, 0, 360, pele, -1)
+    for lado_olho in (-1, 1):
+        olho = (centro_x + lado_olho * int(lado * 0.16), centro_y - int(lado * 0.10))
+        cv2.ellipse(imagem, olho, (int(lado * 0.07), int(lado * 0.04)), 0, 0, 360, escuro, -1)
+        cv2.line(imagem, (olho[0] - int(lado * 0.09), olho[1] - int(lado * 0.09)),
+                 (olho[0] + int(lado * 0.09), olho[1] - int(lado * 0.09)), escuro, max(1, lado // 40))
+    cv2.ellipse(imagem, (centro_x, centro_y + int(lado * 0.25)), (int(lado * 0.15), int(lado * 0.05)),
+                0, 0, 360, (150, 60, 60), -1)
+
+
+def gerar_foto_sintetica(rng, megapixels, com_rosto):
+    """Foto RGB falsa: fundo suave (ruído de baixa resolução ampliado) com
+    granulação fina - comprime como uma foto, não como uma cor chapada"""
+    proporcao = rng.choice([4 / 3, 3 / 4, 16 / 9, 9 / 16, 1.0])
+    largura = max(16, int(math.sqrt(megapixels * 1e6 * proporcao)))
+    altura = max(16, int(megapixels * 1e6 / largura))
+    base = rng.integers(0, 256, (6, 8, 3), dtype=np.uint8)
+    imagem = cv2.resize(base, (largura, altura), interpolation=cv2.INTER_CUBIC)
+    granulacao = rng.integers(-12, 13, (altura, largura, 1), dtype=np.int16)
+    imagem = np.clip(imagem.astype(np.int16) + granulacao, 0, 255).astype(np.uint8)
+    if com_rosto:
+        _desenhar_rosto(imagem, rng)
+    return imagem
+
+
+def gerar_acervo_sintetico(pasta, quantidade=QUANTIDADE_FOTOS, megapixels=MEGAPIXELS_FOTOS,
+                           formatos=FORMATOS_FOTOS, fracao_com_rosto=FRACAO_COM_ROSTO, semente=SEMENTE_ACERVO):
+    """Gera o acervo na pasta (ou reaproveita, se já foi gerado com os mesmos parâmetros).
+
+    Returns:
+        dict: parâmetros e totais do acervo (gravados em <pasta>/acervo.json)
+    """
+    parametros = {
+        'quantidade': quantidade, 'megapixels': megapixels, 'formatos': list(formatos),
+        'fracao_com_rosto': fracao_com_rosto, 'semente': semente,
+    }
+    arquivo_descricao = os.path.join(pasta, 'acervo.json')
+    if os.path.exists(arquivo_descricao):
+        with open(arquivo_descricao, 'r', encoding='utf-8') as arquivo:
+            descricao = json.load(arquivo)
+        if descricao.get('parametros') == parametros and all(
+                os.path.exists(os.path.join(pasta, nome)) for nome in descricao.get('arquivos', [])):
+            return descricao
+        shutil.rmtree(pasta)
+
+    print(f"\n🧪 Gerando acervo sintético: {quantidade} fotos de {megapixels} MP ({', '.join(formatos)})")
+    os.makedirs(pasta, exist_ok=True)
+    rng = np.random.default_rng(semente)
+    arquivos = []
+    com_rosto = int(round(quantidade * fracao_com_rosto))
+    for i in range(quantidade):
+        formato = formatos[i % len(formatos)]
+        nome = f"foto_{i:04d}{'_rosto' if i < com_rosto else ''}.{formato}"
+        imagem = Image.fromarray(gerar_foto_sintetica(rng, megapixels, i < com_rosto))
+        opcoes = {'quality': 90} if formato in ('jpg', 'webp') else {}
+        imagem.save(os.path.join(pasta, nome), EXTENSOES_PIL[formato], **opcoes)
+        arquivos.append(nome)
+    descricao = {
+        'parametros': parametros,
+        'arquivos': arquivos,
+        'bytes': sum(os.path.getsize(os.path.join(pasta, nome)) for nome in arquivos),
+    }
+    with open(arquivo_descricao, 'w', encoding='utf-8') as arquivo:
+        json.dump(descricao, arquivo, indent=2)
+    print(f"   ✅ {len(arquivos)} fotos ({descricao['bytes'] / (1024 * 1024):.1f} MB) em {pasta}")
+    return descricao
+
+
+def executar_caso(caso):
+    """Mede as 3 fases de um vídeo (roda num processo novo, com caches vazios).
+
+    Args:
+        caso: dicionário com pasta, largura, altura, celula, mascara, workers,
+              semente, max_frames, codificador e faixas (None = frame inteiro)
+
+    Returns:
+        dict: o caso com os tempos, vazões e picos de memória de cada fase
+    """
+    import criar_video_album as album
+    from codificador_video import abrir_codificador
+
+    pasta_temporaria = tempfile.mkdtemp(prefix='benchmark_mosaico_')
+    album.PASTA_ATLAS = os.path.join(pasta_temporaria, 'atlas')
+    album.ARQUIVO_CACHE_ROSTOS = os.path.join(pasta_temporaria, 'rostos.json')
+    album.ARQUIVO_MANIFESTO_FOTOS = os.path.join(pasta_temporaria, 'fotos.json')
+    largura_video, altura_video, celula = caso['largura'], caso['altura'], caso['celula']
+    fotos_por_linha, fotos_por_coluna = largura_video // celula, altura_video // celula
+    resultado = dict(caso)
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            # FASE 1: preparação (as mesmas funções do criar_video_album, caches frios)
+            inicio = time.perf_counter()
+            random.seed(caso['semente'])
+            acervo = album.AcervoFotos(caso['pasta'], caso['workers'])
+            total_posicoes = fotos_por_linha * fotos_por_coluna
+            lista_imagens = album.ajustar_lista_ao_grid(list(acervo.imagens), total_posicoes)
+            todas_posicoes = album.calcular_posicoes_grid(fotos_por_linha, fotos_por_coluna, celula, celula)
+            mascara = album.carregar_mascara(caso['mascara'], largura_video, altura_video) if caso['mascara'] else None
+            fotos_originais, fotos_com_mascara, caminhos_unicos = album.preparar_celulas(
+                acervo, lista_imagens, celula, celula, todas_posicoes, mascara)
+            frame_final = album.montar_frame_final(fotos_com_mascara, todas_posicoes, largura_video, altura_video)
+            segundos_fase1 = time.perf_counter() - inicio
+            rss_fase1 = pico_rss_mb()
+
+            # FASE 2: planejamento
+            inicio = time.perf_counter()
+            plano = album.planejar_animacao(todas_posicoes, celula, celula, largura_video, altura_video)
+            segundos_fase2 = time.perf_counter() - inicio
+            rss_fase2 = pico_rss_mb()
+
+            # FASE 3: renderização + codificação (só os primeiros max_frames frames)
+            video = abrir_codificador(os.path.join(pasta_temporaria, 'video.mp4'), largura_video, altura_video,
+                                      album.FPS, **caso['codificador'])
+            inicio = time.perf_counter()
+            renderizador, memoria = album.configurar_renderizador(plano, fotos_originais, fotos_com_mascara,
+                                                                  frame_final, caso['workers'], caso['faixas'])
+            if caso['max_frames']:
+                renderizador.total_frames = min(renderizador.total_frames, caso['max_frames'])
+            estatisticas_cache = album.escrever_frames(renderizador, video, caso['workers'],
+                                                       memoria['frames_por_trecho'], memoria['frames_na_fila'])
+            video.fechar()
+            segundos_fase3 = time.perf_counter() - inicio
+            rss_fase3 = pico_rss_mb()
+            bytes_video = os.path.getsize(video.caminho)
+    finally:
+        shutil.rmtree(pasta_temporaria, ignore_errors=True)
+
+    frames = renderizador.total_frames
+    mb_frames = frames * largura_video * altura_video * 3 / (1024 * 1024)
+    resultado.update({
+        'celulas': total_posicoes,
+        'fotos_unicas': len(caminhos_unicos),
+        'fase1': {
+            'segundos': segundos_fase1,
+            'fotos_por_segundo': len(caminhos_unicos) / segundos_fase1,
+            'celulas_por_segundo': total_posicoes / segundos_fase1,
+            'pico_rss_mb': rss_fase1,
+        },
+        'fase2': {
+            'segundos': segundos_fase2,
+            'fotos_por_segundo': plano.num_fotos / segundos_fase2 if segundos_fase2 > 0 else None,
+            'ondas': plano.num_ondas,
+            'pico_rss_mb': rss_fase2,
+        },
+        'fase3': {
+            'segundos': segundos_fase3,
+            'frames': frames,
+            'frames_por_segundo': frames / segundos_fase3,
+            'mb_frames_por_segundo': mb_frames / segundos_fase3,
+            'mb_escritos': bytes_video / (1024 * 1024),
+            'mb_escritos_por_segundo': bytes_video / (1024 * 1024) / segundos_fase3,
+            'codificador': video.descricao,
+            'taxa_acertos_cache_sprites': estatisticas_cache['taxa_acertos'] if estatisticas_cache else None,
+            'altura_faixa': memoria['altura_faixa'],
+            'pico_rss_mb': rss_fase3,
+        },
+    })
+    return resultado
+
+
+def montar_casos(resolucoes, celulas, pasta, workers, semente, max_frames, codificador, faixas=None):
+    """Um caso por (resolução, tamanho de célula) - células que não dividem a
+    resolução exatamente (deixariam barras brancas) são puladas"""
+    casos = []
+    for largura, altura, mascara in resolucoes:
+        for celula in celulas:
+            if largura % celula or altura % celula:
+                print(f"   ⏭️  Célula de {celula}px não divide {largura}x{altura} - pulando")
+                continue
+            casos.append({
+                'pasta': pasta, 'largura': largura, 'altura': altura, 'celula': celula,
+                'mascara': mascara if mascara and os.path.exists(mascara) else None,
+                'workers': workers, 'semente': semente, 'max_frames': max_frames,
+                'codificador': codificador, 'faixas': faixas,
+            })
+    return casos
+
+
+def chave_caso(caso):
+    return f"{caso['largura']}x{caso['altura']}@{caso['celula']}px"
+
+
+def imprimir_caso(caso):
+    fase1, fase2, fase3 = caso['fase1'], caso['fase2'], caso['fase3']
+    rss = max((f['pico_rss_mb'] or 0) for f in (fase1, fase2, fase3))
+    print(f"   📊 {chave_caso(caso)}: {caso['celulas']} células, {caso['fotos_unicas']} fotos")
+    print(f"      FASE 1: {fase1['segundos']:.2f}s ({fase1['fotos_por_segundo']:.1f} fotos/s)")
+    print(f"      FASE 2: {fase2['segundos']:.3f}s ({fase2['ondas']} ondas)")
+    faixas = f", faixas de {fase3['altura_faixa']}px" if fase3.get('altura_faixa') else ''
+    print(f"      FASE 3: {fase3['segundos']:.2f}s ({fase3['frames_por_segundo']:.1f} frames/s, "
+          f"{fase3['mb_escritos_por_segundo']:.2f} MB/s escritos{faixas})")
+    print(f"      Pico de memória: {rss:.0f} MB")
+
+
+def comparar_resultados(base, atual):
+    """Imprime a variação de cada caso em relação a uma execução anterior"""
+    casos_base = {chave_caso(caso): caso for caso in base.get('casos', [])}
+    print(f"\n📈 Comparação com a base de {base.get('data', '?')} (tempo: menor é melhor)")
+    for caso in atual['casos']:
+        anterior = casos_base.get(chave_caso(caso))
+        if anterior is None:
+            print(f"   {chave_caso(caso)}: sem caso correspondente na base")
+            continue
+        partes = []
+        for fase in ('fase1', 'fase2', 'fase3'):
+            antes, depois = anterior[fase]['segundos'], caso[fase]['segundos']
+            partes.append(f"{fase.upper()[:4]} {fase[-1]}: {antes:.2f}s → {depois:.2f}s "
+                          f"({(depois / antes - 1) * 100:+.0f}%)" if antes > 0 else f"{fase}: -")
+        rss_antes = anterior['fase3'].get('pico_rss_mb')
+        rss_depois = caso['fase3'].get('pico_rss_mb')
+        if rss_antes and rss_depois:
+            partes.append(f"RSS: {rss_antes:.0f} → {rss_depois:.0f} MB")
+        print(f"   {chave_caso(caso)}: " + " | ".join(partes))
+
+
+def descrever_ambiente():
+    return {
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'processador': platform.processor() or platform.machine(),
+        'nucleos': os.cpu_count(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+    }
+
+
+def main():
+    import criar_video_album as album
+    from codificador_video import CODIFICADORES
+
+    parser = argparse.ArgumentParser(description="Benchmark das 3 fases do criar_video_album com fotos sintéticas")
+    parser.add_argument('--saida', metavar='ARQUIVO', default='benchmark_mosaico.json',
+                        help='JSON com os resultados (padrão: %(default)s)')
+    parser.add_argument('--comparar', metavar='ARQUIVO', default=None,
+                        help='JSON de uma execução anterior para comparar')
+    parser.add_argument('--pasta', default=PASTA_ACERVO, help='Pasta do acervo sintético (padrão: %(default)s)')
+    parser.add_argument('--fotos', type=int, default=QUANTIDADE_FOTOS, help='Fotos no acervo (padrão: %(default)s)')
+    parser.add_argument('--megapixels', type=float, default=MEGAPIXELS_FOTOS,
+                        help='Megapixels de cada foto (padrão: %(default)s)')
+    parser.add_argument('--formatos', nargs='+', default=list(FORMATOS_FOTOS), choices=sorted(EXTENSOES_PIL),
+                        help='Formatos das fotos, em rodízio (padrão: %(default)s)')
+    parser.add_argument('--fracao-rostos', type=float, default=FRACAO_COM_ROSTO,
+                        help='Fração das fotos com um rosto desenhado (padrão: %(default)s)')
+    parser.add_argument('--celulas', type=int, nargs='+', default=list(TAMANHOS_CELULA),
+                        help='Tamanhos de célula medidos, em pixels (padrão: %(default)s)')
+    parser.add_argument('--resolucao', nargs='+', default=None, metavar='LxA',
+                        help='Resoluções medidas (padrão: as de VIDEOS_PARA_GERAR, com suas máscaras)')
+    parser.add_argument('--max-frames', type=int, default=MAX_FRAMES,
+                        help='Frames renderizados na FASE 3 (0 = vídeo inteiro; padrão: %(default)s)')
+    parser.add_argument('--workers', type=int, default=1, help='Processos de renderização (padrão: 1)')
+    parser.add_argument('--codificador', choices=CODIFICADORES, default=album.CODIFICADOR,
+                        help='Codificador da FASE 3 (padrão: %(default)s)')
+    parser.add_argument('--seed', type=int, default=1, help='Semente do plano (padrão: 1)')
+    parser.add_argument('--faixas', type=int, default=0, metavar='ALTURA',
+                        help='Renderiza a FASE 3 em faixas de ALTURA pixels (0 = frame inteiro; padrão: 0) - '
+                             'alguns pixels podem sair 1 nível diferente do frame inteiro')
+    parser.add_argument('--memoria-trabalho', type=int, default=album.MEMORIA_TRABALHO_MB, metavar='MB',
+                        help='Com --faixas, orçamento de memória de trabalho (padrão: %(default)s)')
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print("BENCHMARK DO MOSAICO")
+    print("="*60)
+
+    acervo = gerar_acervo_sintetico(args.pasta, args.fotos, args.megapixels, args.formatos,
+                                    args.fracao_rostos, SEMENTE_ACERVO)
+    if args.resolucao:
+        resolucoes = [tuple(int(v) for v in texto.lower().split('x')) + (None,) for texto in args.resolucao]
+    else:
+        resolucoes = [(config['largura'], config['altura'], config['mascara']) for config in album.VIDEOS_PARA_GERAR]
+    codificador = {'tipo': args.codificador, 'preset': album.PRESET_X264, 'crf': album.CRF_X264,
+                   'yuv420_no_processo': album.YUV420_NO_PROCESSO}
+    casos = montar_casos(resolucoes, args.celulas, args.pasta, args.workers, args.seed, args.max_frames,
+                         codificador, {'altura': args.faixas, 'memoria_mb': args.memoria_trabalho}
+                         if args.faixas > 0 else None)
+
+    # Cada caso num processo novo ('spawn'): pico de memória e caches independentes
+    contexto = multiprocessing.get_context('spawn')
+    resultados = []
+    for i, caso in enumerate(casos, 1):
+        print(f"\n⏱️  Caso {i}/{len(casos)}: {chave_caso(caso)}")
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+            resultado = executor.submit(executar_caso, caso).result()
+        imprimir_caso(resultado)
+        resultados.append(resultado)
+
+    relatorio = {
+        'versao': VERSAO_FORMATO_BENCHMARK,
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'ambiente': descrever_ambiente(),
+        'acervo': {'pasta': args.pasta, **acervo['parametros'], 'bytes': acervo['bytes']},
+        'casos': resultados,
+    }
+    with open(args.saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+    print(f"\n💾 Resultados salvos em: {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as arquivo:
+            comparar_resultados(json.load(arquivo), relatorio)
+
+    print("\n" + "="*60)
+
+
+if __name__ == "__main__":
+    main()
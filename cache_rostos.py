@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache persistente (em disco) das detecções de rosto.
+Usado pelo detectar_rosto.py para não rodar o Haar Cascade de novo em fotos
+já analisadas - nem nas células duplicadas do grid, nem entre execuções,
+resoluções ou tamanhos de célula diferentes.
+
+A chave é o hash (SHA-1) do CONTEÚDO do arquivo: se a foto for editada, o
+hash muda e ela é analisada de novo automaticamente. As caixas ficam nas
+coordenadas da imagem original, então servem para qualquer corte.
+"""
+
+import hashlib
+import json
+import os
+
+
+# Versão do formato do arquivo de cache
+VERSAO_FORMATO_CACHE = 1
+
+
+def calcular_hash_conteudo(dados):
+    """Hash (hexadecimal) do conteúdo de um arquivo já lido em memória"""
+    return hashlib.sha1(dados).hexdigest()
+
+
+def calcular_hash_arquivo(caminho):
+    """Hash (hexadecimal) do conteúdo de um arquivo, lido em blocos"""
+    sha1 = hashlib.sha1()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1024 * 1024), b''):
+            sha1.update(bloco)
+    return sha1.hexdigest()
+
+
+class CacheRostos:
+    """
+    Caixas de rosto por hash de conteúdo, gravadas em um arquivo JSON.
+
+    Cada entrada guarda (centro_x, centro_y, largura, altura) do rosto
+    principal - ou None quando a foto não tem rosto (também vale guardar:
+    é a análise mais cara, porque percorre todas as escalas).
+    """
+
+    def __init__(self, caminho_arquivo, assinatura=''):
+        """
+        Args:
+            caminho_arquivo: Arquivo JSON do cache (criado se não existir)
+            assinatura: Identifica o detector e seus parâmetros - se mudar,
+                        o cache antigo é descartado
+        """
+        self.caminho_arquivo = caminho_arquivo
+        self.assinatura = assinatura
+        self.acertos = 0
+        self.falhas = 0
+        self._rostos = {}
+        self._modificado = False
+        self._carregar()
+
+    def _carregar(self):
+        if not self.caminho_arquivo or not os.path.exists(self.caminho_arquivo):
+            return
+        try:
+            with open(self.caminho_arquivo, 'r', encoding='utf-8') as arquivo:
+                dados = json.load(arquivo)
+        except (OSError, ValueError):
+            return  # Arquivo corrompido: começa do zero (será regravado)
+        if dados.get('versao') != VERSAO_FORMATO_CACHE or dados.get('assinatura') != self.assinatura:
+            return
+        self._rostos = {
+            chave: tuple(rosto) if rosto is not None else None
+            for chave, rosto in dados.get('rostos', {}).items()
+        }
+
+    def chaves(self):
+        """Hashes de todas as fotos já analisadas"""
+        return self._rostos.keys()
+
+    def __contains__(self, chave):
+        return chave in self._rostos
+
+    def obter(self, chave):
+        """Retorna (encontrado, rosto) - rosto pode ser None (foto sem rosto)"""
+        if chave in self._rostos:
+            self.acertos += 1
+            return True, self._rostos[chave]
+        self.falhas += 1
+        return False, None
+
+    def guardar(self, chave, rosto):
+        """Guarda a caixa do rosto (ou None) para a foto com esse hash"""
+        self._rostos[chave] = tuple(int(v) for v in rosto) if rosto is not None else None
+        self._modificado = True
+
+    def salvar(self):
+        """Grava o cache no disco (só se mudou). A escrita é atômica: grava em um
+        arquivo temporário e o renomeia, para nunca deixar um JSON pela metade."""
+        if not self._modificado or not self.caminho_arquivo:
+            return
+        pasta = os.path.dirname(self.caminho_arquivo)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        temporario = self.caminho_arquivo + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump({
+                'versao': VERSAO_FORMATO_CACHE,
+                'assinatura': self.assinatura,
+                'rostos': {chave: list(rosto) if rosto is not None else None
+                           for chave, rosto in self._rostos.items()},
+            }, arquivo)
+        os.replace(temporario, self.caminho_arquivo)
+        self._modificado = False
+
+    def estatisticas(self):
+        """Retorna um dicionário com as estatísticas de uso do cache"""
+        consultas = self.acertos + self.falhas
+        return {
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'taxa_acertos': self.acertos / consultas if consultas else 0.0,
+            'itens': len(self._rostos),
+        }
+
+    def __len__(self):
+        return len(self._rostos)
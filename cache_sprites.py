@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache LRU de sprites já transformados (escalados, rotacionados e com fade).
+Usado pelo criar_video_album.py para não refazer a mesma warpAffine quadro a
+quadro - em especial nas fotos gigantes, que são as mais caras.
+"""
+
+from collections import OrderedDict
+
+
+# Chaves pedidas uma vez (candidatas a entrar no cache) lembradas no máximo
+MAXIMO_PEDIDOS = 65536
+
+
+class CacheSprites:
+    """
+    Cache LRU com orçamento de memória em bytes.
+
+    Cada entrada guarda um sprite transformado (normalmente a tupla
+    (cor, alpha, x_inicio, y_inicio)). Quando o total passa do limite, as
+    entradas usadas há mais tempo são descartadas primeiro.
+    """
+
+    def __init__(self, limite_mb):
+        """
+        Args:
+            limite_mb: Memória máxima ocupada pelos sprites guardados (em MB)
+        """
+        self.limite_bytes = int(limite_mb * 1024 * 1024)
+        self.bytes_usados = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+        self._itens = OrderedDict()  # chave -> (valor, tamanho_bytes)
+        self._pedidos = OrderedDict()  # Chaves pedidas uma vez e ainda não guardadas
+
+    def obter(self, chave):
+        """Retorna o sprite guardado para a chave (ou None) e atualiza as estatísticas"""
+        item = self._itens.get(chave)
+        if item is None:
+            self.falhas += 1
+            return None
+        self._itens.move_to_end(chave)
+        self.acertos += 1
+        return item[0]
+
+    def cabe(self, tamanho_bytes):
+        """Indica se um sprite desse tamanho pode ser guardado sem esvaziar o cache
+        (sprites maiores que 1/4 do orçamento não são guardados)"""
+        return tamanho_bytes <= self.limite_bytes // 4
+
+    def admitir(self, chave):
+        """Indica se vale a pena guardar o sprite da chave: só na segunda vez que
+        ela é pedida (sprites usados uma vez só não ocupam o cache nem custam
+        uma transformação inteira). As chaves pedidas uma vez são lembradas
+        até o limite de MAXIMO_PEDIDOS."""
+        if self._pedidos.pop(chave, None) is not None:
+            return True
+        self._pedidos[chave] = True
+        if len(self._pedidos) > MAXIMO_PEDIDOS:
+            self._pedidos.popitem(last=False)
+        return False
+
+    def guardar(self, chave, valor, tamanho_bytes):
+        """Guarda o sprite, descartando os menos usados se passar do orçamento"""
+        if not self.cabe(tamanho_bytes):
+            return
+        antigo = self._itens.pop(chave, None)
+        if antigo is not None:
+            self.bytes_usados -= antigo[1]
+        self._itens[chave] = (valor, tamanho_bytes)
+        self.bytes_usados += tamanho_bytes
+        while self.bytes_usados > self.limite_bytes:
+            _, (_, tamanho_descartado) = self._itens.popitem(last=False)
+            self.bytes_usados -= tamanho_descartado
+            self.descartes += 1
+
+    @property
+    def taxa_acertos(self):
+        """Fração das consultas que encontraram o sprite pronto (0.0 a 1.0)"""
+        consultas = self.acertos + self.falhas
+        return self.acertos / consultas if consultas else 0.0
+
+    def estatisticas(self):
+        """Retorna um dicionário com as estatísticas de uso do cache"""
+        return {
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'taxa_acertos': self.taxa_acertos,
+            'descartes': self.descartes,
+            'itens': len(self._itens),
+            'mb_usados': self.bytes_usados / (1024 * 1024),
+            'mb_limite': self.limite_bytes / (1024 * 1024),
+        }
+
+    def __len__(self):
+        return len(self._itens)
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Codificadores de vídeo usados pelo criar_video_album.py.
+
+Os frames (BGR, uint8) vão direto para o arquivo final, sem passar por um
+.mp4 intermediário que depois precisaria ser decodificado e re-codificado:
+
+- CodificadorFFmpeg: envia os frames crus por um pipe para um processo
+  `ffmpeg` local, que grava H.264 (libx264, preset/CRF configuráveis,
+  yuv420p). Opcionalmente os frames são convertidos para YUV 4:2:0 planar
+  (I420) aqui mesmo, e o pipe leva metade dos bytes. As mensagens do ffmpeg
+  vão para um arquivo temporário, não para um pipe: um pipe que só é lido no
+  fim enche e trava o ffmpeg (e a thread que escreve os frames).
+- CodificadorY4M: grava um fluxo YUV4MPEG2 (.y4m) sem compressão, que
+  qualquer codificador (ffmpeg, x264, SVT-AV1...) aceita como entrada.
+- CodificadorOpenCV: o cv2.VideoWriter com mp4v de sempre (sem dependências
+  externas). É o reserva quando o ffmpeg não está instalado.
+
+Todos têm a mesma interface: escrever(frame_bgr), fechar() e os atributos
+caminho (arquivo gerado) e descricao.
+
+EscritorAssincrono envolve qualquer um deles numa thread própria com uma fila
+limitada: o frame N é codificado enquanto o N+1 é composto (o OpenCV e a
+escrita no pipe liberam o GIL), e o tempo total fica perto do
+max(renderização, codificação) em vez da soma.
+
+concatenar_segmentos junta arquivos gravados separadamente (renderização em
+segmentos) no vídeo final sem re-codificar.
+"""
+
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+import metricas
+
+
+# Codificadores disponíveis ('auto' = ffmpeg se estiver instalado, senão OpenCV)
+CODIFICADORES = ('auto', 'ffmpeg', 'y4m', 'opencv')
+
+
+def ffmpeg_disponivel():
+    """Verifica se o executável do ffmpeg está no PATH"""
+    return shutil.which('ffmpeg') is not None
+
+
+def converter_para_i420(frame_bgr):
+    """Converte um frame BGR (altura, largura, 3) para YUV 4:2:0 planar
+    (altura * 3/2, largura): plano Y inteiro + planos U e V com 1/4 dos pixels"""
+    with metricas.medir('conversao_cor'):
+        return cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2YUV_I420)
+
+
+def _bytes_do_quadro(quadro):
+    """Buffer do quadro para escrita (sem cópia quando o array já é contíguo)"""
+    return memoryview(np.ascontiguousarray(quadro)).cast('B')
+
+
+class CodificadorOpenCV:
+    """cv2.VideoWriter com codec mp4v (MPEG-4 Part 2)"""
+
+    def __init__(self, caminho, largura, altura, fps):
+        self.caminho = str(caminho)
+        self.descricao = "mp4v (MPEG-4 Part 2 via OpenCV)"
+        self._video = cv2.VideoWriter(self.caminho, cv2.VideoWriter_fourcc(*'mp4v'), fps, (largura, altura))
+        if not self._video.isOpened():
+            raise RuntimeError(f"Não foi possível inicializar o cv2.VideoWriter para {self.caminho}")
+
+    def escrever(self, frame_bgr):
+        with metricas.medir('escrita_video'):
+            self._video.write(frame_bgr)
+
+    def fechar(self):
+        self._video.release()
+
+
+class CodificadorFFmpeg:
+    """Frames crus por pipe para um processo ffmpeg (libx264, yuv420p)"""
+
+    def __init__(self, caminho, largura, altura, fps, preset='medium', crf=23, yuv420_no_processo=False):
+        """
+        Args:
+            preset: Preset do x264 (ultrafast ... veryslow) - velocidade x tamanho
+            crf: Qualidade constante do x264 (menor = melhor; 18-28 é o usual)
+            yuv420_no_processo: Converte os frames para I420 antes do pipe
+                                (metade dos bytes; o ffmpeg não converte mais)
+        """
+        if not ffmpeg_disponivel():
+            raise RuntimeError("ffmpeg não encontrado no PATH")
+        if yuv420_no_processo and (largura % 2 or altura % 2):
+            raise ValueError(f"YUV 4:2:0 exige largura e altura pares ({largura}x{altura})")
+        self.caminho = str(caminho)
+        self.yuv420_no_processo = yuv420_no_processo
+        formato_entrada = 'yuv420p' if yuv420_no_processo else 'bgr24'
+        self.descricao = (f"H.264 via ffmpeg (libx264, preset {preset}, CRF {crf}, yuv420p"
+                          f"{', I420 convertido no processo' if yuv420_no_processo else ''})")
+        comando = [
+            'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+            '-f', 'rawvideo', '-pix_fmt', formato_entrada,
+            '-s', f'{largura}x{altura}', '-r', str(fps),
+            '-i', '-',
+            '-an',
+            '-c:v', 'libx264', '-preset', str(preset), '-crf', str(crf),
+            '-pix_fmt', 'yuv420p',
+            '-movflags', '+faststart',
+            self.caminho,
+        ]
+        # Arquivo, não pipe: o ffmpeg nunca fica esperando alguém ler as mensagens dele
+        self._mensagens = tempfile.TemporaryFile()
+        self._processo = subprocess.Popen(comando, stdin=subprocess.PIPE, stderr=self._mensagens)
+
+    def escrever(self, frame_bgr):
+        quadro = converter_para_i420(frame_bgr) if self.yuv420_no_processo else frame_bgr
+        try:
+            with metricas.medir('escrita_video'):
+                self._processo.stdin.write(_bytes_do_quadro(quadro))
+        except BrokenPipeError:
+            self._processo.wait()
+            raise RuntimeError(f"O ffmpeg terminou antes do fim do vídeo:\n{self._erros()}") from None
+
+    def _erros(self):
+        """Mensagens que o ffmpeg escreveu até agora (chamar depois que ele terminar)"""
+        self._mensagens.seek(0)
+        return self._mensagens.read().decode('utf-8', errors='replace').strip()
+
+    def fechar(self):
+        try:
+            self._processo.stdin.close()
+        except BrokenPipeError:
+            pass
+        try:
+            if self._processo.wait() != 0:
+                raise RuntimeError(f"O ffmpeg falhou (código {self._processo.returncode}):\n{self._erros()}")
+        finally:
+            self._mensagens.close()
+
+
+class CodificadorY4M:
+    """Fluxo YUV4MPEG2 sem compressão (4:2:0, um cabeçalho + 'FRAME' por quadro)"""
+
+    def __init__(self, caminho, largura, altura, fps):
+        if largura % 2 or altura % 2:
+            raise ValueError(f"YUV 4:2:0 exige largura e altura pares ({largura}x{altura})")
+        self.caminho = str(caminho)
+        self.descricao = "YUV4MPEG2 (.y4m, sem compressão)"
+        self._arquivo = open(self.caminho, 'wb')
+        self._arquivo.write(f"YUV4MPEG2 W{largura} H{altura} F{int(round(fps * 1000))}:1000 "
+                            f"Ip A1:1 C420jpeg\n".encode('ascii'))
+
+    def escrever(self, frame_bgr):
+        quadro = converter_para_i420(frame_bgr)
+        with metricas.medir('escrita_video'):
+            self._arquivo.write(b'FRAME\n')
+            self._arquivo.write(_bytes_do_quadro(quadro))
+
+    def fechar(self):
+        self._arquivo.close()
+
+
+def resolver_codificador(tipo):
+    """Codificador que 'auto' vai usar de fato ('ffmpeg' ou 'opencv'); os demais não mudam"""
+    if tipo == 'auto':
+        return 'ffmpeg' if ffmpeg_disponivel() else 'opencv'
+    return tipo
+
+
+def abrir_codificador(caminho, largura, altura, fps, tipo='auto', preset='medium', crf=23,
+                      yuv420_no_processo=False):
+    """Abre o codificador pedido.
+
+    'auto' usa o ffmpeg se ele estiver instalado. Se o ffmpeg for pedido e não
+    estiver disponível (ou não abrir), cai para o cv2.VideoWriter com um aviso.
+    Com 'y4m' a extensão do arquivo vira .y4m.
+    """
+    if tipo not in CODIFICADORES:
+        raise ValueError(f"Codificador desconhecido: {tipo} (opções: {', '.join(CODIFICADORES)})")
+    if tipo == 'y4m':
+        return CodificadorY4M(Path(caminho).with_suffix('.y4m'), largura, altura, fps)
+    if tipo in ('auto', 'ffmpeg'):
+        if ffmpeg_disponivel():
+            try:
+                return CodificadorFFmpeg(caminho, largura, altura, fps, preset, crf, yuv420_no_processo)
+            except (OSError, ValueError) as erro:
+                print(f"   ⚠️  Não foi possível abrir o ffmpeg ({erro}) - usando o cv2.VideoWriter")
+        elif tipo == 'ffmpeg':
+            print("   ⚠️  ffmpeg não encontrado no PATH - usando o cv2.VideoWriter (mp4v)")
+    return CodificadorOpenCV(caminho, largura, altura, fps)
+
+
+class EscritorAssincrono:
+    """
+    Fila limitada + thread dedicada à codificação (produtor/consumidor).
+
+    escrever() só coloca o frame na fila - e bloqueia quando ela está cheia, o
+    que limita a memória usada por frames esperando o codificador. O tempo
+    bloqueado (renderização esperando a codificação) e o tempo ocioso da
+    thread (codificação esperando a renderização) mostram qual dos dois lados
+    é o gargalo.
+    """
+
+    _FIM = object()
+
+    def __init__(self, codificador, tamanho_fila=4):
+        """
+        Args:
+            codificador: Qualquer codificador deste módulo
+            tamanho_fila: Frames que podem esperar na fila (>= 1). O frame não
+                          pode ser alterado por quem o escreveu até sair da fila
+        """
+        self.codificador = codificador
+        self.caminho = codificador.caminho
+        self.descricao = codificador.descricao
+        self._fila = queue.Queue(maxsize=max(1, int(tamanho_fila)))
+        self._erro = None
+        self.frames = 0
+        self.soma_profundidade = 0
+        self.profundidade_maxima = 0
+        self.segundos_bloqueado = 0.0
+        self.segundos_ocioso = 0.0
+        self.segundos_codificando = 0.0
+        # A thread só começa no primeiro frame: assim um Pool criado com 'fork'
+        # antes disso não herda uma thread no meio de uma escrita
+        self._thread = threading.Thread(target=self._consumir, name='escritor-video', daemon=True)
+
+    def _consumir(self):
+        while True:
+            inicio = time.perf_counter()
+            frame = self._fila.get()
+            self.segundos_ocioso += time.perf_counter() - inicio
+            if frame is self._FIM:
+                return
+            if self._erro is not None:
+                continue  # Só esvazia a fila: o erro é repassado ao produtor
+            inicio = time.perf_counter()
+            try:
+                self.codificador.escrever(frame)
+            except Exception as erro:
+                self._erro = erro
+            self.segundos_codificando += time.perf_counter() - inicio
+
+    def _verificar_erro(self):
+        if self._erro is not None:
+            raise RuntimeError(f"Falha na thread de escrita do vídeo: {self._erro}") from self._erro
+
+    def escrever(self, frame):
+        if self._thread.ident is None:
+            self._thread.start()
+        self._verificar_erro()
+        profundidade = self._fila.qsize()
+        self.soma_profundidade += profundidade
+        self.profundidade_maxima = max(self.profundidade_maxima, profundidade)
+        inicio = time.perf_counter()
+        self._fila.put(frame)
+        self.segundos_bloqueado += time.perf_counter() - inicio
+        self.frames += 1
+
+    def esperar(self):
+        """Espera a fila esvaziar e encerra a thread (o codificador continua aberto)"""
+        if self._thread.ident is not None and self._thread.is_alive():
+            self._fila.put(self._FIM)
+            self._thread.join()
+        self._verificar_erro()
+
+    def fechar(self):
+        """Espera a fila esvaziar, encerra a thread e fecha o codificador"""
+        try:
+            self.esperar()
+        finally:
+            self.codificador.fechar()
+
+    def estatisticas(self):
+        """Retorna um dicionário com as estatísticas da fila de escrita"""
+        return {
+            'frames': self.frames,
+            'tamanho_fila': self._fila.maxsize,
+            'profundidade_media': self.soma_profundidade / self.frames if self.frames else 0.0,
+            'profundidade_maxima': self.profundidade_maxima,
+            'segundos_bloqueado': self.segundos_bloqueado,
+            'segundos_ocioso': self.segundos_ocioso,
+            'segundos_codificando': self.segundos_codificando,
+        }
+
+
+def _concatenar_y4m(caminhos, caminho_saida):
+    """Y4M: o cabeçalho do primeiro arquivo + os quadros de todos (cópia de bytes)"""
+    with open(caminho_saida, 'wb') as saida:
+        for i, caminho in enumerate(caminhos):
+            with open(caminho, 'rb') as entrada:
+                cabecalho = entrada.readline()
+                if i == 0:
+                    saida.write(cabecalho)
+                shutil.copyfileobj(entrada, saida, 16 * 1024 * 1024)
+
+
+def _concatenar_ffmpeg(caminhos, caminho_saida):
+    """MP4 (H.264/mp4v): concat demuxer do ffmpeg com cópia dos pacotes (-c copy)"""
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False, encoding='utf-8') as lista:
+        for caminho in caminhos:
+            lista.write("file '{}'\n".format(os.path.abspath(caminho).replace("'", "'\\''")))
+    try:
+        resultado = subprocess.run(
+            ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+             '-f', 'concat', '-safe', '0', '-i', lista.name,
+             '-c', 'copy', '-movflags', '+faststart', str(caminho_saida)],
+            stderr=subprocess.PIPE)
+    finally:
+        os.remove(lista.name)
+    if resultado.returncode != 0:
+        raise RuntimeError(f"O ffmpeg falhou ao concatenar os segmentos (código {resultado.returncode}):\n"
+                           f"{resultado.stderr.decode('utf-8', errors='replace').strip()}")
+
+
+def _concatenar_opencv(caminhos, caminho_saida):
+    """Sem ffmpeg: decodifica os segmentos e grava tudo de novo com o cv2.VideoWriter"""
+    primeiro = cv2.VideoCapture(str(caminhos[0]))
+    fps = primeiro.get(cv2.CAP_PROP_FPS)
+    tamanho = (int(primeiro.get(cv2.CAP_PROP_FRAME_WIDTH)), int(primeiro.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    primeiro.release()
+    video = CodificadorOpenCV(caminho_saida, tamanho[0], tamanho[1], fps)
+    try:
+        for caminho in caminhos:
+            captura = cv2.VideoCapture(str(caminho))
+            while True:
+                lido, frame = captura.read()
+                if not lido:
+                    break
+                video.escrever(frame)
+            captura.release()
+    finally:
+        video.fechar()
+
+
+def concatenar_segmentos(caminhos, caminho_saida):
+    """Junta os segmentos (mesma resolução, fps e codificador), em ordem, no vídeo final.
+
+    Y4M é juntado byte a byte e MP4 pelo concat do ffmpeg (-c copy): nos dois
+    casos, sem re-codificar - cada segmento começa num quadro-chave. Sem
+    ffmpeg, os MP4 são decodificados e re-codificados pelo OpenCV (com aviso:
+    perde um pouco de qualidade).
+
+    Returns:
+        bool: True se a junção foi sem re-codificação
+    """
+    if not caminhos:
+        raise ValueError("Nenhum segmento para concatenar")
+    if all(str(caminho).endswith('.y4m') for caminho in caminhos):
+        _concatenar_y4m(caminhos, caminho_saida)
+        return True
+    if ffmpeg_disponivel():
+        _concatenar_ffmpeg(caminhos, caminho_saida)
+        return True
+    print("   ⚠️  ffmpeg não encontrado no PATH - os segmentos serão re-codificados pelo OpenCV (mp4v)")
+    _concatenar_opencv(caminhos, caminho_saida)
+    return False
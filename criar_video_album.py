@@ -40,18 +40,36 @@ Cada execução gera um vídeo completamente diferente!
 """
 
 import os
+import argparse
+import hashlib
+import json
+import shutil
 import cv2
 import numpy as np
 from PIL import Image
-import glob
 from pathlib import Path
 import math
 import random
 import time
 import sys
+import multiprocessing
+import contextlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 # Importa módulo de detecção de rosto
-from detectar_rosto import carregar_e_redimensionar_com_deteccao_rosto
+from detectar_rosto import (carregar_e_redimensionar_com_deteccao_rosto, detectar_rostos_em_lote,
+                            ASSINATURA_DETECCAO, POLITICA_CORTE)
+from cache_rostos import CacheRostos, calcular_hash_arquivo
+from atlas_sprites import (AtlasFotos, chave_atlas_grade, abrir_atlas_grade, salvar_atlas_grade,
+                           caminho_atlas_grade, ATLAS_GRADE_MANTIDOS)
+from cache_sprites import CacheSprites
+from codificador_video import (abrir_codificador, resolver_codificador, concatenar_segmentos,
+                               EscritorAssincrono, CODIFICADORES)
+from segmentos_video import ManifestoSegmentos
+from manifesto_fotos import ManifestoFotos, resumir_ignorados
+import metricas
+from plano_animacao import PlanoAnimacao, TIPO_NORMAL, TIPO_DESTAQUE, TIPO_GIGANTE
 
 # Configura encoding UTF-8 para o console no Windows
 if sys.platform == 'win32':
@@ -73,6 +91,65 @@ DELAY_ENTRE_ONDAS = 0.8  # Segundos de delay entre início de cada onda (sobrepo
 DURACAO_PAUSA_MEIO = 0  # Sem pausa (vai direto da entrada para saída) - Para 1min total (30s+30s)
 TRANSPARENCIA_MASCARA = 0.85  # Transparência da máscara aplicada em cada foto (0.0 = invisível, 1.0 = opaca)
 
+# Cache de sprites transformados (compartilhado entre entrada e saída)
+# Escala, ângulo e fades são arredondados para "degraus" - assim o mesmo sprite
+# transformado pode ser reaproveitado em vários frames em vez de refeito do zero
+# Só entram sprites inteiros dentro do frame e pedidos mais de uma vez (cauda do easing)
+MEMORIA_CACHE_SPRITES_MB = 512  # Orçamento de memória do cache, dividido entre os processos (0 = desativado)
+PASSO_ESCALA_CACHE = 0.005  # Degrau de escala (0.5% - em escala logarítmica)
+PASSO_ANGULO_CACHE = 0.5  # Degrau de ângulo (graus)
+PASSOS_FADE_CACHE = 32  # Níveis de fade (transição de máscara e opacidade)
+
+# Cache em disco (reaproveitado entre execuções, resoluções e tamanhos de célula)
+PASTA_CACHE = ".cache_mosaico"
+ARQUIVO_CACHE_ROSTOS = os.path.join(PASTA_CACHE, "rostos.json")  # None = sem cache de rostos
+PASTA_ATLAS = os.path.join(PASTA_CACHE, "atlas")  # Atlas de sprites prontos (None = sem atlas)
+# Manifesto da pasta de fotos (tamanho, data, formato e hash de cada arquivo):
+# só as fotos novas ou modificadas são lidas de novo (None = lê todas a cada execução)
+ARQUIVO_MANIFESTO_FOTOS = os.path.join(PASTA_CACHE, "fotos.json")
+
+# Renderização paralela (--workers N)
+FRAMES_POR_TRECHO = 15  # Frames renderizados por tarefa em cada processo
+
+# Renderização por retângulos sujos: um buffer de frame reaproveitado só tem
+# restauradas (da camada estática) as regiões que mudaram desde o seu último uso
+RENDERIZACAO_DELTA = True
+FRACAO_MAXIMA_DELTA = 0.5  # Acima desta fração do frame, restaura o frame inteiro (uma cópia só)
+
+# Codificação (--codificador): os frames vão direto para o arquivo final
+# 'auto' = H.264 via pipe para o ffmpeg se ele estiver instalado, senão mp4v (OpenCV)
+CODIFICADOR = 'auto'  # 'auto', 'ffmpeg', 'y4m' ou 'opencv'
+PRESET_X264 = 'medium'  # Velocidade x tamanho do arquivo (ultrafast ... veryslow)
+CRF_X264 = 23  # Qualidade (menor = melhor, 18-28 é bom)
+YUV420_NO_PROCESSO = False  # Converte para YUV 4:2:0 antes do pipe (metade dos bytes)
+# Thread de escrita: o frame N é codificado enquanto o N+1 é renderizado
+FRAMES_NA_FILA_ESCRITA = 4  # Frames prontos esperando o codificador (0 = escreve na mesma thread)
+
+# Renderização em segmentos (--segmentos N): cada trecho de N frames vai para
+# um arquivo próprio; um manifesto guarda os prontos (uma execução interrompida
+# continua do primeiro que falta) e no fim eles são juntados sem re-codificar
+FRAMES_POR_SEGMENTO = 0  # Frames por segmento (0 = vídeo num arquivo só, sem segmentos)
+MANTER_SEGMENTOS = False  # Mantém a pasta <nome>.segmentos depois de juntar o vídeo final
+
+# Modo rascunho (--proxy): o MESMO plano em resolução reduzida, para conferir
+# máscara e tempos em segundos. As fotos são preparadas no tamanho final e
+# reduzidas depois: o vídeo final reaproveita o plano salvo e as fotos prontas
+REDUCAO_PROXY = 4  # Célula (e vídeo) REDUCAO_PROXY vezes menor em cada lado
+PASSO_FRAMES_PROXY = 2  # Renderiza 1 a cada N frames (o rascunho sai com FPS / N)
+
+# Renderização em faixas (--faixas ALTURA): cada frame é composto em faixas
+# horizontais e cada foto em movimento é transformada só no pedaço que cai em
+# cada faixa - os buffers temporários da composição têm o tamanho de uma faixa,
+# não do frame. Para saídas na resolução nativa (6384x1344) ou 8K
+# (o resultado pode diferir do frame inteiro em 1 nível em alguns pixels)
+ALTURA_FAIXA = 0  # Altura das faixas em pixels (0 = frame inteiro de uma vez)
+MEMORIA_TRABALHO_MB = 256  # Orçamento das faixas + frames em espera (fila de escrita e trechos)
+BYTES_RASCUNHO_POR_PIXEL = 8  # Buffers da composição: cor (3) + alpha (1) + inverso (1 + 3)
+
+# Métricas de desempenho (--metricas): tempos por fase e por ponto quente,
+# percentis do tempo por frame, caches e pico de memória em <nome>.metricas.json
+GRAVAR_METRICAS = False
+
 # Configurações de destaque e variação de tamanho (compartilhadas)
 NUM_FOTOS_GIGANTES = 100  # Número mínimo de fotos que aparecem GIGANTES na tela
 
@@ -113,22 +190,28 @@ VIDEOS_PARA_GERAR = [
     }
 ]
 
-def carregar_e_redimensionar(caminho_imagem, largura, altura):
+def carregar_e_redimensionar(caminho_imagem, largura, altura, cache_rostos=None, estatisticas=None):
     """Carrega e recorta a imagem para preencher completamente a célula QUADRADA.
     AGORA COM DETECÇÃO DE ROSTO: centraliza o corte no rosto detectado!
-    Se não detectar rosto, usa corte centralizado normal."""
+    Se não detectar rosto, usa corte centralizado normal.
+    Com cache_rostos, fotos já analisadas (mesmo conteúdo) não passam de novo pelo detector.
+    JPEGs são decodificados direto em resolução reduzida (estatisticas acumula o ganho).
+    A foto sai em BGR (a ordem de canais do codificador), já no tamanho da célula."""
     # Usa a função do módulo detectar_rosto que já faz tudo isso
-    return carregar_e_redimensionar_com_deteccao_rosto(caminho_imagem, largura, altura, verbose=True)
+    foto = carregar_e_redimensionar_com_deteccao_rosto(caminho_imagem, largura, altura, verbose=True,
+                                                       cache=cache_rostos, estatisticas=estatisticas)
+    with metricas.medir('conversao_cor'):
+        return cv2.cvtColor(foto, cv2.COLOR_RGB2BGR)
 
 def carregar_mascara(caminho_mascara, largura, altura):
-    """Carrega a imagem de máscara redimensionada para o tamanho do vídeo"""
+    """Carrega a imagem de máscara redimensionada para o tamanho do vídeo (em BGR)"""
     try:
         img_mascara = Image.open(caminho_mascara)
         if img_mascara.mode != 'RGB':
             img_mascara = img_mascara.convert('RGB')
         img_mascara = img_mascara.resize((largura, altura), Image.Resampling.LANCZOS)
-        mascara_array = np.array(img_mascara).astype(np.float32) / 255.0
-        return mascara_array
+        # Mantida em uint8 (1 byte por canal): as misturas são feitas em inteiros
+        return cv2.cvtColor(np.array(img_mascara), cv2.COLOR_RGB2BGR)
     except Exception as e:
         print(f"⚠️ Não foi possível carregar a máscara: {e}")
         print("   Continuando sem máscara...")
@@ -147,9 +230,13 @@ def extrair_regiao_mascara(mascara_completa, x, y, largura, altura):
     
     return mascara_completa[y:y_end, x:x_end]
 
-def aplicar_mascara_na_foto(foto, regiao_mascara, alpha):
-    """Aplica uma região da máscara diretamente em uma foto"""
+def aplicar_mascara_na_foto(foto, regiao_mascara, alpha, destino=None):
+    """Aplica uma região da máscara diretamente em uma foto
+    (se destino for passado, o resultado é escrito nele, sem alocar)"""
     if regiao_mascara is None:
+        if destino is not None:
+            destino[...] = foto
+            return destino
         return foto
     
     # Ajusta o tamanho se necessário
@@ -158,10 +245,9 @@ def aplicar_mascara_na_foto(foto, regiao_mascara, alpha):
         h, w = foto.shape[:2]
         regiao_mascara = cv2.resize(regiao_mascara, (w, h))
     
-    # Blending: foto * (1 - alpha) + mascara * alpha
-    foto_float = foto.astype(np.float32) / 255.0
-    resultado = foto_float * (1 - alpha) + regiao_mascara * alpha
-    return (resultado * 255).astype(np.uint8)
+    # Blending: foto * (1 - alpha) + mascara * alpha (uint8, com arredondamento)
+    with metricas.medir('mistura_mascara'):
+        return cv2.addWeighted(foto, 1 - alpha, regiao_mascara, alpha, 0, dst=destino)
 
 def calcular_posicao_origem(x_final, y_final, largura_foto, altura_foto, largura_video, altura_video, direcao):
     """Calcula a posição de origem da foto baseada na direção de entrada"""
@@ -182,310 +268,1154 @@ def calcular_posicao_origem(x_final, y_final, largura_foto, altura_foto, largura
     else:  # direcao == 7: Diagonal inferior direita
         return largura_video, altura_video
 
-def rotacionar_imagem(imagem, angulo, centro_x, centro_y):
-    """Rotaciona uma imagem em torno de um ponto central"""
-    altura, largura = imagem.shape[:2]
-    matriz_rotacao = cv2.getRotationMatrix2D((centro_x, centro_y), angulo, 1.0)
-    
-    # Calcula o tamanho da imagem rotacionada
-    cos = abs(matriz_rotacao[0, 0])
-    sin = abs(matriz_rotacao[0, 1])
-    nova_largura = int((altura * sin) + (largura * cos))
-    nova_altura = int((altura * cos) + (largura * sin))
-    
-    # Ajusta a matriz de rotação para levar em conta a translação
-    matriz_rotacao[0, 2] += (nova_largura / 2) - centro_x
-    matriz_rotacao[1, 2] += (nova_altura / 2) - centro_y
-    
-    # Aplica a rotação com fundo branco
-    imagem_rotacionada = cv2.warpAffine(imagem, matriz_rotacao, (nova_largura, nova_altura),
-                                        borderMode=cv2.BORDER_CONSTANT, borderValue=(255, 255, 255))
-    
-    return imagem_rotacionada, nova_largura, nova_altura
-
-def desenhar_foto_em_posicao(frame, foto, x, y, largura_foto, altura_foto, largura_video, altura_video, angulo=0, escala=1.0):
-    """Desenha a foto no frame, com rotação e escala opcionais"""
-    # Aplica escala se diferente de 1.0
-    if escala != 1.0:
-        nova_largura_escala = int(largura_foto * escala)
-        nova_altura_escala = int(altura_foto * escala)
-        foto_escalada = cv2.resize(foto, (nova_largura_escala, nova_altura_escala), interpolation=cv2.INTER_LINEAR)
-        
-        # Ajusta posição para manter o centro
-        x_centralizado = x - (nova_largura_escala - largura_foto) // 2
-        y_centralizado = y - (nova_altura_escala - altura_foto) // 2
-        
-        foto_trabalho = foto_escalada
-        largura_trabalho = nova_largura_escala
-        altura_trabalho = nova_altura_escala
-        x_trabalho = x_centralizado
-        y_trabalho = y_centralizado
+def calcular_matriz_foto(x, y, largura_foto, altura_foto, angulo=0, escala=1.0):
+    """Monta UMA matriz afim com escala, rotação e translação combinadas.
+    
+    Leva a foto (coordenadas da própria foto) direto para o frame, mantendo o
+    centro da foto no centro da célula (x, y, largura_foto, altura_foto)."""
+    centro_foto = ((largura_foto - 1) / 2, (altura_foto - 1) / 2)
+    matriz = cv2.getRotationMatrix2D(centro_foto, angulo, escala)
+    matriz[0, 2] += x
+    matriz[1, 2] += y
+    return matriz
+
+def calcular_caixa_transformada(matriz, largura_foto, altura_foto):
+    """Retorna a caixa (x_inicio, y_inicio, x_fim, y_fim) em pixels do frame
+    coberta pela foto depois de aplicar a matriz afim (x_fim/y_fim exclusivos)"""
+    cantos = np.array([
+        [-0.5, -0.5, 1.0],
+        [largura_foto - 0.5, -0.5, 1.0],
+        [-0.5, altura_foto - 0.5, 1.0],
+        [largura_foto - 0.5, altura_foto - 0.5, 1.0],
+    ]) @ matriz.T
+    x_inicio = math.ceil(cantos[:, 0].min() - 0.5)
+    y_inicio = math.ceil(cantos[:, 1].min() - 0.5)
+    x_fim = math.floor(cantos[:, 0].max() - 0.5) + 1
+    y_fim = math.floor(cantos[:, 1].max() - 0.5) + 1
+    return x_inicio, y_inicio, x_fim, y_fim
+
+# Planos de cobertura (alpha = 255) reutilizados por tamanho de foto
+_PLANOS_COBERTURA = {}
+
+# Buffers temporários reaproveitados entre chamadas (um por nome, crescem quando preciso)
+_RASCUNHOS = {}
+
+def obter_rascunho(nome, forma):
+    """Retorna um buffer uint8 contíguo com a forma pedida, reaproveitando a
+    mesma memória a cada chamada - o conteúdo anterior NÃO é preservado"""
+    tamanho = int(np.prod(forma))
+    buffer = _RASCUNHOS.get(nome)
+    if buffer is None or buffer.size < tamanho:
+        buffer = np.empty(tamanho, dtype=np.uint8)
+        _RASCUNHOS[nome] = buffer
+    return buffer[:tamanho].reshape(forma)
+
+def obter_plano_cobertura(altura, largura):
+    """Retorna um plano uint8 totalmente opaco (255) do tamanho da foto"""
+    plano = _PLANOS_COBERTURA.get((altura, largura))
+    if plano is None:
+        plano = np.full((altura, largura), 255, dtype=np.uint8)
+        _PLANOS_COBERTURA[(altura, largura)] = plano
+    return plano
+
+def transformar_foto(foto, matriz, tamanho_saida, opacidade=1.0, destino=None):
+    """Aplica a matriz afim na foto e retorna (cor, alpha) do tamanho de saída.
+    
+    A cobertura (canal alpha) passa pela mesma warpAffine que as cores, com
+    borda transparente. Como a cor também é interpolada contra preto fora da
+    foto, o resultado já sai pré-multiplicado pelo alpha. As bordas saem
+    suavizadas (anti-aliasing) e pixels claros da foto não viram mais
+    "buracos" como na antiga máscara de pixels não-brancos.
+    A opacidade (fade das fotos gigantes) multiplica a cobertura e a cor.
+    Com destino=(cor, alpha), o resultado é escrito nesses buffers."""
+    cor_destino, alpha_destino = destino if destino is not None else (None, None)
+    with metricas.medir('warp'):
+        cor = cv2.warpAffine(foto, matriz, tamanho_saida, dst=cor_destino, flags=cv2.INTER_LINEAR,
+                             borderMode=cv2.BORDER_CONSTANT, borderValue=(0, 0, 0))
+        alpha = cv2.warpAffine(obter_plano_cobertura(*foto.shape[:2]), matriz, tamanho_saida, dst=alpha_destino,
+                               flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+        if opacidade < 1.0:
+            # Fade em inteiros, no próprio buffer
+            cv2.convertScaleAbs(cor, dst=cor, alpha=opacidade)
+            cv2.convertScaleAbs(alpha, dst=alpha, alpha=opacidade)
+    metricas.contar('pixels_warp', tamanho_saida[0] * tamanho_saida[1])
+    return cor, alpha
+
+def misturar_sobre_regiao(regiao, cor, alpha):
+    """Compõe uma cor pré-multiplicada sobre a região do frame:
+    regiao = cor + regiao * (255 - alpha) / 255, em uint8 e sem alocar memória
+    (o inverso do alpha vai para buffers reaproveitados)"""
+    altura, largura = alpha.shape
+    with metricas.medir('composicao'):
+        inverso = cv2.bitwise_not(alpha, dst=obter_rascunho('inverso', (altura, largura)))
+        inverso3 = cv2.cvtColor(inverso, cv2.COLOR_GRAY2RGB, dst=obter_rascunho('inverso3', (altura, largura, 3)))
+        cv2.multiply(regiao, inverso3, dst=regiao, scale=1 / 255)
+        cv2.add(regiao, cor, dst=regiao)
+
+def compor_foto_transformada(regiao, foto, matriz, opacidade=1.0):
+    """Aplica a matriz afim na foto e compõe o resultado sobre a região do frame
+    (a foto transformada só existe durante a composição: usa buffers reaproveitados)"""
+    altura, largura = regiao.shape[:2]
+    destino = (obter_rascunho('cor', (altura, largura, 3)), obter_rascunho('alpha', (altura, largura)))
+    cor, alpha = transformar_foto(foto, matriz, (largura, altura), opacidade, destino)
+    misturar_sobre_regiao(regiao, cor, alpha)
+
+def desenhar_foto_em_posicao(frame, foto, x, y, largura_foto, altura_foto, largura_video, altura_video, angulo=0, escala=1.0,
+                             opacidade=1.0, faixa=None):
+    """Desenha a foto no frame, com rotação, escala e opacidade opcionais.
+    
+    Escala, rotação e translação são feitas numa única warpAffine avaliada
+    apenas no retângulo do frame que a foto realmente cobre. Fotos que caem
+    totalmente fora do frame são descartadas antes de qualquer trabalho nos pixels.
+    
+    Args:
+        faixa: (y_inicio, y_fim) - desenha só as linhas do frame nesse intervalo
+               (renderização em faixas); None = frame inteiro
+    
+    Returns:
+        tuple: retângulo (x0, y0, x1, y1) do frame que foi alterado (com a
+        borda), ou None se nada foi desenhado
+    """
+    if opacidade <= 0:
+        return None
+    y_faixa, y_faixa_fim = faixa if faixa is not None else (0, altura_video)
+    
+    retangulo = None
+    if angulo == 0 and escala == 1.0 and opacidade >= 1.0:
+        # Caminho rápido: cópia direta (sem interpolação), recortada aos limites
+        x_dst_start = max(0, x)
+        y_dst_start = max(y_faixa, y)
+        x_dst_end = min(largura_video, x + largura_foto)
+        y_dst_end = min(y_faixa_fim, y + altura_foto)
+        if x_dst_end > x_dst_start and y_dst_end > y_dst_start:
+            frame[y_dst_start:y_dst_end, x_dst_start:x_dst_end] = \
+                foto[y_dst_start - y:y_dst_end - y, x_dst_start - x:x_dst_end - x]
+            retangulo = (x_dst_start, y_dst_start, x_dst_end, y_dst_end)
     else:
-        foto_trabalho = foto
-        largura_trabalho = largura_foto
-        altura_trabalho = altura_foto
-        x_trabalho = x
-        y_trabalho = y
-    
-    if angulo != 0:
-        # Rotaciona a foto (já escalada se necessário)
-        foto_rotacionada, nova_largura, nova_altura = rotacionar_imagem(
-            foto_trabalho, angulo, largura_trabalho // 2, altura_trabalho // 2
-        )
-        
-        # Ajusta a posição para manter o centro
-        x_ajustado = x_trabalho - (nova_largura - largura_trabalho) // 2
-        y_ajustado = y_trabalho - (nova_altura - altura_trabalho) // 2
+        # Transformação única: foto → frame
+        matriz = calcular_matriz_foto(x, y, largura_foto, altura_foto, angulo, escala)
+        x_inicio, y_inicio, x_fim, y_fim = calcular_caixa_transformada(matriz, largura_foto, altura_foto)
         
-        largura_atual = nova_largura
-        altura_atual = nova_altura
-        foto_atual = foto_rotacionada
-        x_atual = x_ajustado
-        y_atual = y_ajustado
-    else:
-        foto_atual = foto_trabalho
-        x_atual = x_trabalho
-        y_atual = y_trabalho
-        largura_atual = largura_trabalho
-        altura_atual = altura_trabalho
-    
-    # Calcula os limites válidos
-    x_src_start = max(0, -x_atual)
-    y_src_start = max(0, -y_atual)
-    x_src_end = min(largura_atual, largura_video - x_atual)
-    y_src_end = min(altura_atual, altura_video - y_atual)
-    
-    x_dst_start = max(0, x_atual)
-    y_dst_start = max(0, y_atual)
-    x_dst_end = min(largura_video, x_atual + largura_atual)
-    y_dst_end = min(altura_video, y_atual + altura_atual)
-    
-    # Verifica se há alguma área visível
-    if x_src_end > x_src_start and y_src_end > y_src_start:
-        # Sobrepõe apenas pixels não-brancos se houver rotação
-        if angulo != 0:
+        # Recorta a caixa transformada ao frame (descarta fotos fora da tela)
+        x_dst_start = max(0, x_inicio)
+        y_dst_start = max(y_faixa, y_inicio)
+        x_dst_end = min(largura_video, x_fim)
+        y_dst_end = min(y_faixa_fim, y_fim)
+        if x_dst_end > x_dst_start and y_dst_end > y_dst_start:
+            # Desloca a matriz para que a saída seja só a região visível
+            matriz[0, 2] -= x_dst_start
+            matriz[1, 2] -= y_dst_start
             regiao = frame[y_dst_start:y_dst_end, x_dst_start:x_dst_end]
-            foto_regiao = foto_atual[y_src_start:y_src_end, x_src_start:x_src_end]
-            
-            # Cria máscara para pixels não-brancos
-            mascara = np.any(foto_regiao < 250, axis=2)
-            regiao[mascara] = foto_regiao[mascara]
-        else:
-            frame[y_dst_start:y_dst_end, x_dst_start:x_dst_end] = \
-                foto_atual[y_src_start:y_src_end, x_src_start:x_src_end]
-        
-        # Adiciona borda apenas se estiver sem rotação e dentro dos limites
-        if angulo == 0 and x >= 0 and y >= 0 and x + largura_foto <= largura_video and y + altura_foto <= altura_video:
-            cv2.rectangle(frame, (x-1, y-1), (x+largura_foto+1, y+altura_foto+1), 
-                        (220, 220, 220), 1)
-
-def listar_imagens(pasta):
-    """Lista todas as imagens na pasta"""
-    extensoes = ['*.jpg', '*.jpeg', '*.png', '*.bmp', '*.webp', '*.jfif']
-    imagens = []
-    for ext in extensoes:
-        imagens.extend(glob.glob(os.path.join(pasta, ext)))
-        # Também busca maiúsculas
-        imagens.extend(glob.glob(os.path.join(pasta, ext.upper())))
-    
-    # Remove duplicatas e ordena
-    imagens = sorted(list(set(imagens)))
-    return imagens
-
-def criar_video_album(largura_video, altura_video, nome_saida, caminho_mascara):
-    """Cria o vídeo com efeito de álbum de fotos - todas as fotos em um único grid
+            compor_foto_transformada(regiao, foto, matriz, opacidade)
+            retangulo = (x_dst_start, y_dst_start, x_dst_end, y_dst_end)
+    
+    # Adiciona borda apenas se estiver sem rotação
+    if angulo == 0:
+        retangulo = desenhar_borda_celula(frame, retangulo, x, y, largura_foto, altura_foto,
+                                          largura_video, altura_video, faixa)
+    return retangulo
+
+def desenhar_borda_celula(frame, retangulo, x, y, largura_foto, altura_foto, largura_video, altura_video, faixa=None):
+    """Desenha a borda de 1 px da célula em volta da foto, se ela estiver inteira
+    dentro do frame (numa faixa, só as linhas da borda que caem nela).
+    Retorna o retângulo alterado somado ao da borda."""
+    if x < 0 or y < 0 or x + largura_foto > largura_video or y + altura_foto > altura_video:
+        return retangulo
+    y_faixa, y_faixa_fim = faixa if faixa is not None else (0, altura_video)
+    borda = (max(0, x - 1), max(y_faixa, y - 1),
+             min(largura_video, x + largura_foto + 2), min(y_faixa_fim, y + altura_foto + 2))
+    if borda[3] <= borda[1]:
+        return retangulo
+    cv2.rectangle(frame[y_faixa:y_faixa_fim], (x-1, y-1-y_faixa), (x+largura_foto+1, y+altura_foto+1-y_faixa),
+                (220, 220, 220), 1)
+    return borda if retangulo is None else unir_retangulos(retangulo, borda)
+
+def unir_retangulos(a, b):
+    """Menor retângulo (x0, y0, x1, y1) que contém a e b"""
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+def misturar_versoes_foto(foto_original, foto_com_mascara, mistura):
+    """Retorna a foto na transição Original → Com Máscara.
     
     Args:
-        largura_video: Largura do vídeo em pixels
-        altura_video: Altura do vídeo em pixels
-        nome_saida: Nome do arquivo de vídeo a ser gerado
-        caminho_mascara: Caminho para o arquivo de máscara (fundo) específico desta resolução
+        mistura: 0.0 = foto original, 1.0 = foto com máscara
     """
+    if mistura <= 0.0:
+        return foto_original
+    if mistura >= 1.0:
+        return foto_com_mascara
+    # Mistura em uint8 num buffer reaproveitado (a foto é consumida logo em seguida)
+    return cv2.addWeighted(foto_original, 1 - mistura, foto_com_mascara, mistura, 0,
+                           dst=obter_rascunho('mistura', foto_original.shape))
+
+def quantizar_transformacao(angulo, escala, mistura, opacidade):
+    """Arredonda ângulo, escala e fades para os degraus do cache de sprites.
+    Retorna os índices inteiros (usados na chave do cache)."""
+    passo_log = math.log1p(PASSO_ESCALA_CACHE)
+    return (
+        round(angulo / PASSO_ANGULO_CACHE),
+        round(math.log(escala) / passo_log),
+        round(mistura * PASSOS_FADE_CACHE),
+        round(opacidade * PASSOS_FADE_CACHE),
+    )
+
+def arredondar_transformacao(angulo, escala, mistura, opacidade):
+    """Ângulo, escala e fades nos degraus do cache (os valores com que os sprites
+    guardados são gerados). Com o cache ligado, toda foto em movimento é
+    desenhada com eles: com ou sem o sprite pronto, o frame sai igual - e não
+    depende de quais frames o processo renderizou antes."""
+    q_angulo, q_escala, q_mistura, q_opacidade = quantizar_transformacao(angulo, escala, mistura, opacidade)
+    return (q_angulo * PASSO_ANGULO_CACHE, (1 + PASSO_ESCALA_CACHE) ** q_escala,
+            q_mistura / PASSOS_FADE_CACHE, q_opacidade / PASSOS_FADE_CACHE)
+
+def gerar_sprite_quantizado(foto_original, foto_com_mascara, largura_foto, altura_foto,
+                            q_angulo, q_escala, q_mistura, q_opacidade):
+    """Gera o sprite transformado completo para uma transformação quantizada.
     
-    # Calcula configurações específicas para esta resolução
-    # Grid com células QUADRADAS que PREENCHEM COMPLETAMENTE o vídeo
-    # TAMANHO_CELULA_BASE reduzido para DOBRAR a quantidade de imagens!
-    # 56px = células menores = mais imagens (aprox. 2x mais que 84px)
-    TAMANHO_CELULA_BASE = 56  # Reduzido de 168 para ter ~2x mais imagens
+    Returns:
+        tuple: (cor, alpha, x_inicio, y_inicio) - x_inicio/y_inicio são o
+        deslocamento do sprite em relação ao canto da célula
+    """
+    angulo = q_angulo * PASSO_ANGULO_CACHE
+    escala = (1 + PASSO_ESCALA_CACHE) ** q_escala
+    foto = misturar_versoes_foto(foto_original, foto_com_mascara, q_mistura / PASSOS_FADE_CACHE)
+    
+    matriz = calcular_matriz_foto(0, 0, largura_foto, altura_foto, angulo, escala)
+    x_inicio, y_inicio, x_fim, y_fim = calcular_caixa_transformada(matriz, largura_foto, altura_foto)
+    matriz[0, 2] -= x_inicio
+    matriz[1, 2] -= y_inicio
+    cor, alpha = transformar_foto(foto, matriz, (x_fim - x_inicio, y_fim - y_inicio),
+                                  q_opacidade / PASSOS_FADE_CACHE)
+    return cor, alpha, x_inicio, y_inicio
+
+# Marca de obter_sprite_animado para fotos invisíveis (opacidade quantizada zero)
+SPRITE_INVISIVEL = ()
+
+def obter_sprite_animado(indice, foto_original, foto_com_mascara, x, y, largura_foto, altura_foto,
+                         largura_video, altura_video, angulo, escala, mistura, opacidade, cache):
+    """Sprite transformado (cor, alpha, x_inicio, y_inicio) de uma foto em movimento,
+    do cache ou gerado (e guardado) agora.
+    
+    Gerar o sprite inteiro só compensa se ele for reaproveitado: só entra no
+    cache o sprite que cabe inteiro no frame (senão o desenho direto, recortado
+    à parte visível, sai mais barato) e que já foi pedido antes - na cauda
+    lenta do easing a mesma transformação quantizada se repete por vários
+    frames; no meio do movimento, quase nunca.
+    
+    Returns:
+        o sprite; None se ele não estiver no cache e não valer a pena guardá-lo
+        (a foto é desenhada direto, só na parte visível); ou SPRITE_INVISIVEL
+    """
+    q_angulo, q_escala, q_mistura, q_opacidade = quantizar_transformacao(angulo, escala, mistura, opacidade)
+    if q_opacidade <= 0:
+        return SPRITE_INVISIVEL
+    
+    chave = (indice, q_angulo, q_escala, q_mistura, q_opacidade)
+    sprite = cache.obter(chave)
+    if sprite is None:
+        matriz = calcular_matriz_foto(x, y, largura_foto, altura_foto, angulo, escala)
+        x_inicio, y_inicio, x_fim, y_fim = calcular_caixa_transformada(matriz, largura_foto, altura_foto)
+        if x_inicio < 0 or y_inicio < 0 or x_fim > largura_video or y_fim > altura_video:
+            return None
+        # Sprite completo: cor + alpha = 4 bytes por pixel
+        if not cache.cabe((x_fim - x_inicio + 2) * (y_fim - y_inicio + 2) * 4) or not cache.admitir(chave):
+            return None
+        sprite = gerar_sprite_quantizado(foto_original, foto_com_mascara, largura_foto, altura_foto,
+                                         q_angulo, q_escala, q_mistura, q_opacidade)
+        cache.guardar(chave, sprite, sprite[0].nbytes + sprite[1].nbytes)
+    return sprite
+
+def compor_sprite(frame, sprite, x, y, largura_video, faixa):
+    """Compõe o sprite (com o canto da célula em x, y) nas linhas faixa = (y_inicio, y_fim)
+    do frame. Retorna o retângulo alterado, ou None se o sprite não cai nelas."""
+    cor, alpha, x_inicio, y_inicio = sprite
+    x_sprite = x + x_inicio
+    y_sprite = y + y_inicio
+    
+    # Recorta o sprite aos limites do frame (descarta se estiver fora da tela)
+    x_dst_start = max(0, x_sprite)
+    y_dst_start = max(faixa[0], y_sprite)
+    x_dst_end = min(largura_video, x_sprite + cor.shape[1])
+    y_dst_end = min(faixa[1], y_sprite + cor.shape[0])
+    if x_dst_end <= x_dst_start or y_dst_end <= y_dst_start:
+        return None
     
-    # Calcula o tamanho da célula que melhor se ajusta à resolução atual
-    # Tenta encontrar um divisor comum que resulte em células próximas de 56px
-    melhor_tamanho = None
-    melhor_diferenca = float('inf')
+    misturar_sobre_regiao(
+        frame[y_dst_start:y_dst_end, x_dst_start:x_dst_end],
+        cor[y_dst_start - y_sprite:y_dst_end - y_sprite, x_dst_start - x_sprite:x_dst_end - x_sprite],
+        alpha[y_dst_start - y_sprite:y_dst_end - y_sprite, x_dst_start - x_sprite:x_dst_end - x_sprite]
+    )
+    return (x_dst_start, y_dst_start, x_dst_end, y_dst_end)
+
+def desenhar_foto_animada(frame, indice, foto_original, foto_com_mascara, x, y,
+                          largura_foto, altura_foto, largura_video, altura_video,
+                          angulo, escala, mistura, opacidade, cache=None, faixa=None):
+    """Desenha uma foto em movimento (entrada ou saída).
+    
+    Sem cache, mistura as versões da foto e desenha com desenhar_foto_em_posicao.
+    Com cache, a transformação é quantizada e o sprite completo (cor + alpha) é
+    procurado no cache - a saída repete a trajetória da entrada ao contrário,
+    então os mesmos sprites servem para as duas fases. Se ele não estiver lá,
+    a foto é desenhada direto com a mesma transformação quantizada (o sprite
+    só é gerado quando deve ser reaproveitado: ver obter_sprite_animado).
     
-    for tentativa in range(30, 150):  # Testa tamanhos entre 30 e 150 pixels (células menores)
-        cols = largura_video // tentativa
-        rows = altura_video // tentativa
+    Args:
+        indice: Índice da foto no plano (identifica a foto na chave do cache)
+        mistura: 0.0 = foto original, 1.0 = foto com máscara
+        opacidade: 0.0 = invisível, 1.0 = opaca
+        cache: CacheSprites compartilhado (ou None)
+        faixa: (y_inicio, y_fim) - desenha só essas linhas do frame (None = frame inteiro)
+    
+    Returns:
+        tuple: retângulo (x0, y0, x1, y1) do frame que foi alterado, ou None
+    """
+    sprite = None
+    if cache is not None:
+        sprite = obter_sprite_animado(indice, foto_original, foto_com_mascara, x, y, largura_foto, altura_foto,
+                                      largura_video, altura_video, angulo, escala, mistura, opacidade, cache)
+        if sprite is SPRITE_INVISIVEL:
+            return None
+        angulo, escala, mistura, opacidade = arredondar_transformacao(angulo, escala, mistura, opacidade)
+    if sprite is None:
+        # Sem cache ou sprite fora do cache: desenha só a parte visível
+        return desenhar_foto_em_posicao(
+            frame, misturar_versoes_foto(foto_original, foto_com_mascara, mistura),
+            x, y,
+            largura_foto, altura_foto,
+            largura_video, altura_video,
+            angulo=angulo,
+            escala=escala,
+            opacidade=opacidade,
+            faixa=faixa
+        )
+    retangulo = compor_sprite(frame, sprite, x, y, largura_video, faixa if faixa is not None else (0, altura_video))
+    if angulo == 0:
+        # A mesma borda de desenhar_foto_em_posicao: o cache não muda a imagem
+        retangulo = desenhar_borda_celula(frame, retangulo, x, y, largura_foto, altura_foto,
+                                          largura_video, altura_video, faixa)
+    return retangulo
+
+class RenderizadorAlbum:
+    """Gera qualquer frame do vídeo (entrada + pausa + saída) a partir do plano da animação.
+    
+    Dado o plano (PlanoAnimacao) e as fotos preparadas, cada frame é função
+    apenas do seu índice. Internamente o renderizador mantém as camadas
+    estáticas (fotos assentadas na entrada e grid com "buracos" na saída) e as
+    avança de forma incremental quando os frames são pedidos em ordem; se um
+    frame anterior for pedido, as camadas são reconstruídas até ele. Assim o
+    mesmo objeto serve tanto para gerar o vídeo inteiro em sequência quanto
+    para gerar trechos independentes em processos separados.
+    
+    Tudo é desenhado em BGR (fotos e máscara já são preparadas assim), a ordem
+    de canais do codificador: os frames vão direto para o vídeo, sem conversão.
+    
+    Com RENDERIZACAO_DELTA, quando o frame é desenhado num buffer já usado
+    antes (PoolFrames), só são restauradas as regiões "sujas": os retângulos
+    das fotos desenhadas nele da última vez e os que mudaram na camada
+    estática desde então. As fotos em movimento são desenhadas por cima.
+    """
+    
+    def __init__(self, plano, fotos_originais, fotos_com_mascara, frame_final, frames_pausa=0, altura_faixa=0):
+        """
+        Args:
+            plano: PlanoAnimacao com a trajetória de todas as fotos
+            fotos_originais: Array (N, altura_foto, largura_foto, 3) com as fotos sem máscara
+            fotos_com_mascara: Array (N, altura_foto, largura_foto, 3) com as fotos com máscara
+            frame_final: Grid completo (todas as fotos assentadas)
+            frames_pausa: Frames parados entre a entrada e a saída
+            altura_faixa: Compõe as fotos em movimento em faixas desta altura (0 = frame inteiro)
+        """
+        self.plano = plano
+        self.fotos_originais = fotos_originais
+        self.fotos_com_mascara = fotos_com_mascara
+        self.frame_final = frame_final
+        self.largura_foto = plano.largura_foto
+        self.altura_foto = plano.altura_foto
+        self.largura_video = plano.largura_video
+        self.altura_video = plano.altura_video
         
-        # Verifica se divide perfeitamente (sem barras brancas)
-        if cols * tentativa == largura_video and rows * tentativa == altura_video:
-            diferenca = abs(tentativa - TAMANHO_CELULA_BASE)
-            if diferenca < melhor_diferenca:
-                melhor_tamanho = tentativa
-                melhor_diferenca = diferenca
+        # Linha do tempo: entrada → pausa → saída (a saída repete as ondas da entrada)
+        self.frames_entrada = plano.frames_animacao
+        self.frames_pausa = frames_pausa
+        self.frames_saida = self.frames_entrada
+        self.total_frames = self.frames_entrada + self.frames_pausa + self.frames_saida
+        
+        self.altura_faixa = altura_faixa
+        self.frame_base_branco = np.full((self.altura_video, self.largura_video, 3), 255, dtype=np.uint8)
+        self.cache_sprites = None
+        self.memoria_cache_mb = MEMORIA_CACHE_SPRITES_MB  # Orçamento do cache neste processo
+        self.areas_repintadas = []  # Pixels do fundo (camada estática) repintados em cada frame
+        self._reiniciar_camadas()
+    
+    def __getstate__(self):
+        # Camadas e cache são reconstruídos em cada processo (não vale a pena copiar)
+        estado = self.__dict__.copy()
+        for campo in ('cache_sprites', 'camada_assentada', 'camada_saida', '_buffers', '_mudancas'):
+            estado[campo] = None
+        estado['areas_repintadas'] = []
+        # Fotos vindas do atlas da grade (memory-mapped): cada processo reabre o
+        # arquivo em vez de receber uma cópia das fotos
+        arquivo_atlas = getattr(self.fotos_originais, 'filename', None)
+        if arquivo_atlas is not None and getattr(self.fotos_com_mascara, 'filename', None) == arquivo_atlas:
+            estado['fotos_originais'] = estado['fotos_com_mascara'] = None
+            estado['_arquivo_atlas'] = arquivo_atlas
+        return estado
+    
+    def __setstate__(self, estado):
+        arquivo_atlas = estado.pop('_arquivo_atlas', None)
+        self.__dict__.update(estado)
+        if arquivo_atlas is not None:
+            atlas_grade = np.load(arquivo_atlas, mmap_mode='r')
+            self.fotos_originais, self.fotos_com_mascara = atlas_grade[0], atlas_grade[1]
+        self._reiniciar_camadas()
+    
+    def _reiniciar_camadas(self):
+        # CAMADA DE FOTOS ASSENTADAS (entrada)
+        # Canvas persistente: cada foto (com sua borda) é desenhada UMA única vez,
+        # no frame em que sua onda termina.
+        self.camada_assentada = self.frame_base_branco.copy()
+        self.fotos_assentadas = 0  # Fotos já desenhadas na camada (sempre as primeiras do plano)
+        self.ultimo_frame_entrada = -1
+        
+        # GRID PRÉ-RENDERIZADO COM "BURACOS" (saída)
+        # A saída parte de uma cópia do grid completo (frame_final). Quando uma foto
+        # começa a sair, a sua célula é limpa para branco UMA única vez.
+        self.camada_saida = self.frame_final.copy()
+        self.fotos_com_buraco = 0  # Fotos cujas células já foram limpas (começaram a sair)
+        self.ultimo_frame_saida = -1
+        
+        # RETÂNGULOS SUJOS (renderização delta)
+        # Regiões alteradas em cada camada estática, em ordem, e o que cada buffer
+        # de frame contém: (buffer, camada, mudanças já aplicadas, retângulos das fotos)
+        self._mudancas = {'entrada': [], 'pausa': [], 'saida': []}
+        self._buffers = {}
+    
+    def _restaurar_fundo(self, destino, fase, camada):
+        """Deixa no destino a camada estática da fase, copiando só as regiões
+        sujas quando o buffer já contém um frame anterior desta mesma camada.
+        Retorna a área (em pixels) restaurada."""
+        area_frame = self.largura_video * self.altura_video
+        anterior = self._buffers.get(id(destino))
+        with metricas.medir('restauracao_fundo'):
+            if RENDERIZACAO_DELTA and anterior is not None and anterior[0] is destino and anterior[1] == fase:
+                retangulos = anterior[3] + self._mudancas[fase][anterior[2]:]
+                area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in retangulos)
+                if area < area_frame * FRACAO_MAXIMA_DELTA:
+                    for x0, y0, x1, y1 in retangulos:
+                        destino[y0:y1, x0:x1] = camada[y0:y1, x0:x1]
+                    return area
+            np.copyto(destino, camada)
+        return area_frame
+    
+    def _registrar_frame(self, destino, fase, retangulos, area_restaurada):
+        """Guarda o que ficou no buffer (para o próximo uso) e a área restaurada"""
+        if RENDERIZACAO_DELTA:
+            if id(destino) not in self._buffers and len(self._buffers) >= 64:
+                self._buffers.pop(next(iter(self._buffers)))  # Buffers descartáveis: não acumula
+            self._buffers[id(destino)] = (destino, fase, len(self._mudancas[fase]), retangulos)
+        self.areas_repintadas.append(area_restaurada)
+    
+    def estatisticas_delta(self):
+        """Área do fundo repintada por frame (frames renderizados por este processo)"""
+        return calcular_estatisticas_delta(self.areas_repintadas, self.largura_video * self.altura_video)
+    
+    def obter_cache(self):
+        """Cache de sprites do processo atual (criado na primeira vez que é usado)"""
+        if self.cache_sprites is None and self.memoria_cache_mb > 0:
+            self.cache_sprites = CacheSprites(self.memoria_cache_mb)
+        return self.cache_sprites
+    
+    def renderizar(self, indice_frame, destino=None):
+        """Retorna o frame (BGR) de índice indice_frame da linha do tempo completa.
+        Com destino (array do tamanho do vídeo, ex.: de um PoolFrames), o frame é
+        desenhado nele em vez de num array novo."""
+        registro = metricas.registro
+        if registro is None:
+            return self._renderizar(indice_frame, destino)
+        registro.iniciar_frame()
+        frame = self._renderizar(indice_frame, destino)
+        registro.fechar_frame()
+        return frame
+    
+    def _renderizar(self, indice_frame, destino):
+        if destino is None:
+            destino = np.empty_like(self.frame_base_branco)
+        if indice_frame < self.frames_entrada:
+            return self.renderizar_entrada(indice_frame, destino)
+        indice_frame -= self.frames_entrada
+        if indice_frame < self.frames_pausa:
+            # Pausa no meio - todas as fotos visíveis
+            area = self._restaurar_fundo(destino, 'pausa', self.frame_final)
+            self._registrar_frame(destino, 'pausa', [], area)
+            return destino
+        return self.renderizar_saida(indice_frame - self.frames_pausa, destino)
+    
+    def _desenhar_fotos_animadas(self, frame, estado):
+        """Desenha, na ordem do estado, todas as fotos em movimento de um frame.
+        Retorna os retângulos do frame alterados pelas fotos."""
+        cache_sprites = self.obter_cache()
+        campos = zip(*(campo.tolist() for campo in estado[:-1]))
+        if 0 < self.altura_faixa < self.altura_video:
+            retangulos = self._desenhar_em_faixas(frame, campos, cache_sprites)
+            metricas.contar('fotos_desenhadas', len(retangulos))
+            return retangulos
+        retangulos = []
+        for indice, x, y, angulo, escala, mistura, opacidade in campos:
+            retangulo = desenhar_foto_animada(
+                frame, indice,
+                self.fotos_originais[indice], self.fotos_com_mascara[indice],
+                x, y,
+                self.largura_foto, self.altura_foto,
+                self.largura_video, self.altura_video,
+                angulo=angulo,
+                escala=escala,
+                mistura=mistura,
+                opacidade=opacidade,
+                cache=cache_sprites
+            )
+            if retangulo is not None:
+                retangulos.append(retangulo)
+        metricas.contar('fotos_desenhadas', len(retangulos))
+        return retangulos
     
-    # Se não encontrou divisor perfeito, usa o mais próximo possível
-    if melhor_tamanho is None:
-        melhor_tamanho = largura_video // (largura_video // TAMANHO_CELULA_BASE)
+    def _desenhar_em_faixas(self, frame, campos, cache_sprites):
+        """Desenha as fotos em movimento faixa por faixa (de cima para baixo).
+        
+        Cada foto é resolvida uma vez por frame (sprite do cache, ou desenho
+        direto) com as linhas que ela cobre; depois, em cada faixa, as fotos que
+        caem nela são compostas na ordem do estado - dentro de uma faixa a ordem
+        de sobreposição é a mesma do frame inteiro. Fotos desenhadas direto
+        passam pela warpAffine só no pedaço de cada faixa: nenhum buffer
+        temporário passa de largura x altura_faixa pixels.
+        
+        O frame NÃO é bit a bit igual ao do frame inteiro: a warpAffine calcula
+        as coordenadas de origem de cada pixel a partir do canto da saída, e o
+        canto de cada pedaço é outro. Alguns pixels das fotos desenhadas direto
+        saem 1 nível diferente (por canal, nunca mais que isso).
+        Retorna um retângulo (a união dos pedaços) por foto desenhada."""
+        fotos = []
+        for indice, x, y, angulo, escala, mistura, opacidade in campos:
+            sprite = None
+            if cache_sprites is not None:
+                sprite = obter_sprite_animado(indice, self.fotos_originais[indice], self.fotos_com_mascara[indice],
+                                              x, y, self.largura_foto, self.altura_foto,
+                                              self.largura_video, self.altura_video,
+                                              angulo, escala, mistura, opacidade, cache_sprites)
+                if sprite is SPRITE_INVISIVEL:
+                    continue
+                angulo, escala, mistura, opacidade = arredondar_transformacao(angulo, escala, mistura, opacidade)
+            if sprite is not None:
+                y_inicio = y + sprite[3]
+                y_fim = y_inicio + sprite[0].shape[0]
+            elif opacidade > 0:
+                matriz = calcular_matriz_foto(x, y, self.largura_foto, self.altura_foto, angulo, escala)
+                _, y_inicio, _, y_fim = calcular_caixa_transformada(matriz, self.largura_foto, self.altura_foto)
+            else:
+                continue
+            if angulo == 0:
+                # A borda da célula passa 1-2 linhas da foto
+                y_inicio, y_fim = min(y_inicio, y - 1), max(y_fim, y + self.altura_foto + 2)
+            fotos.append((indice, x, y, angulo, escala, mistura, opacidade, sprite, y_inicio, y_fim))
+        
+        retangulos = {}  # Posição da foto no estado -> retângulo alterado
+        for y_faixa in range(0, self.altura_video, self.altura_faixa):
+            faixa = (y_faixa, min(self.altura_video, y_faixa + self.altura_faixa))
+            for posicao, (indice, x, y, angulo, escala, mistura, opacidade, sprite, y_inicio, y_fim) in enumerate(fotos):
+                if y_fim <= faixa[0] or y_inicio >= faixa[1]:
+                    continue
+                if sprite is None:
+                    retangulo = desenhar_foto_em_posicao(
+                        frame,
+                        misturar_versoes_foto(self.fotos_originais[indice], self.fotos_com_mascara[indice], mistura),
+                        x, y,
+                        self.largura_foto, self.altura_foto,
+                        self.largura_video, self.altura_video,
+                        angulo=angulo,
+                        escala=escala,
+                        opacidade=opacidade,
+                        faixa=faixa
+                    )
+                else:
+                    retangulo = compor_sprite(frame, sprite, x, y, self.largura_video, faixa)
+                    if angulo == 0:
+                        retangulo = desenhar_borda_celula(frame, retangulo, x, y, self.largura_foto, self.altura_foto,
+                                                          self.largura_video, self.altura_video, faixa)
+                if retangulo is not None:
+                    anterior = retangulos.get(posicao)
+                    retangulos[posicao] = retangulo if anterior is None else unir_retangulos(anterior, retangulo)
+        return list(retangulos.values())
+    
+    def renderizar_entrada(self, frame_atual, destino):
+        """Frame da animação de entrada: camada assentada + fotos ainda em movimento"""
+        if frame_atual < self.ultimo_frame_entrada:
+            self._reiniciar_camadas()
+        self.ultimo_frame_entrada = frame_atual
+        
+        # Assenta na camada as fotos que terminaram o movimento até este frame
+        # (todas as ondas têm a mesma duração, então terminam na ordem em que começam)
+        plano = self.plano
+        concluidas = plano.fotos_concluidas(frame_atual)
+        for i in range(self.fotos_assentadas, concluidas):
+            indice = int(plano.indice[i])
+            retangulo = desenhar_foto_em_posicao(
+                self.camada_assentada, self.fotos_com_mascara[indice],  # Usa versão COM MÁSCARA quando estática
+                int(plano.x_final[i]), int(plano.y_final[i]),
+                self.largura_foto, self.altura_foto,
+                self.largura_video, self.altura_video,
+                angulo=0,
+                escala=1.0
+            )
+            if retangulo is not None:
+                self._mudancas['entrada'].append(retangulo)
+        self.fotos_assentadas = max(self.fotos_assentadas, concluidas)
+        
+        # Começa com as fotos já assentadas (fundo branco + ondas concluídas)
+        frame = destino
+        area = self._restaurar_fundo(frame, 'entrada', self.camada_assentada)
+        
+        # Fotos em movimento: posição, ângulo, escala, fades e easing de todas
+        # elas calculados de uma vez pelo plano (ver PlanoAnimacao.estado_entrada)
+        retangulos = self._desenhar_fotos_animadas(frame, plano.estado_entrada(frame_atual))
+        self._registrar_frame(frame, 'entrada', retangulos, area)
+        
+        return frame
     
-    TAMANHO_CELULA = melhor_tamanho
-    FOTOS_POR_LINHA = largura_video // TAMANHO_CELULA
-    FOTOS_POR_COLUNA = altura_video // TAMANHO_CELULA
+    def renderizar_saida(self, frame_atual, destino):
+        """Frame da animação de saída: grid com buracos + fotos saindo por cima"""
+        if frame_atual < self.ultimo_frame_saida:
+            self._reiniciar_camadas()
+        self.ultimo_frame_saida = frame_atual
+        
+        # Abre os buracos das fotos que começaram a sair até este frame
+        plano = self.plano
+        iniciadas = plano.fotos_iniciadas(frame_atual)
+        for i in range(self.fotos_com_buraco, iniciadas):
+            x_final, y_final = int(plano.x_final[i]), int(plano.y_final[i])
+            self.camada_saida[y_final:y_final + self.altura_foto,
+                              x_final:x_final + self.largura_foto] = 255
+            self._mudancas['saida'].append((x_final, y_final,
+                                            min(self.largura_video, x_final + self.largura_foto),
+                                            min(self.altura_video, y_final + self.altura_foto)))
+        self.fotos_com_buraco = max(self.fotos_com_buraco, iniciadas)
+        
+        # 1. CAMADA INFERIOR: grid com as fotos que ainda não começaram a sair
+        #    (versão COM MÁSCARA, já desenhada em frame_final)
+        frame = destino
+        area = self._restaurar_fundo(frame, 'saida', self.camada_saida)
+        
+        # 2. CAMADAS SUPERIORES: Todas as fotos ANIMANDO (saindo)
+        #    Já vêm ordenadas por progresso para criar profundidade
+        #    MAIOR progresso = desenhada POR ÚLTIMO = fica mais POR CIMA
+        retangulos = self._desenhar_fotos_animadas(frame, plano.estado_saida(frame_atual))
+        self._registrar_frame(frame, 'saida', retangulos, area)
+        
+        return frame
     
-    print("\n" + "="*70)
-    print(f"GERANDO VIDEO: {nome_saida}")
-    print("="*70)
-    print(f"Resolucao: {largura_video}x{altura_video}")
-    print(f"\nGrid calculado automaticamente para CELULAS QUADRADAS:")
-    print(f"   Resolucao do video: {largura_video}x{altura_video}")
-    print(f"   Tamanho da celula: {TAMANHO_CELULA}x{TAMANHO_CELULA} pixels (1:1 - quadrada)")
-    print(f"   Grid resultante: {FOTOS_POR_LINHA} colunas x {FOTOS_POR_COLUNA} linhas")
-    print(f"   Total de posicoes: {FOTOS_POR_LINHA * FOTOS_POR_COLUNA}")
+    def estatisticas_cache(self):
+        """Estatísticas do cache de sprites deste processo (ou None se desativado)"""
+        return self.cache_sprites.estatisticas() if self.cache_sprites is not None else None
+
+# Renderizador do processo trabalhador (definido uma vez por processo no pool)
+_renderizador_trabalhador = None
+
+def _inicializar_trabalhador(renderizador, com_metricas=False, processos=1):
+    """Inicializa um processo do pool com o renderizador compartilhado.
+    Com 'fork' (Linux/macOS) o objeto é herdado por cópia-na-escrita, sem cópia
+    real das fotos; com 'spawn' (Windows) ele é serializado uma vez por processo.
+    O orçamento do cache de sprites é dividido entre os processos (cada um tem
+    o seu cache). Com métricas, o processo começa um registro próprio (não o
+    herdado do pai)."""
+    global _renderizador_trabalhador
+    _renderizador_trabalhador = renderizador
+    renderizador.memoria_cache_mb /= max(1, processos)
+    if com_metricas:
+        metricas.ativar()
+    else:
+        metricas.desativar()
+
+# Frames do trecho, reaproveitados entre trechos do mesmo processo (cada
+# posição guarda o frame do trecho anterior: a renderização delta vale aqui também).
+# As vistas de cada posição são criadas uma vez: o renderizador reconhece o
+# buffer pelo próprio objeto, e frames[i] criaria uma vista nova a cada trecho
+_frames_trabalhador = None
+_posicoes_trabalhador = None
+
+def _renderizar_trecho(inicio, fim, passo=1):
+    """Renderiza os frames range(inicio, fim, passo) no processo trabalhador, num
+    único array (frames, altura, largura, 3) reaproveitado entre os trechos.
+    As métricas do trecho (se ligadas) seguem junto e o registro recomeça."""
+    global _frames_trabalhador, _posicoes_trabalhador
+    renderizador = _renderizador_trabalhador
+    indices = range(inicio, fim, passo)
+    if _frames_trabalhador is None or _frames_trabalhador.shape[0] < len(indices):
+        _frames_trabalhador = np.empty((len(indices),) + renderizador.frame_base_branco.shape, dtype=np.uint8)
+        _posicoes_trabalhador = list(_frames_trabalhador)
+    frames = _frames_trabalhador[:len(indices)]
+    primeira_area = len(renderizador.areas_repintadas)
+    for posicao, indice_frame in enumerate(indices):
+        renderizador.renderizar(indice_frame, _posicoes_trabalhador[posicao])
+    registro = metricas.registro
+    if registro is not None:
+        registro = registro.exportar()
+        metricas.ativar()
+    return (os.getpid(), frames, renderizador.estatisticas_cache(),
+            renderizador.areas_repintadas[primeira_area:], registro)
+
+class PoolFrames:
+    """Alguns frames do tamanho do vídeo, reaproveitados em rodízio.
     
-    # ============================================================
-    # FASE 1: PREPARAÇÃO - Análise e Processamento das Imagens
-    # ============================================================
-    print("\n" + "="*60)
-    print("FASE 1: PREPARAÇÃO DAS IMAGENS")
-    print("="*60)
+    Com a thread de escrita, até frames_na_fila frames esperam na fila e mais
+    um está sendo codificado: com frames_na_fila + 2 buffers, o próximo da
+    vez nunca está em uso, e o laço de frames não aloca nada do tamanho do vídeo.
+    """
     
-    # Lista todas as imagens
-    lista_imagens = listar_imagens(PASTA_IMAGENS)
-    print(f"\n📸 Encontradas {len(lista_imagens)} imagens na pasta MOSAIC")
+    def __init__(self, forma, quantidade):
+        self.buffers = [np.empty(forma, dtype=np.uint8) for _ in range(max(1, quantidade))]
+        self._proximo = 0
     
-    if not lista_imagens:
-        print("❌ Nenhuma imagem encontrada na pasta MOSAIC!")
-        return
+    def proximo(self):
+        buffer = self.buffers[self._proximo]
+        self._proximo = (self._proximo + 1) % len(self.buffers)
+        return buffer
+
+def calcular_estatisticas_delta(areas_repintadas, area_frame):
+    """Resumo da área do fundo repintada por frame, como fração do frame inteiro
+    (sem a renderização delta, seria sempre 100%)"""
+    if not areas_repintadas:
+        return None
+    fracoes = np.asarray(areas_repintadas, dtype=np.float64) / area_frame
+    return {
+        'frames': len(fracoes),
+        'fracao_media': float(fracoes.mean()),
+        'fracao_mediana': float(np.median(fracoes)),
+        'fracao_p95': float(np.percentile(fracoes, 95)),
+        'fracao_maxima': float(fracoes.max()),
+    }
+
+def somar_estatisticas_cache(lista_estatisticas):
+    """Soma as estatísticas de cache de vários processos em um único dicionário"""
+    lista_estatisticas = [e for e in lista_estatisticas if e is not None]
+    if not lista_estatisticas:
+        return None
+    total = {campo: sum(e[campo] for e in lista_estatisticas)
+             for campo in ('acertos', 'falhas', 'descartes', 'itens', 'mb_usados', 'mb_limite')}
+    consultas = total['acertos'] + total['falhas']
+    total['taxa_acertos'] = total['acertos'] / consultas if consultas else 0.0
+    return total
+
+def escrever_frames(renderizador, video, workers=1, frames_por_trecho=FRAMES_POR_TRECHO,
+                    frames_na_fila=FRAMES_NA_FILA_ESCRITA, passo_frames=1):
+    """Renderiza todos os frames e os escreve no vídeo, EM ORDEM.
     
-    # Calcula dimensões de cada foto no grid (CÉLULAS QUADRADAS - sem margens)
-    margem = 0
-    largura_foto = TAMANHO_CELULA  # Células quadradas
-    altura_foto = TAMANHO_CELULA   # Células quadradas
+    A escrita roda numa thread própria (EscritorAssincrono) com uma fila de até
+    frames_na_fila frames: a renderização segue enquanto o codificador trabalha.
+    Com 1 processo, os frames são desenhados nos buffers de um PoolFrames.
     
-    total_posicoes = FOTOS_POR_LINHA * FOTOS_POR_COLUNA
+    Com workers > 1, os frames são divididos em trechos consecutivos que são
+    renderizados em processos separados e remontados na ordem original antes
+    de ir para o codificador. No máximo 2 trechos por processo ficam na
+    fila, para limitar a memória usada por frames prontos esperando a escrita.
     
-    print(f"\n📏 Configuração do Grid:")
-    print(f"   • Resolução do vídeo: {largura_video}x{altura_video}")
-    print(f"   • Grid: {FOTOS_POR_LINHA}x{FOTOS_POR_COLUNA} = {total_posicoes} posições")
-    print(f"   • Tamanho de cada célula: {largura_foto}x{altura_foto} pixels ✅ QUADRADA")
-    print(f"   • Proporção da célula: 1:1 (quadrada - mínimo corte possível)")
+    Com passo_frames > 1 (modo proxy), só 1 a cada passo_frames frames da linha
+    do tempo é renderizado e escrito.
     
-    # Ajusta a lista de imagens para preencher o grid
-    if len(lista_imagens) > total_posicoes:
-        print(f"\n⚠️  Existem {len(lista_imagens)} fotos mas apenas {total_posicoes} posições")
-        print(f"   → Usando apenas as primeiras {total_posicoes} fotos")
-        lista_imagens = lista_imagens[:total_posicoes]
-    elif len(lista_imagens) < total_posicoes:
-        fotos_faltantes = total_posicoes - len(lista_imagens)
-        print(f"\n⚠️  Faltam {fotos_faltantes} fotos para completar o grid")
-        print(f"   → Duplicando fotos aleatórias para completar")
-        
-        # Sorteia fotos aleatórias para duplicar
-        fotos_originais = lista_imagens.copy()
-        for _ in range(fotos_faltantes):
-            foto_duplicada = random.choice(fotos_originais)
-            lista_imagens.append(foto_duplicada)
+    Returns:
+        dict: estatísticas do cache de sprites (somadas entre os processos) ou None
+    """
+    if frames_na_fila <= 0:
+        pool_frames = PoolFrames(renderizador.frame_base_branco.shape, 1) if workers <= 1 else None
+        estatisticas_cache, areas_repintadas = _escrever_frames(
+            renderizador, video, workers, frames_por_trecho, pool_frames, passo_frames)
+    else:
+        escritor = EscritorAssincrono(video, frames_na_fila)
+        try:
+            pool_frames = PoolFrames(renderizador.frame_base_branco.shape, frames_na_fila + 2) if workers <= 1 else None
+            estatisticas_cache, areas_repintadas = _escrever_frames(
+                renderizador, escritor, workers, frames_por_trecho, pool_frames, passo_frames)
+        finally:
+            escritor.esperar()
         
-        print(f"   ✅ Grid completo com {len(lista_imagens)} fotos (incluindo {fotos_faltantes} duplicadas)")
+        fila = escritor.estatisticas()
+        metricas.anotar('fila_escrita', fila)
+        print(f"  📮 Fila de escrita: profundidade média {fila['profundidade_media']:.1f} de {fila['tamanho_fila']} "
+              f"(máx. {fila['profundidade_maxima']}) | codificando {fila['segundos_codificando']:.1f}s")
+        print(f"     Renderização esperou o codificador {fila['segundos_bloqueado']:.1f}s | "
+              f"codificador esperou a renderização {fila['segundos_ocioso']:.1f}s")
+    
+    imprimir_estatisticas_delta(areas_repintadas, renderizador)
+    return estatisticas_cache
+
+def imprimir_estatisticas_delta(areas_repintadas, renderizador):
+    """Mostra (e guarda nas métricas) quanto do fundo foi repintado por frame"""
+    delta = calcular_estatisticas_delta(areas_repintadas, renderizador.largura_video * renderizador.altura_video)
+    metricas.anotar('renderizacao_delta', delta)
+    if delta is not None:
+        print(f"  🧩 Fundo repintado por frame: média {delta['fracao_media'] * 100:.1f}% | "
+              f"mediana {delta['fracao_mediana'] * 100:.1f}% | p95 {delta['fracao_p95'] * 100:.1f}% | "
+              f"máx. {delta['fracao_maxima'] * 100:.1f}%{'' if RENDERIZACAO_DELTA else ' (delta desativada)'}")
+
+def _escrever_frames(renderizador, video, workers, frames_por_trecho, pool_frames, passo_frames=1):
+    """Laço de renderização de escrever_frames (com 1 processo, desenha nos buffers de pool_frames).
+    Retorna (estatísticas do cache, área repintada em cada frame, em ordem)."""
+    total = renderizador.total_frames
+    
+    if workers <= 1:
+        for indice_frame in range(0, total, passo_frames):
+            if indice_frame % 300 < passo_frames:  # A cada 10 segundos
+                print(f"     Frame {indice_frame}/{total} ({indice_frame / total * 100:.1f}%)")
+            video.escrever(renderizador.renderizar(indice_frame, pool_frames.proximo()))
+        return renderizador.estatisticas_cache(), renderizador.areas_repintadas
+    
+    # Fork compartilha as fotos preparadas com os processos sem copiá-las
+    metodos = multiprocessing.get_all_start_methods()
+    contexto = multiprocessing.get_context('fork' if 'fork' in metodos else 'spawn')
+    tamanho_trecho = frames_por_trecho * passo_frames
+    trechos = [(inicio, min(inicio + tamanho_trecho, total), passo_frames)
+               for inicio in range(0, total, tamanho_trecho)]
+    estatisticas_por_processo = {}
+    areas_repintadas = []
+    
+    registro = metricas.registro
+    with contexto.Pool(workers, initializer=_inicializar_trabalhador,
+                       initargs=(renderizador, registro is not None, workers)) as pool:
+        pendentes = deque()
+        proximo_trecho = 0
+        frames_escritos = 0
+        while proximo_trecho < len(trechos) or pendentes:
+            # Mantém a fila cheia (até 2 trechos por processo)
+            while proximo_trecho < len(trechos) and len(pendentes) < 2 * workers:
+                pendentes.append(pool.apply_async(_renderizar_trecho, trechos[proximo_trecho]))
+                proximo_trecho += 1
+            
+            # Escreve o trecho mais antigo assim que ficar pronto (ordem preservada)
+            pid, frames, estatisticas, areas, metricas_trecho = pendentes.popleft().get()
+            estatisticas_por_processo[pid] = estatisticas
+            areas_repintadas.extend(areas)
+            if registro is not None:
+                registro.incorporar(metricas_trecho)
+            for frame_bgr in frames:
+                if frames_escritos % 300 < passo_frames:
+                    print(f"     Frame {frames_escritos}/{total} ({frames_escritos / total * 100:.1f}%)")
+                video.escrever(frame_bgr)
+                frames_escritos += passo_frames
+    
+    return somar_estatisticas_cache(estatisticas_por_processo.values()), areas_repintadas
+
+def gravar_segmento(renderizador, inicio, fim, passo, caminho, largura, altura, fps, codificador, frames_na_fila,
+                    pool_frames):
+    """Renderiza os frames range(inicio, fim, passo) num arquivo só deles (um
+    codificador novo: o arquivo começa num quadro-chave e não depende de nenhum
+    outro). Grava em <segmento>.parcial e só renomeia depois de fechar o
+    arquivo - um segmento interrompido nunca parece pronto.
+    pool_frames precisa ter pelo menos frames_na_fila + 2 buffers."""
+    caminho = Path(caminho)
+    video = abrir_codificador(caminho.with_name(f"{caminho.stem}.parcial{caminho.suffix}"),
+                              largura, altura, fps, **codificador)
+    escritor = EscritorAssincrono(video, frames_na_fila) if frames_na_fila > 0 else video
+    try:
+        for indice_frame in range(inicio, fim, passo):
+            escritor.escrever(renderizador.renderizar(indice_frame, pool_frames.proximo()))
+    finally:
+        escritor.fechar()
+    os.replace(video.caminho, caminho)
+
+# Frames reaproveitados pelos segmentos do processo trabalhador
+_pool_frames_trabalhador = None
+
+def _gravar_segmento_trabalhador(tarefa):
+    """Grava um segmento inteiro (renderização + codificação) no processo trabalhador"""
+    global _pool_frames_trabalhador
+    renderizador = _renderizador_trabalhador
+    if _pool_frames_trabalhador is None:
+        _pool_frames_trabalhador = PoolFrames(renderizador.frame_base_branco.shape, tarefa[-1] + 2)
+    indice = tarefa[0]
+    primeira_area = len(renderizador.areas_repintadas)
+    gravar_segmento(renderizador, *tarefa[1:], _pool_frames_trabalhador)
+    registro = metricas.registro
+    if registro is not None:
+        registro = registro.exportar()
+        metricas.ativar()
+    return (indice, os.getpid(), renderizador.estatisticas_cache(),
+            renderizador.areas_repintadas[primeira_area:], registro)
+
+def escrever_segmentos(renderizador, manifesto, largura, altura, fps, codificador, workers=1,
+                       frames_na_fila=FRAMES_NA_FILA_ESCRITA):
+    """Grava os segmentos que ainda faltam no manifesto, cada um no seu arquivo.
     
-    # Carrega a máscara completa (já no tamanho correto para esta resolução!)
-    print(f"\n🎭 Carregando máscara de fundo: {caminho_mascara}")
-    print(f"   • Resolução esperada: {largura_video}x{altura_video}")
-    mascara_completa = carregar_mascara(caminho_mascara, largura_video, altura_video)
-    if mascara_completa is not None:
-        print(f"   ✅ Máscara carregada com sucesso")
-        print(f"   • Transparência: {int(TRANSPARENCIA_MASCARA * 100)}%")
-        print(f"   • A máscara será dividida em {len(lista_imagens)} regiões")
+    Cada segmento concluído é registrado no manifesto na hora: se a execução
+    for interrompida, a próxima recomeça do primeiro segmento que falta. Com
+    workers > 1, cada processo grava segmentos inteiros - renderização E
+    codificação em paralelo (não há um codificador único esperando os frames).
     
-    # Calcula posições finais de todas as fotos no grid (sem margens)
-    print(f"\n📐 Calculando posições finais no grid...")
-    todas_posicoes = []
+    Returns:
+        dict: estatísticas do cache de sprites (somadas entre os processos) ou None
+    """
+    total = len(manifesto.segmentos)
+    if manifesto.retomados:
+        print(f"  ♻️  {manifesto.retomados} de {total} segmentos já prontos (execução anterior) - retomando")
+    manifesto.salvar()
+    tarefas = [(segmento['indice'], segmento['inicio'], segmento['fim'], manifesto.passo_frames,
+                manifesto.caminho(segmento), largura, altura, fps, codificador, frames_na_fila)
+               for segmento in manifesto.pendentes()]
+    
+    if workers <= 1 or len(tarefas) <= 1:
+        pool_frames = PoolFrames(renderizador.frame_base_branco.shape, frames_na_fila + 2)
+        for tarefa in tarefas:
+            indice, inicio, fim = tarefa[:3]
+            gravar_segmento(renderizador, *tarefa[1:], pool_frames)
+            manifesto.marcar_concluido(indice)
+            print(f"     Segmento {indice + 1}/{total} pronto (frames {inicio} a {fim - 1})")
+        imprimir_estatisticas_delta(renderizador.areas_repintadas, renderizador)
+        return renderizador.estatisticas_cache()
+    
+    metodos = multiprocessing.get_all_start_methods()
+    contexto = multiprocessing.get_context('fork' if 'fork' in metodos else 'spawn')
+    registro = metricas.registro
+    estatisticas_por_processo = {}
+    areas_repintadas = []
+    processos = min(workers, len(tarefas))
+    with contexto.Pool(processos, initializer=_inicializar_trabalhador,
+                       initargs=(renderizador, registro is not None, processos)) as pool:
+        for indice, pid, estatisticas, areas, metricas_segmento in pool.imap_unordered(
+                _gravar_segmento_trabalhador, tarefas):
+            manifesto.marcar_concluido(indice)
+            estatisticas_por_processo[pid] = estatisticas
+            areas_repintadas.extend(areas)
+            if registro is not None:
+                registro.incorporar(metricas_segmento)
+            segmento = manifesto.segmentos[indice]
+            print(f"     Segmento {indice + 1}/{total} pronto (frames {segmento['inicio']} a {segmento['fim'] - 1})")
+    imprimir_estatisticas_delta(areas_repintadas, renderizador)
+    return somar_estatisticas_cache(estatisticas_por_processo.values())
+
+def planejar_faixas(largura_video, altura_video, workers=1, altura_faixa=ALTURA_FAIXA,
+                    memoria_mb=MEMORIA_TRABALHO_MB):
+    """Divide o orçamento de memória de trabalho da renderização em faixas.
+    
+    O orçamento cobre os buffers temporários da composição (uma faixa por
+    processo, no máximo metade dele) e os frames prontos esperando a escrita:
+    com o que sobra, a fila de escrita (e os buffers em rodízio) e os trechos
+    dos processos paralelos encolhem até caber. Ficam de fora as camadas
+    estáticas do renderizador (alguns frames inteiros) e o cache de sprites,
+    que tem o seu próprio orçamento (MEMORIA_CACHE_SPRITES_MB).
+    
+    Returns:
+        dict: altura_faixa, frames_na_fila, frames_por_trecho, mb_estimados
+        e cabe (False se nem o mínimo coube no orçamento)
+    """
+    processos = max(1, workers)
+    orcamento = memoria_mb * 1024 * 1024
+    bytes_frame = largura_video * altura_video * 3
+    bytes_linha = largura_video * BYTES_RASCUNHO_POR_PIXEL * processos
+    altura_faixa = max(1, min(altura_faixa, altura_video, orcamento // 2 // bytes_linha))
+    
+    # Frames que cada processo pode manter: o rodízio tem frames_na_fila + 2
+    # buffers; em paralelo, cada processo tem o seu trecho e até 2 esperam a escrita
+    frames_por_processo = (orcamento - altura_faixa * bytes_linha) // bytes_frame // processos
+    frames_na_fila = max(0, min(FRAMES_NA_FILA_ESCRITA, frames_por_processo - 2))
+    frames_por_trecho = max(1, min(FRAMES_POR_TRECHO, frames_por_processo // 3))
+    frames_em_espera = processos * max(frames_na_fila + 2, 3 * frames_por_trecho if workers > 1 else 0)
+    bytes_estimados = altura_faixa * bytes_linha + frames_em_espera * bytes_frame
+    return {
+        'altura_faixa': altura_faixa,
+        'frames_na_fila': frames_na_fila,
+        'frames_por_trecho': frames_por_trecho,
+        'mb_estimados': bytes_estimados / (1024 * 1024),
+        'cabe': bytes_estimados <= orcamento,
+    }
+
+def configurar_renderizador(plano, fotos_originais, fotos_com_mascara, frame_final, workers=1, faixas=None):
+    """FASE 3: monta o RenderizadorAlbum e divide a memória de trabalho.
     
-    # Cria TODAS as posições do grid (38 colunas x 8 linhas = 304)
-    for linha in range(FOTOS_POR_COLUNA):
-        for coluna in range(FOTOS_POR_LINHA):
-            x = coluna * largura_foto
-            y = linha * altura_foto
-            todas_posicoes.append((x, y))
+    Args:
+        plano: PlanoAnimacao na resolução em que os frames são desenhados
+        faixas: Renderização em faixas - dicionário com 'altura' (pixels) e
+                'memoria_mb'; None = frame inteiro
     
-    print(f"   ✅ {len(todas_posicoes)} posições calculadas (deve ser {FOTOS_POR_LINHA}x{FOTOS_POR_COLUNA} = {FOTOS_POR_LINHA * FOTOS_POR_COLUNA})")
+    Returns:
+        tuple: (renderizador, memoria) - memoria tem altura_faixa, frames_na_fila
+        e frames_por_trecho (com faixas, também mb_estimados e cabe: ver planejar_faixas)
+    """
+    memoria = {'altura_faixa': 0, 'frames_na_fila': FRAMES_NA_FILA_ESCRITA, 'frames_por_trecho': FRAMES_POR_TRECHO}
+    if faixas is not None and faixas['altura'] > 0:
+        memoria = planejar_faixas(plano.largura_video, plano.altura_video, workers,
+                                  faixas['altura'], faixas['memoria_mb'])
+    renderizador = RenderizadorAlbum(
+        plano, fotos_originais, fotos_com_mascara, frame_final,
+        frames_pausa=int(FPS * DURACAO_PAUSA_MEIO), altura_faixa=memoria['altura_faixa']
+    )
+    return renderizador, memoria
+
+def assinatura_video(plano, acervo, lista_imagens, caminho_mascara, largura, altura, passo_frames, codificador,
+                     altura_faixa=0):
+    """Identifica tudo o que define os frames e a codificação de um vídeo
+    (plano, conteúdo das fotos e da máscara, resolução e codificador) -
+    segmentos de uma execução anterior só são reaproveitados se ela for igual"""
+    dados = {
+        'plano': plano.assinatura(),
+        'fotos': [acervo.hash_arquivo(caminho) for caminho in lista_imagens],
+        'mascara': acervo.hash_arquivo(caminho_mascara),
+        'transparencia': TRANSPARENCIA_MASCARA,
+        'politica_corte': POLITICA_CORTE,
+        'resolucao': [largura, altura],
+        'fps': FPS,
+        'passo_frames': passo_frames,
+        'pausa': DURACAO_PAUSA_MEIO,
+        'codificador': codificador,
+    }
+    if altura_faixa:
+        # Com faixas, alguns pixels saem 1 nível diferente (ver _desenhar_em_faixas)
+        dados['altura_faixa'] = altura_faixa
+    return hashlib.sha1(json.dumps(dados, sort_keys=True).encode('utf-8')).hexdigest()
+
+def preparar_fotos_unicas(caminhos_unicos, largura_foto, altura_foto, cache_rostos=None):
+    """Carrega, recorta (no rosto) e redimensiona cada arquivo uma única vez.
     
-    # Garante que temos exatamente o número correto de imagens
-    if len(lista_imagens) != len(todas_posicoes):
-        print(f"   ⚠️  ATENÇÃO: {len(lista_imagens)} imagens vs {len(todas_posicoes)} posições!")
-        if len(lista_imagens) < len(todas_posicoes):
-            # Duplica mais imagens se necessário
-            fotos_faltantes = len(todas_posicoes) - len(lista_imagens)
-            fotos_originais = lista_imagens[:178]  # Usa apenas as originais para duplicar
-            for _ in range(fotos_faltantes):
-                lista_imagens.append(random.choice(fotos_originais))
-            print(f"   ✅ Ajustado: {len(lista_imagens)} imagens")
+    Returns:
+        numpy.ndarray: Array (U, altura_foto, largura_foto, 3) na ordem de caminhos_unicos
+    """
+    fotos_unicas = np.empty((len(caminhos_unicos), altura_foto, largura_foto, 3), dtype=np.uint8)
+    estatisticas = {}
+    for i, caminho_imagem in enumerate(caminhos_unicos):
+        print(f"   [{i + 1}/{len(caminhos_unicos)}] {Path(caminho_imagem).name}")
+        fotos_unicas[i] = carregar_e_redimensionar(caminho_imagem, largura_foto, altura_foto, cache_rostos,
+                                                   estatisticas)
+    metricas.anotar('decodificacao_reduzida', estatisticas or None)
+    if estatisticas.get('fotos'):
+        print(f"   ⚡ Decodificação reduzida: {estatisticas['reduzidas']} de {estatisticas['fotos']} fotos, "
+              f"{estatisticas['bytes_economizados'] / (1024 * 1024):.0f} MB a menos decodificados, "
+              f"{estatisticas['segundos']:.2f}s decodificando")
+    return fotos_unicas
+
+def aplicar_mascara_nas_celulas(fotos_unicas, indice_foto_unica, todas_posicoes, mascara_completa):
+    """Monta as duas versões de cada célula a partir das fotos únicas já preparadas.
     
-    # Processa todas as fotos: carrega + redimensiona + cria 2 versões (original e com máscara)
-    print(f"\n🖼️  Processando todas as imagens...")
-    print(f"   (Carregando, redimensionando e criando 2 versoes: original e com mascara)")
+    Args:
+        fotos_unicas: Array (U, altura, largura, 3) de preparar_fotos_unicas
+        indice_foto_unica: Para cada célula, o índice da sua foto em fotos_unicas
+        todas_posicoes: Posição (x, y) de cada célula (define a fatia da máscara)
     
-    todas_fotos_originais = []  # Fotos originais (sem máscara)
-    todas_fotos_com_mascara = []  # Fotos com máscara aplicada
+    Returns:
+        tuple: (fotos_originais, fotos_com_mascara) - arrays (N, altura, largura, 3)
+    """
+    altura_foto, largura_foto = fotos_unicas.shape[1:3]
     
-    for i, caminho_imagem in enumerate(lista_imagens):
-        nome_foto = Path(caminho_imagem).name
-        x, y = todas_posicoes[i]
-        
-        print(f"   [{i + 1}/{len(lista_imagens)}] {nome_foto}")
-        
-        # Carrega e redimensiona a foto ORIGINAL
-        foto_original = carregar_e_redimensionar(caminho_imagem, largura_foto, altura_foto)
-        
+    # Um único array por versão (N, altura, largura, 3) - indexado pelo índice da célula
+    fotos_originais = fotos_unicas[indice_foto_unica]  # Sem máscara
+    fotos_com_mascara = np.empty_like(fotos_originais)  # Com máscara aplicada
+    for i, (x, y) in enumerate(todas_posicoes):
         # Extrai a região específica da máscara para esta posição
         regiao_mascara = extrair_regiao_mascara(mascara_completa, x, y, largura_foto, altura_foto)
         
-        # Aplica a máscara na foto (cria a versão com máscara)
-        foto_com_mascara = aplicar_mascara_na_foto(foto_original, regiao_mascara, TRANSPARENCIA_MASCARA)
-        
-        todas_fotos_originais.append(foto_original)
-        todas_fotos_com_mascara.append(foto_com_mascara)
+        # Aplica a máscara na foto (cria a versão com máscara, direto no array final)
+        aplicar_mascara_na_foto(fotos_originais[i], regiao_mascara, TRANSPARENCIA_MASCARA, destino=fotos_com_mascara[i])
+    return fotos_originais, fotos_com_mascara
+
+def reduzir_fotos(fotos, largura_foto, altura_foto):
+    """Reduz um array de fotos (N, altura, largura, 3) para outro tamanho de célula (modo proxy)"""
+    reduzidas = np.empty((len(fotos), altura_foto, largura_foto, 3), dtype=np.uint8)
+    for foto, destino in zip(fotos, reduzidas):
+        cv2.resize(foto, (largura_foto, altura_foto), dst=destino, interpolation=cv2.INTER_AREA)
+    return reduzidas
+
+def preparar_celulas(acervo, lista_imagens, largura_foto, altura_foto, posicoes, mascara_completa,
+                     celula_render=None):
+    """FASE 1: as duas versões (original e com máscara) de todas as células do grid.
     
-    print(f"\n   ✅ {len(todas_fotos_originais)} imagens processadas!")
-    print(f"   • Versao original (sem mascara): para animacao de entrada/saida")
-    print(f"   • Versao com mascara (fundo.jpg aplicado): para estado final")
+    Cada arquivo é decodificado, recortado e redimensionado UMA vez, mesmo
+    que apareça em várias células do grid (fotos duplicadas) ou em vários
+    vídeos (o acervo guarda as fotos prontas); só a mistura com a máscara é
+    feita por célula (cada célula tem sua fatia do fundo).
     
-    # Gera imagem de resultado final (preview)
-    print(f"\n🖼️  Gerando preview do resultado final...")
-    frame_final = np.ones((altura_video, largura_video, 3), dtype=np.uint8) * 255
-    for i, (foto, (x, y)) in enumerate(zip(todas_fotos_com_mascara, todas_posicoes)):
+    Args:
+        acervo: AcervoFotos de onde vêm as fotos preparadas
+        lista_imagens: Caminho da foto de cada célula
+        posicoes: Posição (x, y) de cada célula na resolução em que o vídeo é desenhado
+        celula_render: Reduz as fotos para este tamanho de célula depois de
+                       prepará-las no tamanho final (modo rascunho); None = não reduz
+    
+    Returns:
+        tuple: (fotos_originais, fotos_com_mascara, caminhos_unicos)
+    """
+    caminhos_unicos = list(dict.fromkeys(lista_imagens))
+    posicao_unica = {caminho: i for i, caminho in enumerate(caminhos_unicos)}
+    indice_foto_unica = np.array([posicao_unica[caminho] for caminho in lista_imagens], dtype=np.intp)
+    fotos_unicas = acervo.obter_fotos(caminhos_unicos, largura_foto, altura_foto)
+    if celula_render is not None and celula_render != largura_foto:
+        # Preparadas no tamanho final (ficam no atlas para o vídeo final) e reduzidas aqui
+        fotos_unicas = reduzir_fotos(fotos_unicas, celula_render, celula_render)
+    fotos_originais, fotos_com_mascara = aplicar_mascara_nas_celulas(
+        fotos_unicas, indice_foto_unica, posicoes, mascara_completa
+    )
+    return fotos_originais, fotos_com_mascara, caminhos_unicos
+
+def calcular_posicoes_grid(fotos_por_linha, fotos_por_coluna, largura_foto, altura_foto):
+    """Posição (x, y) de cada célula do grid, linha por linha (sem margens)"""
+    todas_posicoes = []
+    for linha in range(fotos_por_coluna):
+        for coluna in range(fotos_por_linha):
+            todas_posicoes.append((coluna * largura_foto, linha * altura_foto))
+    return todas_posicoes
+
+def montar_frame_final(fotos_com_mascara, todas_posicoes, largura_video, altura_video):
+    """Grid completo: todas as fotos (versão com máscara) assentadas sobre o fundo branco"""
+    altura_foto, largura_foto = fotos_com_mascara.shape[1:3]
+    frame_final = np.full((altura_video, largura_video, 3), 255, dtype=np.uint8)
+    for foto, (x, y) in zip(fotos_com_mascara, todas_posicoes):
         desenhar_foto_em_posicao(
             frame_final, foto, x, y,
             largura_foto, altura_foto,
             largura_video, altura_video
         )
-    print(f"   ✅ Resultado final preparado")
+    return frame_final
+
+def ajustar_lista_ao_grid(lista_imagens, total_posicoes):
+    """Ajusta a lista de imagens para preencher exatamente o grid
+    (descarta as excedentes ou duplica fotos aleatórias para completar)"""
+    if len(lista_imagens) > total_posicoes:
+        print(f"\n⚠️  Existem {len(lista_imagens)} fotos mas apenas {total_posicoes} posições")
+        print(f"   → Usando apenas as primeiras {total_posicoes} fotos")
+        lista_imagens = lista_imagens[:total_posicoes]
+    elif len(lista_imagens) < total_posicoes:
+        fotos_faltantes = total_posicoes - len(lista_imagens)
+        print(f"\n⚠️  Faltam {fotos_faltantes} fotos para completar o grid")
+        print(f"   → Duplicando fotos aleatórias para completar")
+        
+        # Sorteia fotos aleatórias para duplicar
+        fotos_originais = lista_imagens.copy()
+        for _ in range(fotos_faltantes):
+            foto_duplicada = random.choice(fotos_originais)
+            lista_imagens.append(foto_duplicada)
+        
+        print(f"   ✅ Grid completo com {len(lista_imagens)} fotos (incluindo {fotos_faltantes} duplicadas)")
+    return lista_imagens
+
+def planejar_animacao(todas_posicoes, largura_foto, altura_foto, largura_video, altura_video):
+    """FASE 2: sorteia ordem, direções, tamanhos, destaques e ondas da animação.
     
-    print("\n" + "="*60)
-    print("PREPARAÇÃO CONCLUÍDA!")
-    print("="*60)
+    Args:
+        todas_posicoes: Lista (x, y) da posição final de cada célula do grid
     
-    # ============================================================
-    # FASE 2: PLANEJAMENTO DA ANIMAÇÃO
-    # ============================================================
-    print("\n" + "="*60)
-    print("FASE 2: PLANEJAMENTO DA ANIMAÇÃO")
-    print("="*60)
+    Returns:
+        PlanoAnimacao: plano completo, com um array NumPy por característica das fotos
+    """
+    num_fotos = len(todas_posicoes)
     
     # Cria uma lista com as informações de cada foto para animação
     print("\n🎲 Definindo ordem, direções, tamanhos e destaques...")
     info_fotos = []
     
-    # Define quantas fotos serão GIGANTES (mínimo 5)
-    num_gigantes = max(NUM_FOTOS_GIGANTES, int(len(todas_fotos_com_mascara) * 0.02))  # Mínimo 5 ou 2%
-    indices_gigantes = random.sample(range(len(todas_fotos_com_mascara)), num_gigantes)
+    # Define quantas fotos serão GIGANTES (mínimo NUM_FOTOS_GIGANTES ou 2%,
+    # sem passar do número de células - grids pequenos)
+    num_gigantes = min(num_fotos, max(NUM_FOTOS_GIGANTES, int(num_fotos * 0.02)))
+    indices_gigantes = random.sample(range(num_fotos), num_gigantes)
     
     # Define quantas fotos serão destacadas (excluindo as gigantes)
-    indices_disponiveis = [i for i in range(len(todas_fotos_com_mascara)) if i not in indices_gigantes]
-    num_destaques = min(int(len(todas_fotos_com_mascara) * PORCENTAGEM_DESTAQUE), len(indices_disponiveis))
+    indices_disponiveis = [i for i in range(num_fotos) if i not in indices_gigantes]
+    num_destaques = min(int(num_fotos * PORCENTAGEM_DESTAQUE), len(indices_disponiveis))
     indices_destaque = random.sample(indices_disponiveis, num_destaques)
     
-    for i in range(len(todas_fotos_com_mascara)):
+    for i in range(num_fotos):
         direcao_entrada = random.randint(0, 7)  # 8 direções possíveis
         x_final, y_final = todas_posicoes[i]
         x_origem, y_origem = calcular_posicao_origem(
@@ -506,33 +1436,20 @@ def criar_video_album(largura_video, altura_video, nome_saida, caminho_mascara):
             escala_super_inicial = random.uniform(ESCALA_GIGANTE_SUPER_MIN, ESCALA_GIGANTE_SUPER_MAX)
             escala_final_gigante = random.uniform(ESCALA_GIGANTE_MIN, ESCALA_GIGANTE_MAX)  # Tamanho quando ficam opacas (6-10x)
             escala_inicial = escala_super_inicial  # Usa a super escala como ponto de partida
-            tipo = 'gigante'
+            tipo = TIPO_GIGANTE
         elif em_destaque:
             escala_inicial = random.uniform(ESCALA_DESTAQUE_MIN, ESCALA_DESTAQUE_MAX)
             escala_final_gigante = 1.0  # Não é gigante
-            tipo = 'destaque'
+            tipo = TIPO_DESTAQUE
         else:
             escala_inicial = random.uniform(ESCALA_MINIMA, ESCALA_MAXIMA)
             escala_final_gigante = 1.0  # Não é gigante
-            tipo = 'normal'
+            tipo = TIPO_NORMAL
         
-        info_fotos.append({
-            'indice': i,
-            'foto_original': todas_fotos_originais[i],  # Foto ORIGINAL (sem máscara) - usada durante animação
-            'foto_com_mascara': todas_fotos_com_mascara[i],  # Foto COM MÁSCARA - usada na posição final
-            'x_final': x_final,
-            'y_final': y_final,
-            'x_origem': x_origem,
-            'y_origem': y_origem,
-            'direcao': direcao_entrada,
-            'angulo_inicial': angulo_inicial,
-            'eh_gigante': eh_gigante,
-            'em_destaque': em_destaque,
-            'tipo': tipo,
-            'escala_inicial': escala_inicial,
-            'escala_final_gigante': escala_final_gigante,  # Tamanho onde fica 100% opaca
-            'nome': Path(lista_imagens[i]).name
-        })
+        # (índice, x_origem, y_origem, x_final, y_final, direção, ângulo, escala inicial,
+        #  escala onde a gigante fica 100% opaca, tipo) - mesma ordem de PlanoAnimacao
+        info_fotos.append((i, x_origem, y_origem, x_final, y_final, direcao_entrada,
+                           angulo_inicial, escala_inicial, escala_final_gigante, tipo))
     
     # Randomiza a ordem de entrada
     random.shuffle(info_fotos)
@@ -544,7 +1461,8 @@ def criar_video_album(largura_video, altura_video, nome_saida, caminho_mascara):
     
     # Divide as fotos em grupos (ondas) de tamanhos aleatórios
     print("\n🌊 Criando ondas de entrada aleatórias...")
-    ondas = []
+    onda_de_cada_foto = []
+    tamanhos_ondas = []
     indice_atual = 0
     
     while indice_atual < len(info_fotos):
@@ -571,20 +1489,392 @@ def criar_video_album(largura_video, altura_video, nome_saida, caminho_mascara):
         # Não ultrapassa o número de fotos restantes
         tamanho_onda = min(tamanho_onda, len(info_fotos) - indice_atual)
         
-        onda_atual = info_fotos[indice_atual:indice_atual + tamanho_onda]
-        ondas.append(onda_atual)
+        onda_de_cada_foto.extend([len(tamanhos_ondas)] * tamanho_onda)
+        tamanhos_ondas.append(tamanho_onda)
         
         indice_atual += tamanho_onda
     
-    print(f"   ✅ Criadas {len(ondas)} ondas de entrada")
-    for i, onda in enumerate(ondas[:10]):  # Mostra as primeiras 10
-        print(f"      Onda {i+1}: {len(onda)} fotos")
-    if len(ondas) > 10:
-        print(f"      ... e mais {len(ondas) - 10} ondas")
+    print(f"   ✅ Criadas {len(tamanhos_ondas)} ondas de entrada")
+    for i, tamanho_onda in enumerate(tamanhos_ondas[:10]):  # Mostra as primeiras 10
+        print(f"      Onda {i+1}: {tamanho_onda} fotos")
+    if len(tamanhos_ondas) > 10:
+        print(f"      ... e mais {len(tamanhos_ondas) - 10} ondas")
+    
+    # Monta o plano em formato de arrays (um por característica, na ordem de entrada)
+    colunas = list(zip(*info_fotos)) if info_fotos else [[] for _ in range(10)]
+    return PlanoAnimacao(
+        *colunas, onda_de_cada_foto,
+        frames_por_onda=int(FPS * DURACAO_POR_ONDA),
+        delay_frames=int(FPS * DELAY_ENTRE_ONDAS),
+        largura_foto=largura_foto, altura_foto=altura_foto,
+        largura_video=largura_video, altura_video=altura_video
+    )
+
+def calcular_grid(largura_video, altura_video):
+    """Calcula o grid de células QUADRADAS que preenche completamente o vídeo
+    
+    Returns:
+        tuple: (tamanho_celula, fotos_por_linha, fotos_por_coluna)
+    """
+    # Grid com células QUADRADAS que PREENCHEM COMPLETAMENTE o vídeo
+    # TAMANHO_CELULA_BASE reduzido para DOBRAR a quantidade de imagens!
+    # 56px = células menores = mais imagens (aprox. 2x mais que 84px)
+    TAMANHO_CELULA_BASE = 56  # Reduzido de 168 para ter ~2x mais imagens
+    
+    # Calcula o tamanho da célula que melhor se ajusta à resolução atual
+    # Tenta encontrar um divisor comum que resulte em células próximas de 56px
+    melhor_tamanho = None
+    melhor_diferenca = float('inf')
+    
+    for tentativa in range(30, 150):  # Testa tamanhos entre 30 e 150 pixels (células menores)
+        cols = largura_video // tentativa
+        rows = altura_video // tentativa
+        
+        # Verifica se divide perfeitamente (sem barras brancas)
+        if cols * tentativa == largura_video and rows * tentativa == altura_video:
+            diferenca = abs(tentativa - TAMANHO_CELULA_BASE)
+            if diferenca < melhor_diferenca:
+                melhor_tamanho = tentativa
+                melhor_diferenca = diferenca
+    
+    # Se não encontrou divisor perfeito, usa o mais próximo possível
+    if melhor_tamanho is None:
+        melhor_tamanho = largura_video // (largura_video // TAMANHO_CELULA_BASE)
+    
+    return melhor_tamanho, largura_video // melhor_tamanho, altura_video // melhor_tamanho
+
+class AcervoFotos:
+    """Fotos da pasta MOSAIC analisadas e preparadas uma única vez.
+    
+    Compartilhado entre todos os vídeos de uma execução: a pasta é listada uma
+    vez, cada foto passa pelo detector de rostos uma vez e, para cada tamanho
+    de célula, cada arquivo é decodificado e redimensionado uma vez. Cada vídeo
+    só aplica a sua máscara por cima das fotos já preparadas.
+    """
+    
+    def __init__(self, pasta, workers=1):
+        self.pasta = pasta
+        self.workers = workers
+        self.manifesto = ManifestoFotos(pasta, ARQUIVO_MANIFESTO_FOTOS).atualizar()
+        self.imagens = self.manifesto.caminhos
+        self.cache_rostos = CacheRostos(ARQUIVO_CACHE_ROSTOS, ASSINATURA_DETECCAO) if ARQUIVO_CACHE_ROSTOS else None
+        self._rostos_analisados = set()
+        self._fotos_por_tamanho = {}  # (largura, altura) -> {caminho: foto preparada}
+        self._atlas_fotos = {}  # (largura, altura) -> AtlasFotos em disco
+        self._hashes = self.manifesto.hashes()  # (caminho, tamanho, mtime) -> hash do conteúdo
+        self.metricas_preparacao = None  # Métricas da preparação feita em gerar_videos (se ligadas)
+        self._resumir_manifesto()
+    
+    def _resumir_manifesto(self):
+        """Mostra o que mudou na pasta desde a execução anterior e grava o manifesto"""
+        manifesto = self.manifesto
+        if manifesto.novas or manifesto.alteradas or manifesto.removidas:
+            print(f"🗂️  Pasta {self.pasta}: {len(manifesto.caminhos)} fotos - {len(manifesto.novas)} novas, "
+                  f"{len(manifesto.alteradas)} alteradas, {len(manifesto.removidas)} removidas")
+        else:
+            print(f"🗂️  Pasta {self.pasta}: {len(manifesto.caminhos)} fotos, nenhuma mudança desde a última execução")
+        if manifesto.ignorados:
+            print(f"   ⚠️  {len(manifesto.ignorados)} arquivo(s) ignorado(s) - não são JPEG, PNG, BMP nem WEBP: "
+                  f"{resumir_ignorados(manifesto.ignorados)}")
+        metricas.anotar('manifesto_fotos', manifesto.estatisticas())
+        manifesto.salvar()
+    
+    def hash_arquivo(self, caminho):
+        """Hash do conteúdo do arquivo (calculado uma vez enquanto o arquivo não mudar).
+        Retorna None se o arquivo não puder ser lido."""
+        try:
+            info = os.stat(caminho)
+        except (OSError, TypeError):
+            return None
+        chave = (caminho, info.st_size, info.st_mtime_ns)
+        if chave not in self._hashes:
+            self._hashes[chave] = calcular_hash_arquivo(caminho)
+        return self._hashes[chave]
+    
+    def _obter_atlas_fotos(self, largura_foto, altura_foto):
+        if not PASTA_ATLAS:
+            return None
+        if (largura_foto, altura_foto) not in self._atlas_fotos:
+            self._atlas_fotos[(largura_foto, altura_foto)] = AtlasFotos(PASTA_ATLAS, largura_foto, altura_foto,
+                                                                        POLITICA_CORTE)
+        return self._atlas_fotos[(largura_foto, altura_foto)]
+    
+    def analisar_rostos(self, caminhos):
+        """Detecta de uma vez (em paralelo) os rostos das fotos ainda não analisadas"""
+        novos = [caminho for caminho in dict.fromkeys(caminhos) if caminho not in self._rostos_analisados]
+        if self.cache_rostos is None or not novos:
+            return
+        print(f"\n👤 Detectando rostos das fotos ainda não analisadas...")
+        detectar_rostos_em_lote(novos, workers=self.workers, cache=self.cache_rostos, verbose=True)
+        self._rostos_analisados.update(novos)
+        self.cache_rostos.salvar()
+    
+    def obter_fotos(self, caminhos_unicos, largura_foto, altura_foto):
+        """Retorna as fotos preparadas (U, altura, largura, 3) na ordem de caminhos_unicos,
+        preparando só as que ainda não existem neste tamanho de célula"""
+        preparadas = self._fotos_por_tamanho.setdefault((largura_foto, altura_foto), {})
+        faltantes = [caminho for caminho in caminhos_unicos if caminho not in preparadas]
+        atlas = self._obter_atlas_fotos(largura_foto, altura_foto) if faltantes else None
+        if atlas is not None:
+            # Fotos já preparadas em outra execução (mesmo conteúdo, célula e corte)
+            hashes = {caminho: self.hash_arquivo(caminho) for caminho in faltantes}
+            do_atlas = [caminho for caminho in faltantes if hashes[caminho] in atlas]
+            if do_atlas:
+                preparadas.update(zip(do_atlas, atlas.obter([hashes[caminho] for caminho in do_atlas])))
+                print(f"   ⚡ {len(do_atlas)} fotos lidas do atlas em disco ({largura_foto}x{altura_foto})")
+            faltantes = [caminho for caminho in faltantes if caminho not in preparadas]
+        if faltantes:
+            self.analisar_rostos(faltantes)
+            novas = preparar_fotos_unicas(faltantes, largura_foto, altura_foto, self.cache_rostos)
+            preparadas.update(zip(faltantes, novas))
+            if self.cache_rostos is not None:
+                self.cache_rostos.salvar()
+            if atlas is not None:
+                validas = [(hashes[caminho], foto) for caminho, foto in zip(faltantes, novas)
+                           if hashes[caminho] is not None]
+                atlas.adicionar([h for h, _ in validas], [foto for _, foto in validas])
+        elif atlas is None:
+            print(f"   ♻️  {len(caminhos_unicos)} fotos já preparadas em {largura_foto}x{altura_foto} - reaproveitadas")
+        return np.stack([preparadas[caminho] for caminho in caminhos_unicos])
+    
+    def estatisticas_rostos(self):
+        return self.cache_rostos.estatisticas() if self.cache_rostos is not None else None
+
+def criar_video_album(largura_video, altura_video, nome_saida, caminho_mascara, workers=1,
+                      semente=None, plano=None, salvar_plano=False, acervo=None, codificador=None,
+                      gravar_metricas=None, proxy=None, frames_por_segmento=None, faixas=None):
+    """Cria o vídeo com efeito de álbum de fotos - todas as fotos em um único grid
+    
+    Args:
+        largura_video: Largura do vídeo em pixels
+        altura_video: Altura do vídeo em pixels
+        nome_saida: Nome do arquivo de vídeo a ser gerado
+        caminho_mascara: Caminho para o arquivo de máscara (fundo) específico desta resolução
+        workers: Número de processos para renderizar os frames (1 = sem paralelismo)
+        semente: Semente do random (None = sorteia uma e mostra no console)
+        plano: PlanoAnimacao salvo anteriormente - pula o sorteio e usa as mesmas
+               imagens, ondas e trajetórias (None = gera um plano novo)
+        salvar_plano: Se True, salva o plano ao lado do vídeo (<nome>.plano.npz)
+        acervo: AcervoFotos compartilhado entre vários vídeos (None = cria um só para este)
+        codificador: Opções do codificador (tipo, preset, crf, yuv420_no_processo) -
+                     None = CODIFICADOR, PRESET_X264, CRF_X264 e YUV420_NO_PROCESSO
+        gravar_metricas: Se True, grava as métricas de desempenho ao lado do vídeo
+                         (<nome>.metricas.json) - None = GRAVAR_METRICAS
+        proxy: Modo rascunho - dicionário com 'reducao' (célula e vídeo N vezes
+               menores) e 'passo_frames' (1 a cada N frames); None = vídeo final.
+               O plano continua sendo o da resolução final (e é sempre salvo),
+               então o vídeo final sai com --plano exatamente igual ao rascunho
+        frames_por_segmento: Renderiza em segmentos deste tamanho, com manifesto
+                             para retomar e junção sem re-codificar no fim
+                             (None = FRAMES_POR_SEGMENTO; 0 = um arquivo só)
+        faixas: Renderização em faixas - dicionário com 'altura' (pixels) e
+                'memoria_mb' (orçamento de trabalho); None = ALTURA_FAIXA e
+                MEMORIA_TRABALHO_MB (desligada com ALTURA_FAIXA = 0)
+    
+    Returns:
+        bool: True se o vídeo foi gerado
+    """
+    
+    # Métricas deste vídeo (desligadas, cada ponto medido custa só uma chamada vazia)
+    if GRAVAR_METRICAS if gravar_metricas is None else gravar_metricas:
+        registro_metricas = metricas.ativar()
+    else:
+        registro_metricas = None
+        metricas.desativar()
+    inicio_video = inicio_fase = time.perf_counter()
+    
+    # Calcula configurações específicas para esta resolução
+    TAMANHO_CELULA, FOTOS_POR_LINHA, FOTOS_POR_COLUNA = calcular_grid(largura_video, altura_video)
+    
+    print("\n" + "="*70)
+    print(f"GERANDO VIDEO: {nome_saida}")
+    print("="*70)
+    print(f"Resolucao: {largura_video}x{altura_video}")
+    print(f"\nGrid calculado automaticamente para CELULAS QUADRADAS:")
+    print(f"   Resolucao do video: {largura_video}x{altura_video}")
+    print(f"   Tamanho da celula: {TAMANHO_CELULA}x{TAMANHO_CELULA} pixels (1:1 - quadrada)")
+    print(f"   Grid resultante: {FOTOS_POR_LINHA} colunas x {FOTOS_POR_COLUNA} linhas")
+    print(f"   Total de posicoes: {FOTOS_POR_LINHA * FOTOS_POR_COLUNA}")
+    
+    # ============================================================
+    # FASE 1: PREPARAÇÃO - Análise e Processamento das Imagens
+    # ============================================================
+    print("\n" + "="*60)
+    print("FASE 1: PREPARAÇÃO DAS IMAGENS")
+    print("="*60)
+    
+    if plano is None:
+        # Semente do random: com a mesma semente (e as mesmas fotos), o vídeo é idêntico
+        if semente is None:
+            semente = random.randrange(2**31)
+        random.seed(semente)
+        print(f"\n🎲 Semente: {semente} (use --seed {semente} para repetir este vídeo)")
+        
+        # Lista todas as imagens (uma vez por execução, no acervo compartilhado)
+        if acervo is None:
+            acervo = AcervoFotos(PASTA_IMAGENS, workers)
+        lista_imagens = list(acervo.imagens)
+        print(f"\n📸 Encontradas {len(lista_imagens)} imagens na pasta MOSAIC")
+    else:
+        # Plano salvo: mesmas imagens, na mesma célula do grid
+        if acervo is None:
+            acervo = AcervoFotos(PASTA_IMAGENS, workers)
+        lista_imagens = list(plano.imagens or [])
+        print(f"\n📂 Usando plano salvo: {len(lista_imagens)} imagens (semente {plano.semente})")
+    
+    if not lista_imagens:
+        print("❌ Nenhuma imagem encontrada na pasta MOSAIC!")
+        return False
+    
+    # Calcula dimensões de cada foto no grid (CÉLULAS QUADRADAS - sem margens)
+    margem = 0
+    largura_foto = TAMANHO_CELULA  # Células quadradas
+    altura_foto = TAMANHO_CELULA   # Células quadradas
+    
+    total_posicoes = FOTOS_POR_LINHA * FOTOS_POR_COLUNA
+    
+    print(f"\n📏 Configuração do Grid:")
+    print(f"   • Resolução do vídeo: {largura_video}x{altura_video}")
+    print(f"   • Grid: {FOTOS_POR_LINHA}x{FOTOS_POR_COLUNA} = {total_posicoes} posições")
+    print(f"   • Tamanho de cada célula: {largura_foto}x{altura_foto} pixels ✅ QUADRADA")
+    print(f"   • Proporção da célula: 1:1 (quadrada - mínimo corte possível)")
+    
+    # Resolução em que os frames são desenhados (a do vídeo, ou a do rascunho)
+    if proxy is not None:
+        celula_render = max(4, TAMANHO_CELULA // max(1, int(proxy.get('reducao', REDUCAO_PROXY))))
+        fator_proxy = celula_render / TAMANHO_CELULA
+        largura_render = 2 * round(largura_video * fator_proxy / 2)  # Pares (YUV 4:2:0)
+        altura_render = 2 * round(altura_video * fator_proxy / 2)
+        passo_frames = max(1, int(proxy.get('passo_frames', PASSO_FRAMES_PROXY)))
+        print(f"\n🚧 MODO RASCUNHO (proxy): {largura_render}x{altura_render}, células de {celula_render}px, "
+              f"1 a cada {passo_frames} frame(s) ({FPS / passo_frames:g} fps)")
+    else:
+        celula_render, largura_render, altura_render, passo_frames = largura_foto, largura_video, altura_video, 1
+    
+    if plano is None:
+        # Ajusta a lista de imagens para preencher o grid
+        lista_imagens = ajustar_lista_ao_grid(lista_imagens, total_posicoes)
+    elif (plano.largura_video, plano.altura_video, plano.largura_foto, plano.num_fotos) != \
+            (largura_video, altura_video, largura_foto, total_posicoes):
+        print(f"❌ O plano salvo é de um vídeo {plano.largura_video}x{plano.altura_video} "
+              f"com células de {plano.largura_foto}px - incompatível com este vídeo!")
+        return False
+    
+    # Calcula posições finais de todas as fotos no grid (sem margens)
+    print(f"\n📐 Calculando posições finais no grid...")
+    todas_posicoes = calcular_posicoes_grid(FOTOS_POR_LINHA, FOTOS_POR_COLUNA, largura_foto, altura_foto)
+    
+    print(f"   ✅ {len(todas_posicoes)} posições calculadas (deve ser {FOTOS_POR_LINHA}x{FOTOS_POR_COLUNA} = {FOTOS_POR_LINHA * FOTOS_POR_COLUNA})")
+    
+    # Garante que temos exatamente o número correto de imagens
+    if len(lista_imagens) != len(todas_posicoes):
+        print(f"   ⚠️  ATENÇÃO: {len(lista_imagens)} imagens vs {len(todas_posicoes)} posições!")
+        if len(lista_imagens) < len(todas_posicoes):
+            # Duplica mais imagens se necessário
+            fotos_faltantes = len(todas_posicoes) - len(lista_imagens)
+            fotos_originais = lista_imagens[:178]  # Usa apenas as originais para duplicar
+            for _ in range(fotos_faltantes):
+                lista_imagens.append(random.choice(fotos_originais))
+            print(f"   ✅ Ajustado: {len(lista_imagens)} imagens")
+    
+    # Atlas da grade em disco: com as mesmas fotos, célula, corte e máscara,
+    # a preparação inteira é pulada e as fotos são lidas direto do arquivo
+    # (só para o vídeo final: o grid do rascunho é montado na hora)
+    chave_atlas = None
+    atlas_grade = None
+    if PASTA_ATLAS and proxy is None:
+        hashes_celulas = [acervo.hash_arquivo(caminho) for caminho in lista_imagens]
+        if None not in hashes_celulas:
+            chave_atlas = chave_atlas_grade(
+                hashes_celulas, largura_foto, altura_foto, POLITICA_CORTE,
+                acervo.hash_arquivo(caminho_mascara), TRANSPARENCIA_MASCARA, largura_video, altura_video
+            )
+            atlas_grade = abrir_atlas_grade(PASTA_ATLAS, chave_atlas)
+    
+    metricas.anotar('atlas_grade', {'usado': atlas_grade is not None, 'ativo': chave_atlas is not None})
+    if atlas_grade is not None:
+        print(f"\n⚡ Atlas de sprites encontrado - preparação das imagens pulada")
+        print(f"   • {caminho_atlas_grade(PASTA_ATLAS, chave_atlas)}")
+        todas_fotos_originais, todas_fotos_com_mascara = atlas_grade[0], atlas_grade[1]
+    else:
+        # Carrega a máscara completa (já no tamanho correto para esta resolução!)
+        print(f"\n🎭 Carregando máscara de fundo: {caminho_mascara}")
+        print(f"   • Resolução esperada: {largura_render}x{altura_render}")
+        mascara_completa = carregar_mascara(caminho_mascara, largura_render, altura_render)
+        if mascara_completa is not None:
+            print(f"   ✅ Máscara carregada com sucesso")
+            print(f"   • Transparência: {int(TRANSPARENCIA_MASCARA * 100)}%")
+            print(f"   • A máscara será dividida em {len(lista_imagens)} regiões")
+    
+        # Processa todas as fotos: carrega + redimensiona + cria 2 versões (original e com máscara)
+        print(f"\n🖼️  Processando todas as imagens...")
+        print(f"   (Carregando, redimensionando e criando 2 versoes: original e com mascara)")
+    
+        posicoes_render = calcular_posicoes_grid(FOTOS_POR_LINHA, FOTOS_POR_COLUNA, celula_render, celula_render)
+        todas_fotos_originais, todas_fotos_com_mascara, caminhos_unicos = preparar_celulas(
+            acervo, lista_imagens, largura_foto, altura_foto, posicoes_render, mascara_completa, celula_render
+        )
+    
+        print(f"\n   ✅ {len(todas_fotos_originais)} células preparadas a partir de {len(caminhos_unicos)} fotos!")
+        estatisticas_rostos = acervo.estatisticas_rostos()
+        if estatisticas_rostos is not None:
+            print(f"   • Cache de rostos: {estatisticas_rostos['acertos']} reaproveitados, "
+                  f"{estatisticas_rostos['falhas']} detectados ({estatisticas_rostos['itens']} fotos no cache)")
+        if chave_atlas is not None:
+            # Guarda as duas versões num único arquivo e passa a usá-lo memory-mapped
+            # (os processos de renderização compartilham as páginas, sem cópia)
+            atlas_grade = salvar_atlas_grade(PASTA_ATLAS, chave_atlas, todas_fotos_originais, todas_fotos_com_mascara,
+                                             ATLAS_GRADE_MANTIDOS)
+            todas_fotos_originais, todas_fotos_com_mascara = atlas_grade[0], atlas_grade[1]
+            print(f"   💾 Atlas de sprites salvo: {caminho_atlas_grade(PASTA_ATLAS, chave_atlas)}")
+    print(f"   • Versao original (sem mascara): para animacao de entrada/saida")
+    print(f"   • Versao com mascara (fundo.jpg aplicado): para estado final")
+    
+    # Gera imagem de resultado final (preview)
+    print(f"\n🖼️  Gerando preview do resultado final...")
+    frame_final = montar_frame_final(todas_fotos_com_mascara,
+                                     calcular_posicoes_grid(FOTOS_POR_LINHA, FOTOS_POR_COLUNA, celula_render, celula_render),
+                                     largura_render, altura_render)
+    print(f"   ✅ Resultado final preparado")
+    
+    print("\n" + "="*60)
+    print("PREPARAÇÃO CONCLUÍDA!")
+    print("="*60)
+    metricas.marcar_fase('preparacao', inicio_fase)
+    inicio_fase = time.perf_counter()
+    
+    # ============================================================
+    # FASE 2: PLANEJAMENTO DA ANIMAÇÃO
+    # ============================================================
+    print("\n" + "="*60)
+    print("FASE 2: PLANEJAMENTO DA ANIMAÇÃO")
+    print("="*60)
+    
+    if plano is None:
+        inicio_planejamento = time.time()
+        plano = planejar_animacao(todas_posicoes, largura_foto, altura_foto, largura_video, altura_video)
+        plano.imagens = lista_imagens
+        plano.semente = semente
+        print(f"\n   ⏱️  Plano gerado em {time.time() - inicio_planejamento:.2f}s")
+    else:
+        print(f"\n📂 Plano carregado: {plano.num_fotos} fotos em {plano.num_ondas} ondas")
+    
+    caminho_plano = None
+    if salvar_plano or proxy is not None:
+        # O rascunho sempre salva o plano (da resolução final): é ele que o vídeo final reaproveita
+        caminho_plano = str(Path(nome_saida).with_suffix('.plano.npz'))
+        plano.salvar(caminho_plano)
+        print(f"   💾 Plano salvo em: {caminho_plano}")
+    
+    # O rascunho desenha o mesmo plano com as posições na escala reduzida
+    plano_render = plano if proxy is None else plano.redimensionado(celula_render, celula_render,
+                                                                    largura_render, altura_render)
     
     print("\n" + "="*60)
     print("PLANEJAMENTO CONCLUÍDO!")
     print("="*60)
+    metricas.marcar_fase('planejamento', inicio_fase)
+    inicio_fase = time.perf_counter()
     
     # ============================================================
     # FASE 3: GERAÇÃO DO VÍDEO
@@ -593,377 +1883,122 @@ def criar_video_album(largura_video, altura_video, nome_saida, caminho_mascara):
     print("FASE 3: GERAÇÃO DO VÍDEO")
     print("="*60)
     
-    # Cria o vídeo MP4 com codec mp4v (MPEG-4 Part 2 - compatível)
+    # Abre o codificador: H.264 direto pelo ffmpeg (sem .mp4 intermediário para
+    # re-codificar), Y4M, ou o cv2.VideoWriter (mp4v) quando não há ffmpeg
     print("\n🎥 Inicializando gerador de vídeo...")
+    if codificador is None:
+        codificador = {'tipo': CODIFICADOR, 'preset': PRESET_X264, 'crf': CRF_X264,
+                       'yuv420_no_processo': YUV420_NO_PROCESSO}
+    if frames_por_segmento is None:
+        frames_por_segmento = FRAMES_POR_SEGMENTO
+    if frames_por_segmento > 0:
+        # Segmentos: um codificador por segmento, aberto na hora de gravá-lo
+        # ('auto' é resolvido agora para todos os segmentos saírem iguais)
+        video = None
+        codificador = dict(codificador, tipo=resolver_codificador(codificador['tipo']))
+        if codificador['tipo'] == 'y4m':
+            nome_saida = str(Path(nome_saida).with_suffix('.y4m'))
+        descricao_video = f"{codificador['tipo']}, em segmentos de {frames_por_segmento} frames"
+    else:
+        try:
+            video = abrir_codificador(nome_saida, largura_render, altura_render, FPS / passo_frames, **codificador)
+        except (RuntimeError, ValueError) as erro:
+            print(f"\n   ❌ ERRO: Não foi possível inicializar o vídeo! ({erro})")
+            print("   💡 Solução: instale o ffmpeg ou reinstale o OpenCV com:")
+            print("      pip uninstall opencv-python")
+            print("      pip install opencv-python")
+            return False
+        nome_saida = video.caminho
+        descricao_video = video.descricao
     print(f"   📁 Arquivo de saída: {nome_saida}")
-    print(f"   📁 Resolução: {largura_video}x{altura_video}")
-    print(f"   🔧 Usando codec: mp4v (MPEG-4 Part 2 - máxima compatibilidade)")
-    
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    video = cv2.VideoWriter(nome_saida, fourcc, FPS, (largura_video, altura_video))
-    
-    if not video.isOpened():
-        print("\n   ❌ ERRO: Não foi possível inicializar o vídeo!")
-        print("   💡 Solução: Reinstale o OpenCV com:")
-        print("      pip uninstall opencv-python")
-        print("      pip install opencv-python")
-        return
-    
+    print(f"   📁 Resolução: {largura_render}x{altura_render}")
+    print(f"   🔧 Codificador: {descricao_video}")
     print(f"   ✅ Vídeo inicializado com sucesso!")
     
-    # Frame base branco puro
-    frame_base_branco = np.ones((altura_video, largura_video, 3), dtype=np.uint8) * 255
-    
     print("\n🎞️  Gerando animação com ondas sobrepostas...")
     
-    # Calcula o frame de início de cada onda (com delays entre elas)
-    frames_por_onda = int(FPS * DURACAO_POR_ONDA)
-    delay_frames = int(FPS * DELAY_ENTRE_ONDAS)
-    
-    ondas_info = []
-    for num_onda, onda in enumerate(ondas):
-        frame_inicio = num_onda * delay_frames
-        frame_fim = frame_inicio + frames_por_onda
-        ondas_info.append({
-            'onda': onda,
-            'frame_inicio': frame_inicio,
-            'frame_fim': frame_fim,
-            'numero': num_onda + 1
-        })
-        
-        print(f"  🌊 Onda {num_onda + 1}/{len(ondas)}: {len(onda)} fotos")
+    # Agenda das ondas (cada onda começa DELAY_ENTRE_ONDAS depois da anterior)
+    for num_onda, tamanho_onda in enumerate(plano.tamanhos_ondas()):
+        frame_inicio = num_onda * plano.delay_frames
+        frame_fim = frame_inicio + plano.frames_por_onda
+        print(f"  🌊 Onda {num_onda + 1}/{plano.num_ondas}: {tamanho_onda} fotos")
         print(f"     Inicia no frame {frame_inicio} | Termina no frame {frame_fim}")
     
-    # Calcula total de frames necessários
-    ultimo_frame = max(info['frame_fim'] for info in ondas_info)
-    total_frames = ultimo_frame
+    # Renderização em faixas: altura das faixas, fila de escrita e trechos dentro do orçamento
+    # O renderizador gera qualquer frame da linha do tempo (entrada → pausa → saída)
+    if faixas is None and ALTURA_FAIXA > 0:
+        faixas = {'altura': ALTURA_FAIXA, 'memoria_mb': MEMORIA_TRABALHO_MB}
+    renderizador, memoria = configurar_renderizador(plano_render, todas_fotos_originais, todas_fotos_com_mascara,
+                                                    frame_final, workers, faixas)
+    frames_na_fila, frames_por_trecho = memoria['frames_na_fila'], memoria['frames_por_trecho']
+    altura_faixa = memoria['altura_faixa']
+    if altura_faixa > 0:
+        metricas.anotar('faixas', dict(memoria, memoria_mb=faixas['memoria_mb']))
+        print(f"\n  🧮 Renderização em faixas de {altura_faixa}px "
+              f"({math.ceil(altura_render / altura_faixa)} por frame) | fila de escrita: {frames_na_fila} frames"
+              f"{f' | trechos de {frames_por_trecho} frames' if workers > 1 else ''}")
+        print(f"     Memória de trabalho estimada: {memoria['mb_estimados']:.0f} MB "
+              f"(orçamento {faixas['memoria_mb']} MB)")
+        if not memoria['cabe']:
+            print(f"     ⚠️  Orçamento pequeno demais para {largura_render}x{altura_render} "
+                  f"com {workers} processo(s) - usando o mínimo possível")
+    total_frames = renderizador.frames_entrada
+    total_frames_saida = renderizador.frames_saida
     
     print(f"\n  📊 Total de frames de animação: {total_frames} ({total_frames/FPS:.1f} segundos)")
     print(f"  ⏱️  Ondas se sobrepõem com delay de {DELAY_ENTRE_ONDAS}s entre elas")
+    print(f"  ⏸️  Pausa do meio: {DURACAO_PAUSA_MEIO} segundos (todas as fotos estáticas)")
+    print(f"  🔙 Saída: as fotos voltam da mesma forma que entraram ({total_frames_saida} frames)")
     
     # Gera todos os frames
-    print(f"\n  🎬 Gerando {total_frames} frames...")
-    for frame_atual in range(total_frames):
-        # Progresso geral
-        if frame_atual % 300 == 0:  # A cada 10 segundos
-            progresso_geral = (frame_atual / total_frames) * 100
-            print(f"     Frame {frame_atual}/{total_frames} ({progresso_geral:.1f}%)")
-        
-        # Começa com fundo branco
-        frame = frame_base_branco.copy()
-        
-        # Processa cada onda e determina seu estado
-        for onda_info in ondas_info:
-            if frame_atual < onda_info['frame_inicio']:
-                # Onda ainda não começou - não faz nada
-                continue
-            
-            elif frame_atual < onda_info['frame_fim']:
-                # Onda está ativa - anima
-                frame_local = frame_atual - onda_info['frame_inicio']
-                progresso = frame_local / frames_por_onda
-                # Easing bem suave (quintic ease-out)
-                progresso_suave = 1 - (1 - progresso) ** 5
-                
-                # Anima todas as fotos desta onda
-                for info in onda_info['onda']:
-                    # Fotos GIGANTES se movem mais devagar (easing mais suave = movimento mais lento)
-                    if info['eh_gigante']:
-                        # Usa easing quadrático ao invés de quintic (movimento mais lento e pesado)
-                        progresso_foto = 1 - (1 - progresso) ** 2  # Mais lento que fotos normais
-                    else:
-                        progresso_foto = progresso_suave  # Velocidade normal
-                    
-                    # Calcula posição atual
-                    x_atual = int(info['x_origem'] + (info['x_final'] - info['x_origem']) * progresso_foto)
-                    y_atual = int(info['y_origem'] + (info['y_final'] - info['y_origem']) * progresso_foto)
-                    
-                    # Calcula ângulo atual
-                    angulo_atual = info['angulo_inicial'] * (1 - progresso_foto)
-                    
-                    # Calcula escala atual (vai da escala_inicial para 1.0)
-                    escala_atual = info['escala_inicial'] + (1.0 - info['escala_inicial']) * progresso_foto
-                    
-                    # FADE DE OPACIDADE PARA FOTOS GIGANTES
-                    # Começam INVISÍVEIS quando muito grandes, vão ficando VISÍVEIS conforme diminuem
-                    if info['eh_gigante']:
-                        escala_final_gigante = info['escala_final_gigante']
-                        
-                        # Calcula opacidade baseada no tamanho atual
-                        if escala_atual > escala_final_gigante:
-                            # Ainda está maior que o tamanho "gigante" - em processo de fade in
-                            # progresso_fade_opacidade: 0 = invisível, 1 = totalmente visível
-                            progresso_fade_opacidade = 1 - ((escala_atual - escala_final_gigante) / 
-                                                            (info['escala_inicial'] - escala_final_gigante))
-                            progresso_fade_opacidade = max(0, min(1, progresso_fade_opacidade))
-                        else:
-                            # Já atingiu o tamanho gigante final - totalmente visível
-                            progresso_fade_opacidade = 1.0
-                    else:
-                        # Fotos normais e destaque: sempre visíveis (sem fade)
-                        progresso_fade_opacidade = 1.0
-                    
-                    # TRANSIÇÃO DE FOTO: Original → Com Máscara
-                    # Durante o movimento (0 a 80%): usa foto original
-                    # Nos últimos 20%: faz fade de original para com máscara
-                    if progresso_foto < 0.80:
-                        # Ainda se movendo: usa foto ORIGINAL (sem máscara)
-                        foto_atual = info['foto_original']
-                    else:
-                        # Chegando na posição final: FADE de original para com máscara
-                        # progresso_fade vai de 0 (em 80%) até 1 (em 100%)
-                        progresso_fade = (progresso_foto - 0.80) / 0.20
-                        # Mistura as duas versões
-                        foto_atual = (
-                            info['foto_original'] * (1 - progresso_fade) +
-                            info['foto_com_mascara'] * progresso_fade
-                        ).astype(np.uint8)
-                    
-                    # APLICA FADE DE OPACIDADE (para fotos gigantes que começam invisíveis)
-                    if progresso_fade_opacidade < 1.0:
-                        # Mistura com fundo branco para criar efeito de transparência/invisibilidade
-                        fundo_branco = np.ones_like(foto_atual) * 255
-                        foto_atual = (
-                            foto_atual * progresso_fade_opacidade +
-                            fundo_branco * (1 - progresso_fade_opacidade)
-                        ).astype(np.uint8)
-                    
-                    # Desenha a foto com escala variável
-                    desenhar_foto_em_posicao(
-                        frame, foto_atual,
-                        x_atual, y_atual,
-                        largura_foto, altura_foto,
-                        largura_video, altura_video,
-                        angulo=angulo_atual,
-                        escala=escala_atual
-                    )
-            
-            else:
-                # Onda já terminou - desenha estática na posição final COM MÁSCARA (escala 1.0 = tamanho normal)
-                for info in onda_info['onda']:
-                    desenhar_foto_em_posicao(
-                        frame, info['foto_com_mascara'],  # Usa versão COM MÁSCARA quando estática
-                        info['x_final'], info['y_final'],
-                        largura_foto, altura_foto,
-                        largura_video, altura_video,
-                        angulo=0,
-                        escala=1.0
-                    )
-        
-        # Escreve o frame
-        frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-        video.write(frame_bgr)
-    
-    print(f"  ✅ Animação de entrada completa! {len(info_fotos)} fotos no grid")
-    
-    # Pausa no meio - todas as fotos visíveis
-    print(f"\n⏸️  Gerando pausa do meio ({DURACAO_PAUSA_MEIO} segundos)...")
-    print(f"   Todas as fotos estáticas...")
-    
-    for _ in range(int(FPS * DURACAO_PAUSA_MEIO)):
-        frame_bgr = cv2.cvtColor(frame_final, cv2.COLOR_RGB2BGR)
-        video.write(frame_bgr)
-    
-    # ANIMAÇÃO DE SAÍDA - Reverso da entrada
-    print("\n🔙 Gerando animação de saída (retorno)...")
-    print("   As fotos voltam da mesma forma que entraram!")
-    
-    # Calcula frames para a saída (mesma lógica da entrada)
-    ondas_saida_info = []
-    for num_onda, onda in enumerate(ondas):
-        frame_inicio = num_onda * delay_frames
-        frame_fim = frame_inicio + frames_por_onda
-        ondas_saida_info.append({
-            'onda': onda,
-            'frame_inicio': frame_inicio,
-            'frame_fim': frame_fim,
-            'numero': num_onda + 1
-        })
-        
-        print(f"  🌊 Onda {num_onda + 1}/{len(ondas)}: {len(onda)} fotos saindo")
-        print(f"     Inicia no frame {frame_inicio} | Termina no frame {frame_fim}")
-    
-    total_frames_saida = max(info['frame_fim'] for info in ondas_saida_info)
-    print(f"\n  📊 Total de frames de saída: {total_frames_saida} ({total_frames_saida/FPS:.1f} segundos)")
-    
-    # Gera frames de saída
-    print(f"\n  🎬 Gerando {total_frames_saida} frames de saída...")
-    print(f"  ⏱️  Ondas se sobrepõem com delay de {DELAY_ENTRE_ONDAS}s entre elas (igual à entrada)")
-    
-    for frame_atual in range(total_frames_saida):
-        # Progresso geral
-        if frame_atual % 300 == 0:
-            progresso_geral = (frame_atual / total_frames_saida) * 100
-            print(f"     Frame {frame_atual}/{total_frames_saida} ({progresso_geral:.1f}%)")
-        
-        # Começa com fundo branco
-        frame = frame_base_branco.copy()
-        
-        # Conta ondas ativas para debug
-        ondas_ativas = 0
-        fotos_estaticas = 0
-        fotos_animando = 0
-        
-        # Coleta fotos estáticas e animando em listas separadas
-        fotos_estaticas_lista = []
-        fotos_animando_lista = []
-        
-        # Processa cada onda e determina seu estado
-        for onda_info in ondas_saida_info:
-            if frame_atual < onda_info['frame_inicio']:
-                # Onda ainda não começou a sair - foto DEVE estar estática na posição final
-                for info in onda_info['onda']:
-                    fotos_estaticas_lista.append({
-                        'info': info,
-                        'x': info['x_final'],
-                        'y': info['y_final'],
-                        'angulo': 0,
-                        'escala': 1.0
-                    })
-                    fotos_estaticas += 1
-            
-            elif frame_atual < onda_info['frame_fim']:
-                # Onda está ATIVA - saindo
-                ondas_ativas += 1
-                frame_local = frame_atual - onda_info['frame_inicio']
-                progresso = frame_local / frames_por_onda
-                # Para saída, usa ease-in (inverso do ease-out) para movimento mais suave
-                progresso_suave = progresso ** 5  # Ease-in (quintic)
-                
-                # Anima todas as fotos desta onda (movimento reverso)
-                for info in onda_info['onda']:
-                    # Fotos GIGANTES se movem mais devagar na saída também
-                    if info['eh_gigante']:
-                        progresso_foto = progresso ** 2  # Mais lento que fotos normais
-                    else:
-                        progresso_foto = progresso_suave  # Velocidade normal
-                    
-                    # Posição reversa: vai da posição final para a origem
-                    x_atual = int(info['x_final'] + (info['x_origem'] - info['x_final']) * progresso_foto)
-                    y_atual = int(info['y_final'] + (info['y_origem'] - info['y_final']) * progresso_foto)
-                    
-                    # Ângulo reverso: vai de 0 para o angulo_inicial
-                    angulo_atual = info['angulo_inicial'] * progresso_foto
-                    
-                    # Escala reversa: vai de 1.0 para a escala_inicial
-                    escala_atual = 1.0 + (info['escala_inicial'] - 1.0) * progresso_foto
-                    
-                    # FADE DE OPACIDADE PARA FOTOS GIGANTES (REVERSO)
-                    # Começam VISÍVEIS, vão ficando INVISÍVEIS conforme aumentam de tamanho
-                    if info['eh_gigante']:
-                        escala_final_gigante = info['escala_final_gigante']
-                        
-                        # Calcula opacidade baseada no tamanho atual (reverso da entrada)
-                        if escala_atual > escala_final_gigante:
-                            # Já está maior que o tamanho "gigante" - em processo de fade out
-                            # progresso_fade_opacidade: 1 = visível, 0 = invisível
-                            progresso_fade_opacidade = 1 - ((escala_atual - escala_final_gigante) / 
-                                                            (info['escala_inicial'] - escala_final_gigante))
-                            progresso_fade_opacidade = max(0, min(1, progresso_fade_opacidade))
-                        else:
-                            # Ainda não passou do tamanho gigante - totalmente visível
-                            progresso_fade_opacidade = 1.0
-                    else:
-                        # Fotos normais e destaque: sempre visíveis (sem fade)
-                        progresso_fade_opacidade = 1.0
-                    
-                    # TRANSIÇÃO DE FOTO NA SAÍDA: Com Máscara → Original
-                    # Nos primeiros 20%: faz fade de com máscara para original
-                    # Depois (20% a 100%): usa foto original
-                    if progresso_foto < 0.20:
-                        # Começando a sair: FADE de com máscara para original
-                        # progresso_fade vai de 0 (em 0%) até 1 (em 20%)
-                        progresso_fade = progresso_foto / 0.20
-                        # Mistura as duas versões (inverso da entrada)
-                        foto_atual = (
-                            info['foto_com_mascara'] * (1 - progresso_fade) +
-                            info['foto_original'] * progresso_fade
-                        ).astype(np.uint8)
-                    else:
-                        # Já saindo: usa foto ORIGINAL (sem máscara)
-                        foto_atual = info['foto_original']
-                    
-                    # APLICA FADE DE OPACIDADE (para fotos gigantes que vão ficando invisíveis)
-                    if progresso_fade_opacidade < 1.0:
-                        # Mistura com fundo branco para criar efeito de transparência/invisibilidade
-                        fundo_branco = np.ones_like(foto_atual) * 255
-                        foto_atual = (
-                            foto_atual * progresso_fade_opacidade +
-                            fundo_branco * (1 - progresso_fade_opacidade)
-                        ).astype(np.uint8)
-                    
-                    # Adiciona à lista de fotos animando com seu progresso
-                    fotos_animando_lista.append({
-                        'info': info,
-                        'foto': foto_atual,  # Foto com fade aplicado
-                        'x': x_atual,
-                        'y': y_atual,
-                        'angulo': angulo_atual,
-                        'escala': escala_atual,
-                        'progresso': progresso_foto  # Para ordenar depois
-                    })
-                    fotos_animando += 1
-            
-            # else: onda já terminou de sair - não desenha (foto já saiu)
-        
-        # CAMADAS INVERTIDAS NA SAÍDA:
-        # Garante que fotos saindo ficam POR CIMA das estáticas
-        
-        # 1. CAMADA INFERIOR: Todas as fotos ESTÁTICAS (não saindo ainda)
-        #    Usam versão COM MÁSCARA pois estão na posição final
-        for foto_data in fotos_estaticas_lista:
-            desenhar_foto_em_posicao(
-                frame, foto_data['info']['foto_com_mascara'],  # COM MÁSCARA quando estática
-                foto_data['x'], foto_data['y'],
-                largura_foto, altura_foto,
-                largura_video, altura_video,
-                angulo=0,
-                escala=1.0
-            )
-        
-        # 2. CAMADAS SUPERIORES: Todas as fotos ANIMANDO (saindo)
-        #    Usam versão calculada com FADE (com máscara → original)
-        #    Ordenadas por progresso INVERSO para criar profundidade
-        #    MAIOR progresso = desenhada POR ÚLTIMO = fica mais POR CIMA
-        fotos_animando_lista.sort(key=lambda x: x['progresso'], reverse=False)
-        
-        for foto_data in fotos_animando_lista:
-            desenhar_foto_em_posicao(
-                frame, foto_data['foto'],  # Usa foto com fade já aplicado
-                foto_data['x'], foto_data['y'],
-                largura_foto, altura_foto,
-                largura_video, altura_video,
-                angulo=foto_data['angulo'],
-                escala=foto_data['escala']
-            )
-        
-        # Debug a cada 5 segundos
-        if frame_atual % 150 == 0 and frame_atual > 0:
-            print(f"       Debug: {fotos_estaticas} estáticas (por baixo), {fotos_animando} animando (POR CIMA), {ondas_ativas} ondas ativas")
-            if fotos_animando > 0:
-                # Mostra as primeiras fotos animando para debug
-                print(f"       Ordem de desenho: estáticas primeiro, depois {len(fotos_animando_lista)} fotos saindo por cima")
-        
-        # Escreve o frame
-        frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-        video.write(frame_bgr)
+    print(f"\n  🎬 Gerando {renderizador.total_frames} frames (entrada + pausa + saída)...")
+    if video is None:
+        manifesto = ManifestoSegmentos(
+            str(Path(nome_saida).with_suffix('.segmentos')),
+            assinatura_video(plano_render, acervo, lista_imagens, caminho_mascara,
+                             largura_render, altura_render, passo_frames, codificador, altura_faixa),
+            renderizador.total_frames, frames_por_segmento, passo_frames, Path(nome_saida).suffix
+        )
+        print(f"  🧱 {len(manifesto.segmentos)} segmentos em {manifesto.pasta}"
+              f"{f' ({workers} processos)' if workers > 1 else ''}")
+        try:
+            estatisticas_cache = escrever_segmentos(renderizador, manifesto, largura_render, altura_render,
+                                                    FPS / passo_frames, codificador, workers, frames_na_fila)
+        except (RuntimeError, ValueError, OSError) as erro:
+            print(f"   ❌ ERRO ao gravar os segmentos: {erro}")
+            print(f"   💡 Os segmentos prontos ficam em {manifesto.pasta} - rode de novo para continuar")
+            return False
+    else:
+        if workers > 1:
+            print(f"  ⚙️  Renderização paralela: {workers} processos, trechos de {frames_por_trecho} frames")
+        estatisticas_cache = escrever_frames(renderizador, video, workers, frames_por_trecho, frames_na_fila,
+                                             passo_frames=passo_frames)
+    metricas.marcar_fase('renderizacao', inicio_fase)
+    inicio_fase = time.perf_counter()
     
-    print(f"  ✅ Animação de saída completa!")
+    print(f"  ✅ Animação completa! {plano.num_fotos} fotos entraram e saíram do grid")
     
     # Finaliza o vídeo corretamente
     print("\n💾 Finalizando e salvando vídeo...")
     print("   ⏳ Aguarde, escrevendo arquivo no disco...")
     
-    # Garante que todos os frames foram escritos
-    video.release()
-    cv2.destroyAllWindows()
-    
-    # Aguarda um pouco para garantir que o arquivo foi escrito
-    import time
-    time.sleep(0.5)
+    # Garante que todos os frames foram escritos (com ffmpeg: espera o fim da codificação)
+    # Em segmentos: junta os arquivos prontos no vídeo final
+    try:
+        if video is None:
+            sem_recodificar = concatenar_segmentos(manifesto.arquivos(), nome_saida)
+            print(f"   🧱 {len(manifesto.segmentos)} segmentos juntados"
+                  f"{' sem re-codificar' if sem_recodificar else ' (re-codificados)'}")
+            if not MANTER_SEGMENTOS:
+                shutil.rmtree(manifesto.pasta, ignore_errors=True)
+        else:
+            video.fechar()
+    except RuntimeError as erro:
+        print(f"   ❌ ERRO ao finalizar o vídeo: {erro}")
+        return False
+    metricas.marcar_fase('finalizacao_video', inicio_fase)
     
     # Verifica se o arquivo foi criado
-    import os
     if os.path.exists(nome_saida):
         tamanho_mb = os.path.getsize(nome_saida) / (1024 * 1024)
         print(f"   ✅ Vídeo salvo com sucesso!")
@@ -986,49 +2021,246 @@ def criar_video_album(largura_video, altura_video, nome_saida, caminho_mascara):
     print(f"   • Duração da saída: {duracao_saida:.1f} segundos")
     print(f"   • FPS: {FPS}")
     print(f"   • Total de fotos: {len(lista_imagens)}")
-    print(f"   • Total de ondas: {len(ondas)}")
+    print(f"   • Total de ondas: {plano.num_ondas}")
     print(f"   • Duração por onda: {DURACAO_POR_ONDA} segundos")
     print(f"   • Delay entre ondas: {DELAY_ENTRE_ONDAS} segundos (sobreposição)")
     print(f"   • Total de frames: {total_frames + int(FPS * DURACAO_PAUSA_MEIO) + total_frames_saida}")
     print(f"\n🎭 Máscara aplicada: {caminho_mascara} ({int(TRANSPARENCIA_MASCARA * 100)}%)")
+    if estatisticas_cache is not None:
+        print(f"\n🧠 Cache de sprites: {estatisticas_cache['taxa_acertos'] * 100:.1f}% de acertos "
+              f"({estatisticas_cache['acertos']} acertos, {estatisticas_cache['falhas']} falhas, "
+              f"{estatisticas_cache['descartes']} descartes)")
+        print(f"   • Memória: {estatisticas_cache['mb_usados']:.0f} MB de {estatisticas_cache['mb_limite']:.0f} MB "
+              f"({estatisticas_cache['itens']} sprites guardados)")
     print(f"\n🔄 Estrutura do vídeo:")
     print(f"   1. Entrada das fotos: {duracao_entrada:.1f}s")
     print(f"   2. Pausa (todas visíveis): {DURACAO_PAUSA_MEIO}s")
     print(f"   3. Saída das fotos: {duracao_saida:.1f}s")
+    if proxy is not None:
+        print(f"\n🚧 Rascunho ({largura_render}x{altura_render}, {FPS / passo_frames:g} fps). Para o vídeo final:")
+        print(f"   python criar_video_album.py --plano {caminho_plano}")
+    
+    if registro_metricas is not None:
+        metricas.marcar_fase('total', inicio_video)
+        metricas.anotar('cache_sprites', estatisticas_cache)
+        metricas.anotar('cache_rostos', acervo.estatisticas_rostos())
+        metricas.anotar('preparacao_compartilhada', acervo.metricas_preparacao)
+        caminho_metricas = str(Path(nome_saida).with_suffix('.metricas.json'))
+        metricas.salvar_relatorio(caminho_metricas, registro_metricas.relatorio({
+            'video': nome_saida,
+            'resolucao': [largura_render, altura_render],
+            'celula': celula_render,
+            'fotos': plano.num_fotos,
+            'total_frames': len(range(0, renderizador.total_frames, passo_frames)),
+            'workers': workers,
+            'codificador': descricao_video,
+        }))
+        metricas.desativar()
+        print(f"\n⏱️  Métricas de desempenho: {caminho_metricas}")
     print("\n" + "="*60)
+    return os.path.exists(nome_saida)
+
+# Acervo herdado pelos processos que geram vídeos simultâneos (via fork)
+_acervo_compartilhado = None
+
+def _gerar_video_em_processo(tarefa, workers):
+    """Gera um vídeo num processo separado; o console vai para <nome>.log"""
+    with open(str(Path(tarefa['nome_saida']).with_suffix('.log')), 'w', encoding='utf-8') as log:
+        with contextlib.redirect_stdout(log):
+            return criar_video_album(workers=workers, acervo=_acervo_compartilhado, **tarefa)
+
+def montar_tarefas(configs, semente=None, variantes=1, planos_salvos=None, salvar_plano=False,
+                   codificador=None, gravar_metricas=None, proxy=None, frames_por_segmento=None, faixas=None):
+    """Lista os vídeos a gerar: cada configuração × cada variante (semente diferente).
+    
+    A variante 1 usa o nome da configuração; as demais ganham o sufixo _v2, _v3...
+    Com --seed S, a variante k usa a semente S + k - 1 (reproduzível).
+    Com planos salvos, só as configurações com plano da sua resolução são geradas.
+    Com o codificador 'y4m', os arquivos ganham a extensão .y4m.
+    No modo proxy (rascunho), os arquivos ganham o sufixo _proxy.
+    """
+    planos_salvos = planos_salvos or {}
+    tarefas = []
+    for config in configs:
+        plano_salvo = planos_salvos.get((config['largura'], config['altura']))
+        if planos_salvos and plano_salvo is None:
+            print(f"   ⏭️  Nenhum plano salvo para {config['largura']}x{config['altura']} - pulando {config['nome']}")
+            continue
+        for variante in range(1 if plano_salvo is not None else variantes):
+            nome_saida = Path(config['nome'])
+            if variante > 0:
+                nome_saida = nome_saida.with_name(f"{nome_saida.stem}_v{variante + 1}{nome_saida.suffix}")
+            if proxy is not None:
+                nome_saida = nome_saida.with_name(f"{nome_saida.stem}_proxy{nome_saida.suffix}")
+            if codificador is not None and codificador.get('tipo') == 'y4m':
+                nome_saida = nome_saida.with_suffix('.y4m')
+            tarefas.append({
+                'largura_video': config['largura'],
+                'altura_video': config['altura'],
+                'nome_saida': str(nome_saida),
+                'caminho_mascara': config['mascara'],
+                'semente': semente + variante if semente is not None else None,
+                'plano': plano_salvo,
+                'salvar_plano': salvar_plano,
+                'codificador': codificador,
+                'gravar_metricas': gravar_metricas,
+                'proxy': proxy,
+                'frames_por_segmento': frames_por_segmento,
+                'faixas': faixas,
+            })
+    return tarefas
+
+def gerar_videos(tarefas, workers=1, videos_simultaneos=1):
+    """Gera vários vídeos numa única execução, compartilhando a preparação das fotos.
+    
+    A pasta é listada, os rostos detectados e as fotos redimensionadas UMA vez
+    (para cada tamanho de célula) antes de qualquer vídeo; depois cada vídeo só
+    aplica a sua máscara, sorteia o seu plano e renderiza. Com
+    videos_simultaneos > 1 os vídeos são gerados em paralelo, cada um com
+    `workers` processos de renderização e log próprio (<nome>.log).
+    
+    Returns:
+        list: (nome_saida, gerado) de cada tarefa, na ordem
+    """
+    global _acervo_compartilhado
+    com_metricas = any(GRAVAR_METRICAS if tarefa.get('gravar_metricas') is None else tarefa['gravar_metricas']
+                       for tarefa in tarefas)
+    registro_preparacao = metricas.ativar() if com_metricas else None
+    inicio_preparacao = time.perf_counter()
+    acervo = AcervoFotos(PASTA_IMAGENS, workers)
+    
+    # Preparação compartilhada: todas as fotos em todos os tamanhos de célula usados
+    print(f"\n📦 Preparando {len(acervo.imagens)} fotos uma única vez para {len(tarefas)} vídeo(s)...")
+    caminhos_por_tamanho = {}
+    for tarefa in tarefas:
+        tamanho_celula = calcular_grid(tarefa['largura_video'], tarefa['altura_video'])[0]
+        imagens = tarefa['plano'].imagens if tarefa['plano'] is not None else acervo.imagens
+        caminhos_por_tamanho.setdefault(tamanho_celula, {}).update(dict.fromkeys(imagens or []))
+    for tamanho_celula, caminhos in caminhos_por_tamanho.items():
+        print(f"\n🖼️  Células de {tamanho_celula}x{tamanho_celula}px:")
+        acervo.obter_fotos(list(caminhos), tamanho_celula, tamanho_celula)
+    if registro_preparacao is not None:
+        # Entra no relatório de cada vídeo (a preparação é feita uma vez para todos)
+        metricas.marcar_fase('preparacao', inicio_preparacao)
+        acervo.metricas_preparacao = registro_preparacao.relatorio()
+        metricas.desativar()
+    
+    if videos_simultaneos <= 1 or len(tarefas) <= 1:
+        resultados = []
+        for i, tarefa in enumerate(tarefas, 1):
+            print(f"\n\n{'='*80}")
+            print(f"GERANDO VIDEO {i}/{len(tarefas)}")
+            print(f"{'='*80}")
+            resultados.append((tarefa['nome_saida'], bool(criar_video_album(workers=workers, acervo=acervo, **tarefa))))
+        return resultados
+    
+    # Vídeos simultâneos: com 'fork' os processos herdam o acervo já preparado;
+    # com 'spawn' (Windows) cada processo prepara as fotos de novo
+    _acervo_compartilhado = acervo
+    metodos = multiprocessing.get_all_start_methods()
+    contexto = multiprocessing.get_context('fork' if 'fork' in metodos else 'spawn')
+    print(f"\n⚙️  Gerando {len(tarefas)} vídeos, {videos_simultaneos} por vez "
+          f"({workers} processo(s) de renderização cada)")
+    with ProcessPoolExecutor(max_workers=videos_simultaneos, mp_context=contexto) as executor:
+        futuros = [executor.submit(_gerar_video_em_processo, tarefa, workers) for tarefa in tarefas]
+        for tarefa, futuro in zip(tarefas, futuros):
+            print(f"   ⏳ {tarefa['nome_saida']} (log: {Path(tarefa['nome_saida']).with_suffix('.log')})")
+        resultados = []
+        for tarefa, futuro in zip(tarefas, futuros):
+            gerado = bool(futuro.result())
+            print(f"   {'✅' if gerado else '❌'} {tarefa['nome_saida']}")
+            resultados.append((tarefa['nome_saida'], gerado))
+    _acervo_compartilhado = None
+    return resultados
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera os vídeos de álbum de fotos (mosaico)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processos usados para renderizar os frames em paralelo (padrão: 1)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Semente do sorteio (mesma semente + mesmas fotos = mesmo vídeo)')
+    parser.add_argument('--salvar-plano', action='store_true',
+                        help='Salva o plano de cada vídeo ao lado dele (<nome>.plano.npz)')
+    parser.add_argument('--plano', nargs='+', default=None, metavar='ARQUIVO',
+                        help='Renderiza a partir de planos salvos (cada vídeo usa o plano da sua resolução)')
+    parser.add_argument('--variantes', type=int, default=1,
+                        help='Vídeos diferentes (sementes diferentes) por configuração (padrão: 1)')
+    parser.add_argument('--videos-simultaneos', type=int, default=1,
+                        help='Vídeos gerados ao mesmo tempo, cada um em seu processo (padrão: 1)')
+    parser.add_argument('--codificador', choices=CODIFICADORES, default=CODIFICADOR,
+                        help="'auto' = H.264 pelo ffmpeg se instalado, senão mp4v do OpenCV (padrão: %(default)s)")
+    parser.add_argument('--preset', default=PRESET_X264,
+                        help='Preset do x264 com o ffmpeg (padrão: %(default)s)')
+    parser.add_argument('--crf', type=int, default=CRF_X264,
+                        help='Qualidade do x264 com o ffmpeg - menor = melhor (padrão: %(default)s)')
+    parser.add_argument('--yuv420', action='store_true', default=YUV420_NO_PROCESSO,
+                        help='Converte os frames para YUV 4:2:0 antes de enviar ao ffmpeg (metade dos bytes no pipe)')
+    parser.add_argument('--segmentos', type=int, default=FRAMES_POR_SEGMENTO, metavar='N',
+                        help='Renderiza em segmentos de N frames (retomáveis, juntados sem re-codificar; '
+                             '0 = um arquivo só, padrão: %(default)s)')
+    parser.add_argument('--proxy', action='store_true',
+                        help='Rascunho rápido: o mesmo plano em resolução reduzida (<nome>_proxy.mp4 + plano salvo)')
+    parser.add_argument('--proxy-reducao', type=int, default=REDUCAO_PROXY,
+                        help='No rascunho, célula e vídeo N vezes menores em cada lado (padrão: %(default)s)')
+    parser.add_argument('--proxy-passo', type=int, default=PASSO_FRAMES_PROXY,
+                        help='No rascunho, renderiza 1 a cada N frames - o vídeo sai com FPS/N (padrão: %(default)s)')
+    parser.add_argument('--faixas', type=int, default=ALTURA_FAIXA, metavar='ALTURA',
+                        help='Compõe cada frame em faixas de ALTURA pixels, com a memória de trabalho '
+                             'limitada por --memoria-trabalho (0 = frame inteiro, padrão: %(default)s). '
+                             'Alguns pixels podem sair 1 nível (de 255) diferente do frame inteiro')
+    parser.add_argument('--memoria-trabalho', type=int, default=MEMORIA_TRABALHO_MB, metavar='MB',
+                        help='Com --faixas, orçamento das faixas e dos frames esperando a escrita '
+                             '(padrão: %(default)s). Um orçamento pequeno reduz a altura das faixas')
+    parser.add_argument('--metricas', action='store_true', default=GRAVAR_METRICAS,
+                        help='Grava as métricas de desempenho de cada vídeo ao lado dele (<nome>.metricas.json)')
+    args = parser.parse_args()
+    
+    # Planos salvos, indexados pela resolução do vídeo
+    planos_salvos = {}
+    for caminho_plano in args.plano or []:
+        plano_salvo = PlanoAnimacao.carregar(caminho_plano)
+        planos_salvos[(plano_salvo.largura_video, plano_salvo.altura_video)] = plano_salvo
+    
     print("\n" + "="*80)
     print("GERADOR DE VIDEOS DE ALBUM DE FOTOS")
     print("="*80)
     print(f"\nConfiguracao:")
-    print(f"   Total de videos a gerar: {len(VIDEOS_PARA_GERAR)}")
+    print(f"   Total de videos a gerar: {len(VIDEOS_PARA_GERAR) * args.variantes}")
+    print(f"   Processos de renderizacao: {args.workers}")
+    print(f"   Codificador: {args.codificador}")
+    if args.seed is not None:
+        print(f"   Semente: {args.seed}")
+    if args.variantes > 1:
+        print(f"   Variantes por configuracao: {args.variantes}")
+    if planos_salvos:
+        print(f"   Planos salvos: {len(planos_salvos)} (videos sem plano serao pulados)")
+    if args.faixas > 0:
+        print(f"   Renderizacao em faixas de {args.faixas}px (memoria de trabalho: {args.memoria_trabalho} MB)")
+    if args.proxy:
+        print(f"   Modo rascunho (proxy): {args.proxy_reducao}x menor, 1 a cada {args.proxy_passo} frame(s)")
     for i, config in enumerate(VIDEOS_PARA_GERAR, 1):
         print(f"   {i}. {config['nome']} - {config['largura']}x{config['altura']} - {config['descricao']}")
     print("\n" + "="*80)
     
-    # Gera cada vídeo configurado
-    for i, config in enumerate(VIDEOS_PARA_GERAR, 1):
-        print(f"\n\n{'='*80}")
-        print(f"GERANDO VIDEO {i}/{len(VIDEOS_PARA_GERAR)}")
-        print(f"{'='*80}")
-        
-        criar_video_album(
-            largura_video=config['largura'],
-            altura_video=config['altura'],
-            nome_saida=config['nome'],
-            caminho_mascara=config['mascara']
-        )
+    # Gera todos os vídeos configurados (preparação das fotos compartilhada)
+    tarefas = montar_tarefas(VIDEOS_PARA_GERAR, semente=args.seed, variantes=args.variantes,
+                             planos_salvos=planos_salvos, salvar_plano=args.salvar_plano,
+                             codificador={'tipo': args.codificador, 'preset': args.preset, 'crf': args.crf,
+                                          'yuv420_no_processo': args.yuv420},
+                             gravar_metricas=args.metricas,
+                             proxy={'reducao': args.proxy_reducao, 'passo_frames': args.proxy_passo} if args.proxy else None,
+                             frames_por_segmento=args.segmentos,
+                             faixas={'altura': args.faixas, 'memoria_mb': args.memoria_trabalho})
+    resultados = gerar_videos(tarefas, workers=args.workers, videos_simultaneos=args.videos_simultaneos)
     
     print("\n\n" + "="*80)
     print("TODOS OS VIDEOS FORAM GERADOS COM SUCESSO!")
     print("="*80)
     print("\nArquivos gerados:")
-    for i, config in enumerate(VIDEOS_PARA_GERAR, 1):
-        if os.path.exists(config['nome']):
-            tamanho_mb = os.path.getsize(config['nome']) / (1024 * 1024)
-            print(f"   {i}. OK: {config['nome']} ({tamanho_mb:.1f} MB)")
+    for i, (nome_saida, gerado) in enumerate(resultados, 1):
+        if gerado and os.path.exists(nome_saida):
+            tamanho_mb = os.path.getsize(nome_saida) / (1024 * 1024)
+            print(f"   {i}. OK: {nome_saida} ({tamanho_mb:.1f} MB)")
         else:
-            print(f"   {i}. ERRO: {config['nome']} (FALHOU na geracao)")
+            print(f"   {i}. ERRO: {nome_saida} (FALHOU na geracao)")
     print("\n" + "="*80)
-
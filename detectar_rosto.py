@@ -5,41 +5,111 @@ Módulo para detecção de rostos em imagens usando OpenCV Haar Cascade.
 Usado para centralizar o corte das imagens nos rostos detectados.
 """
 
+import io
+import json
+import multiprocessing
+import os
+import time
+
 import cv2
 import numpy as np
 from PIL import Image
 
+import metricas
+from cache_rostos import calcular_hash_conteudo
+from manifesto_fotos import listar_fotos, resumir_ignorados
+
+
+# Parâmetros da detecção (também identificam o cache de rostos: se mudarem,
+# as caixas guardadas deixam de valer)
+ARQUIVO_CLASSIFICADOR = 'haarcascade_frontalface_default.xml'
+FATOR_ESCALA_DETECCAO = 1.1
+VIZINHOS_MINIMOS = 5
+TAMANHO_MINIMO_ROSTO = (30, 30)  # Na imagem reduzida usada para detectar
+LADO_MAXIMO_DETECCAO = 800  # A detecção roda numa cópia com no máximo este lado (pixels)
+ASSINATURA_DETECCAO = (f"{ARQUIVO_CLASSIFICADOR}|{FATOR_ESCALA_DETECCAO}|"
+                       f"{VIZINHOS_MINIMOS}|{TAMANHO_MINIMO_ROSTO[0]}x{TAMANHO_MINIMO_ROSTO[1]}|"
+                       f"{LADO_MAXIMO_DETECCAO}|reduzida")
+
+# Decodificação reduzida: o corte decodificado precisa ter pelo menos
+# MARGEM_DECODIFICACAO vezes o tamanho da célula (LANCZOS ainda suaviza bem)
+MARGEM_DECODIFICACAO = 2
+
+# Identifica como as fotos são recortadas (para os atlas de sprites prontos)
+POLITICA_CORTE = f"{ASSINATURA_DETECCAO}|centro_no_rosto|margem{MARGEM_DECODIFICACAO}|lanczos"
+
+# Classificador do processo atual (carregado uma única vez - ler o XML é caro)
+_classificador = None
+_classificador_carregado = False
+
+
+def obter_classificador():
+    """
+    Retorna o classificador Haar Cascade do processo, carregando-o na primeira chamada.
+    
+    Returns:
+        cv2.CascadeClassifier ou None se esta instalação do OpenCV não tiver o
+        classificador (nesse caso as fotos são cortadas no centro)
+    """
+    global _classificador, _classificador_carregado
+    if not _classificador_carregado:
+        _classificador_carregado = True
+        try:
+            # Este é um modelo pré-treinado que vem com o OpenCV
+            caminho_classificador = cv2.data.haarcascades + ARQUIVO_CLASSIFICADOR
+            classificador = cv2.CascadeClassifier(caminho_classificador)
+            if classificador.empty():
+                print(f"      ⚠️  Detector de rostos indisponível: não foi possível carregar "
+                      f"{caminho_classificador} - as fotos serão cortadas no centro")
+            else:
+                _classificador = classificador
+        except (AttributeError, cv2.error) as e:
+            print(f"      ⚠️  Detector de rostos indisponível nesta instalação do OpenCV ({e}) - "
+                  f"as fotos serão cortadas no centro")
+    return _classificador
+
 
 def detectar_rosto_principal(imagem_pil):
     """
     Detecta o rosto principal em uma imagem PIL e retorna suas coordenadas.
     
+    A busca é feita numa cópia em escala de cinza reduzida (lado máximo
+    LADO_MAXIMO_DETECCAO) e a caixa encontrada é convertida de volta para
+    as coordenadas da imagem original.
+    
     Args:
         imagem_pil: Imagem PIL (RGB)
     
     Returns:
         tuple: (centro_x, centro_y, largura_rosto, altura_rosto) ou None se não detectar rosto
     """
-    # Converte PIL para OpenCV (BGR)
-    imagem_cv = cv2.cvtColor(np.array(imagem_pil), cv2.COLOR_RGB2BGR)
+    face_cascade = obter_classificador()
+    if face_cascade is None:
+        return None
     
     # Converte para escala de cinza (melhor para detecção)
-    gray = cv2.cvtColor(imagem_cv, cv2.COLOR_BGR2GRAY)
+    with metricas.medir('conversao_cor'):
+        gray = cv2.cvtColor(np.asarray(imagem_pil), cv2.COLOR_RGB2GRAY)
     
-    # Carrega o classificador Haar Cascade para rostos
-    # Este é um modelo pré-treinado que vem com o OpenCV
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    # Reduz a imagem: fotos de vários megapixels viram um corte de ~56px,
+    # não precisam ser varridas em resolução total
+    fator = min(1.0, LADO_MAXIMO_DETECCAO / max(gray.shape))
+    if fator < 1.0:
+        with metricas.medir('redimensionamento'):
+            gray = cv2.resize(gray, (max(1, round(gray.shape[1] * fator)), max(1, round(gray.shape[0] * fator))),
+                              interpolation=cv2.INTER_AREA)
     
     # Detecta rostos
     # scaleFactor: quanto a imagem é reduzida em cada escala (1.1 = 10% menor a cada vez)
     # minNeighbors: quantos vizinhos cada retângulo candidato deve ter para ser mantido
     # minSize: tamanho mínimo do rosto em pixels
-    faces = face_cascade.detectMultiScale(
-        gray,
-        scaleFactor=1.1,
-        minNeighbors=5,
-        minSize=(30, 30)
-    )
+    with metricas.medir('deteccao_rosto'):
+        faces = face_cascade.detectMultiScale(
+            gray,
+            scaleFactor=FATOR_ESCALA_DETECCAO,
+            minNeighbors=VIZINHOS_MINIMOS,
+            minSize=TAMANHO_MINIMO_ROSTO
+        )
     
     if len(faces) == 0:
         # Nenhum rosto detectado
@@ -50,8 +120,8 @@ def detectar_rosto_principal(imagem_pil):
         # Ordena por área (largura * altura) em ordem decrescente
         faces = sorted(faces, key=lambda face: face[2] * face[3], reverse=True)
     
-    # Pega o primeiro (maior) rosto
-    x, y, w, h = faces[0]
+    # Pega o primeiro (maior) rosto e volta para as coordenadas originais
+    x, y, w, h = (int(round(v / fator)) for v in faces[0])
     
     # Calcula o centro do rosto
     centro_x = x + w // 2
@@ -73,12 +143,24 @@ def calcular_crop_centralizado_no_rosto(imagem_pil, largura_alvo, altura_alvo):
     Returns:
         tuple: (x_inicio, y_inicio, x_fim, y_fim) - coordenadas do corte
     """
-    largura_img = imagem_pil.width
-    altura_img = imagem_pil.height
-    
     # Tenta detectar rosto
     rosto = detectar_rosto_principal(imagem_pil)
+    return calcular_crop_para_rosto(imagem_pil.width, imagem_pil.height, rosto, largura_alvo, altura_alvo)
+
+
+def calcular_crop_para_rosto(largura_img, altura_img, rosto, largura_alvo, altura_alvo):
+    """
+    Calcula as coordenadas de corte centralizadas em um rosto já conhecido.
+    
+    Args:
+        largura_img, altura_img: Tamanho da imagem original
+        rosto: (centro_x, centro_y, largura_rosto, altura_rosto) ou None (corte no centro)
+        largura_alvo: Largura desejada do corte
+        altura_alvo: Altura desejada do corte
     
+    Returns:
+        tuple: (x_inicio, y_inicio, x_fim, y_fim) - coordenadas do corte
+    """
     if rosto is not None:
         # Rosto detectado! Usa o centro do rosto como ponto de referência
         centro_x, centro_y, rosto_w, rosto_h = rosto
@@ -130,44 +212,145 @@ def calcular_crop_centralizado_no_rosto(imagem_pil, largura_alvo, altura_alvo):
     return (x_inicio, y_inicio, x_fim, y_fim)
 
 
-def carregar_e_redimensionar_com_deteccao_rosto(caminho_imagem, largura, altura, verbose=False):
+def abrir_imagem_reduzida(dados, lado_menor_minimo=0, lado_maior_minimo=0):
+    """
+    Abre a imagem já na menor resolução que ainda atende aos mínimos pedidos.
+    
+    JPEG: usa a escala da DCT do decodificador (draft do PIL: 1/2, 1/4 ou 1/8),
+    então os pixels descartados nem chegam a ser decodificados - economiza
+    tempo e memória. Outros formatos (PNG, WEBP, BMP...) são decodificados
+    inteiros e reduzidos logo em seguida com Image.reduce.
+    
+    Args:
+        dados: Bytes do arquivo
+        lado_menor_minimo: Menor lado mínimo da imagem decodificada (0 = sem mínimo)
+        lado_maior_minimo: Maior lado mínimo da imagem decodificada (0 = sem mínimo)
+    
+    Returns:
+        tuple: (imagem PIL RGB, fator, info) - fator = largura decodificada / largura
+        original; info = {'metodo', 'tamanho_original', 'tamanho_decodificado',
+        'segundos', 'bytes_economizados'}
+    """
+    inicio = time.perf_counter()
+    img = Image.open(io.BytesIO(dados))
+    largura_original, altura_original = img.size
+    
+    # Maior redução inteira que ainda respeita os dois mínimos
+    limites = []
+    if lado_menor_minimo:
+        limites.append(min(largura_original, altura_original) // lado_menor_minimo)
+    if lado_maior_minimo:
+        limites.append(max(largura_original, altura_original) // lado_maior_minimo)
+    reducao = max(1, min(limites)) if limites else 1
+    
+    metodo = 'completa'
+    if reducao > 1 and img.format == 'JPEG':
+        # Pede o tamanho reduzido ANTES de decodificar (o PIL escolhe a escala
+        # da DCT que dá uma imagem pelo menos deste tamanho)
+        img.draft('RGB', (-(-largura_original // reducao), -(-altura_original // reducao)))
+        metodo = 'draft'
+    
+    # Converte para RGB se necessário (também força a decodificação)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    else:
+        img.load()
+    
+    bytes_economizados = (largura_original * altura_original - img.width * img.height) * 3
+    if reducao > 1 and metodo != 'draft':
+        # Sem escala no decodificador: reduz logo após decodificar
+        img = img.reduce(reducao)
+        metodo = 'reduce'
+    
+    info = {
+        'metodo': metodo,
+        'tamanho_original': (largura_original, altura_original),
+        'tamanho_decodificado': img.size,
+        'segundos': time.perf_counter() - inicio,
+        'bytes_economizados': bytes_economizados,
+    }
+    return img, img.width / largura_original, info
+
+
+def converter_rosto(rosto, fator):
+    """Converte a caixa do rosto entre escalas (ex.: imagem reduzida → original)"""
+    if rosto is None:
+        return None
+    return tuple(int(round(v * fator)) for v in rosto)
+
+
+def carregar_e_redimensionar_com_deteccao_rosto(caminho_imagem, largura, altura, verbose=False, cache=None,
+                                                estatisticas=None):
     """
     Carrega e recorta a imagem CENTRALIZANDO NO ROSTO detectado.
     Se não detectar rosto, faz corte centralizado normal.
     
+    A imagem é decodificada em resolução reduzida (ver abrir_imagem_reduzida):
+    grande o bastante para o corte da célula e, se o rosto ainda não estiver
+    no cache, para o detector.
+    
     Args:
         caminho_imagem: Caminho para o arquivo de imagem
         largura: Largura desejada final
         altura: Altura desejada final
         verbose: Se True, imprime informações sobre detecção
+        cache: CacheRostos para reaproveitar detecções anteriores (opcional)
+        estatisticas: Dicionário acumulador da decodificação (opcional) - recebe
+                      'fotos', 'reduzidas', 'segundos' e 'bytes_economizados'
     
     Returns:
         numpy.ndarray: Imagem processada (RGB)
     """
     try:
-        # Abre a imagem
-        img = Image.open(caminho_imagem)
+        # Lê o arquivo uma única vez (os mesmos bytes servem para o hash do cache)
+        with open(caminho_imagem, 'rb') as arquivo:
+            dados = arquivo.read()
         
-        # Converte para RGB se necessário
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
+        # Rosto já conhecido? (caixa nas coordenadas da imagem original)
+        chave = calcular_hash_conteudo(dados) if cache is not None else None
+        encontrado, rosto = cache.obter(chave) if cache is not None else (False, None)
+        
+        # Decodifica só o necessário: o corte precisa de MARGEM_DECODIFICACAO x a
+        # célula; a detecção (se ainda for preciso) de LADO_MAXIMO_DETECCAO
+        with metricas.medir('decodificacao'):
+            img, fator, info = abrir_imagem_reduzida(
+                dados,
+                lado_menor_minimo=MARGEM_DECODIFICACAO * max(largura, altura),
+                lado_maior_minimo=0 if encontrado else LADO_MAXIMO_DETECCAO
+            )
+        
+        if encontrado:
+            rosto_img = converter_rosto(rosto, fator)
+        else:
+            rosto_img = detectar_rosto_principal(img)
+            if cache is not None:
+                cache.guardar(chave, converter_rosto(rosto_img, 1 / fator))
         
         # Calcula coordenadas de corte centralizadas no rosto
-        x_inicio, y_inicio, x_fim, y_fim = calcular_crop_centralizado_no_rosto(img, largura, altura)
+        x_inicio, y_inicio, x_fim, y_fim = calcular_crop_para_rosto(img.width, img.height, rosto_img, largura, altura)
         
-        # Faz o corte
-        img_cortada = img.crop((x_inicio, y_inicio, x_fim, y_fim))
+        with metricas.medir('redimensionamento'):
+            # Faz o corte
+            img_cortada = img.crop((x_inicio, y_inicio, x_fim, y_fim))
+            
+            # Redimensiona para o tamanho final
+            img_final = img_cortada.resize((largura, altura), Image.Resampling.LANCZOS)
         
-        # Redimensiona para o tamanho final
-        img_final = img_cortada.resize((largura, altura), Image.Resampling.LANCZOS)
+        if estatisticas is not None:
+            estatisticas['fotos'] = estatisticas.get('fotos', 0) + 1
+            estatisticas['reduzidas'] = estatisticas.get('reduzidas', 0) + (info['metodo'] != 'completa')
+            estatisticas['segundos'] = estatisticas.get('segundos', 0.0) + info['segundos']
+            estatisticas['bytes_economizados'] = estatisticas.get('bytes_economizados', 0) + info['bytes_economizados']
         
         if verbose:
-            # Verifica se tinha rosto
-            rosto = detectar_rosto_principal(img)
-            if rosto:
+            if rosto_img:
                 print(f"      ✓ Rosto detectado - cortado centralizado no rosto")
             else:
                 print(f"      ○ Sem rosto - cortado no centro")
+            if info['metodo'] != 'completa':
+                (lo, ao), (ld, ad) = info['tamanho_original'], info['tamanho_decodificado']
+                print(f"      ⚡ Decodificada em {ld}x{ad} (original {lo}x{ao}, {info['metodo']}): "
+                      f"{info['bytes_economizados'] / (1024 * 1024):.1f} MB a menos, {info['segundos'] * 1000:.0f} ms")
         
         return np.array(img_final)
         
@@ -178,17 +361,163 @@ def carregar_e_redimensionar_com_deteccao_rosto(caminho_imagem, largura, altura,
         return np.ones((altura, largura, 3), dtype=np.uint8) * 255
 
 
-# Função de teste
+def _analisar_arquivo(caminho_imagem, hashes_conhecidos=frozenset()):
+    """Lê uma imagem e detecta o rosto (se o hash ainda não estiver no cache).
+    
+    Returns:
+        tuple: (caminho, hash, rosto, detectado) - detectado=False quando o rosto
+        já era conhecido (rosto None nesse caso) ou quando o arquivo falhou
+    """
+    try:
+        with open(caminho_imagem, 'rb') as arquivo:
+            dados = arquivo.read()
+        chave = calcular_hash_conteudo(dados)
+        if chave in hashes_conhecidos:
+            return caminho_imagem, chave, None, False
+        # Decodifica só o necessário para o detector e volta para as coordenadas originais
+        with metricas.medir('decodificacao'):
+            img, fator, _ = abrir_imagem_reduzida(dados, lado_maior_minimo=LADO_MAXIMO_DETECCAO)
+        return caminho_imagem, chave, converter_rosto(detectar_rosto_principal(img), 1 / fator), True
+    except Exception:
+        return caminho_imagem, None, None, False
+
+
+# Hashes já no cache, compartilhados com os processos do lote
+_hashes_conhecidos_trabalhador = frozenset()
+
+
+def _inicializar_trabalhador_lote(hashes_conhecidos):
+    global _hashes_conhecidos_trabalhador
+    _hashes_conhecidos_trabalhador = hashes_conhecidos
+    obter_classificador()  # Carrega o classificador uma vez por processo
+
+
+def _analisar_arquivo_trabalhador(caminho_imagem):
+    return _analisar_arquivo(caminho_imagem, _hashes_conhecidos_trabalhador)
+
+
+def detectar_rostos_em_lote(caminhos, workers=None, cache=None, verbose=False):
+    """
+    Detecta o rosto principal de várias imagens, em paralelo.
+    
+    Cada processo carrega o classificador uma única vez. Fotos cujo conteúdo
+    já está no cache não passam pelo detector; as novas detecções são
+    guardadas no cache (que NÃO é salvo aqui - chame cache.salvar()).
+    
+    Args:
+        caminhos: Lista de caminhos de imagem (repetições são analisadas uma vez)
+        workers: Número de processos (None = todos os núcleos)
+        cache: CacheRostos (opcional)
+        verbose: Se True, imprime o resumo com a vazão (imagens/s)
+    
+    Returns:
+        tuple: (rostos, estatisticas) - rostos: dicionário caminho -> {'hash', 'rosto'};
+        estatisticas: {'imagens', 'detectadas', 'do_cache', 'erros', 'segundos', 'imagens_por_segundo'}
+    """
+    caminhos_unicos = list(dict.fromkeys(caminhos))
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, len(caminhos_unicos)))
+    hashes_conhecidos = frozenset(cache.chaves()) if cache is not None else frozenset()
+    
+    inicio = time.time()
+    if workers == 1:
+        _inicializar_trabalhador_lote(hashes_conhecidos)
+        resultados = map(_analisar_arquivo_trabalhador, caminhos_unicos)
+        pool = None
+    else:
+        metodos = multiprocessing.get_all_start_methods()
+        contexto = multiprocessing.get_context('fork' if 'fork' in metodos else 'spawn')
+        pool = contexto.Pool(workers, initializer=_inicializar_trabalhador_lote,
+                             initargs=(hashes_conhecidos,))
+        resultados = pool.imap_unordered(_analisar_arquivo_trabalhador, caminhos_unicos, chunksize=4)
+    
+    rostos = {}
+    detectadas = do_cache = erros = 0
+    try:
+        for caminho_imagem, chave, rosto, detectado in resultados:
+            if chave is None:
+                erros += 1
+                continue
+            if detectado:
+                detectadas += 1
+                if cache is not None:
+                    cache.guardar(chave, rosto)
+            else:
+                do_cache += 1
+                _, rosto = cache.obter(chave)
+            rostos[caminho_imagem] = {'hash': chave, 'rosto': rosto}
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    segundos = time.time() - inicio
+    
+    estatisticas = {
+        'imagens': len(caminhos_unicos),
+        'detectadas': detectadas,
+        'do_cache': do_cache,
+        'erros': erros,
+        'segundos': segundos,
+        'imagens_por_segundo': len(caminhos_unicos) / segundos if segundos > 0 else 0.0,
+    }
+    # Com vários processos, os tempos por imagem ficam neles: o lote entra inteiro
+    metricas.anotar('deteccao_rostos_lote', dict(estatisticas, processos=workers))
+    if verbose:
+        print(f"   👤 {estatisticas['imagens']} imagens analisadas em {segundos:.2f}s "
+              f"({estatisticas['imagens_por_segundo']:.1f} imagens/s, {workers} processos)")
+        print(f"      • {detectadas} detectadas agora | {do_cache} do cache | {erros} com erro")
+    return rostos, estatisticas
+
+
+# Função de teste / modo em lote
 if __name__ == "__main__":
-    import sys
+    import argparse
+    from cache_rostos import CacheRostos
+    
+    parser = argparse.ArgumentParser(description="Detecção de rostos (teste de uma imagem ou lote de uma pasta)")
+    parser.add_argument('imagem', nargs='?', help='Imagem para testar a detecção e o corte')
+    parser.add_argument('--lote', metavar='PASTA', help='Analisa todas as imagens da pasta')
+    parser.add_argument('--saida', metavar='ARQUIVO', default='rostos.json',
+                        help='JSON com as caixas de rosto do lote (padrão: rostos.json)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Processos usados no lote (padrão: todos os núcleos)')
+    parser.add_argument('--cache', metavar='ARQUIVO', default=None,
+                        help='Cache de rostos a consultar e atualizar (ex.: .cache_mosaico/rostos.json)')
+    args = parser.parse_args()
     
     print("\n" + "="*60)
     print("TESTE DE DETECÇÃO DE ROSTOS")
     print("="*60)
     
-    if len(sys.argv) > 1:
+    if args.lote:
+        ignorados = []
+        caminhos = listar_fotos(args.lote, ignorados)
+        print(f"\n📸 {len(caminhos)} imagens em {args.lote}")
+        if ignorados:
+            print(f"   ⚠️  {len(ignorados)} arquivo(s) ignorado(s) - não são JPEG, PNG, BMP nem WEBP: "
+                  f"{resumir_ignorados(ignorados)}")
+        cache = CacheRostos(args.cache, ASSINATURA_DETECCAO) if args.cache else None
+        rostos, estatisticas = detectar_rostos_em_lote(caminhos, workers=args.workers, cache=cache, verbose=True)
+        if cache is not None:
+            cache.salvar()
+        
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump({
+                'assinatura': ASSINATURA_DETECCAO,
+                'estatisticas': estatisticas,
+                'imagens': {
+                    caminho: {'hash': info['hash'],
+                              'rosto': list(info['rosto']) if info['rosto'] is not None else None}
+                    for caminho, info in sorted(rostos.items())
+                },
+            }, arquivo, indent=2, ensure_ascii=False)
+        com_rosto = sum(1 for info in rostos.values() if info['rosto'] is not None)
+        print(f"\n✓ {com_rosto} de {len(rostos)} imagens com rosto")
+        print(f"💾 Caixas salvas em: {args.saida}")
+    
+    elif args.imagem:
         # Testa com imagem fornecida
-        caminho = sys.argv[1]
+        caminho = args.imagem
         print(f"\nTestando com: {caminho}")
         
         img = Image.open(caminho)
@@ -206,13 +535,24 @@ if __name__ == "__main__":
         else:
             print("✗ Nenhum rosto detectado")
         
+        print("\nComparando decodificação completa x reduzida (célula 56x56)...")
+        with open(caminho, 'rb') as arquivo:
+            dados = arquivo.read()
+        _, _, completa = abrir_imagem_reduzida(dados)
+        _, _, reduzida = abrir_imagem_reduzida(dados, lado_menor_minimo=MARGEM_DECODIFICACAO * 56)
+        print(f"  • Completa: {completa['tamanho_decodificado'][0]}x{completa['tamanho_decodificado'][1]} "
+              f"em {completa['segundos'] * 1000:.0f} ms")
+        print(f"  • Reduzida ({reduzida['metodo']}): {reduzida['tamanho_decodificado'][0]}x"
+              f"{reduzida['tamanho_decodificado'][1]} em {reduzida['segundos'] * 1000:.0f} ms")
+        print(f"  • Economia: {(completa['segundos'] - reduzida['segundos']) * 1000:.0f} ms e "
+              f"{reduzida['bytes_economizados'] / (1024 * 1024):.1f} MB")
+        
         print("\nTestando corte 100x100 centralizado no rosto...")
         img_cortada = carregar_e_redimensionar_com_deteccao_rosto(caminho, 100, 100, verbose=True)
         print(f"Imagem final: {img_cortada.shape}")
         
     else:
         print("\nUso: python detectar_rosto.py <caminho_imagem>")
+        print("     python detectar_rosto.py --lote <pasta> [--saida rostos.json] [--workers N]")
     
     print("\n" + "="*60)
-
-
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Manifesto da pasta de fotos: caminho, tamanho, data de modificação, formato e
+hash do conteúdo de cada arquivo.
+
+A pasta é lida numa única passada de os.scandir (o tamanho e a data vêm da
+própria listagem) e o formato é reconhecido pelos primeiros bytes do arquivo
+(JPEG, PNG, BMP ou WEBP), não pela extensão: entram fotos sem extensão, com
+extensão trocada ou com maiúsculas misturadas (.Jpg), e ficam de fora os
+arquivos que não são imagens, mesmo com nome de imagem (._foto.jpg do macOS).
+
+Arquivos que não são reconhecidos ficam de fora, mas são listados
+(ManifestoFotos.ignorados): uma foto num formato que o OpenCV não abre - como
+HEIC/AVIF do iPhone, mesmo sem extensão - não some sem aviso.
+
+O manifesto fica salvo entre execuções (JSON no cache). Arquivo com o mesmo
+tamanho e data da execução anterior não é nem aberto: formato e hash vêm do
+manifesto. Só os novos e os modificados são lidos - e a comparação dos hashes
+diz quais fotos são novas, quais mudaram de conteúdo e quais foram apagadas.
+Como os caches seguintes (rostos, atlas de sprites) são indexados pelo hash,
+só essas fotos são processadas de novo.
+"""
+
+import hashlib
+import json
+import os
+
+
+# Versão do formato do arquivo do manifesto
+VERSAO_FORMATO_MANIFESTO_FOTOS = 1
+
+# Bytes do início do arquivo lidos para reconhecer o formato
+BYTES_CABECALHO = 32
+
+# Tamanhos válidos do cabeçalho DIB de um BMP (BITMAPCOREHEADER ... BITMAPV5HEADER)
+TAMANHOS_CABECALHO_BMP = (12, 40, 52, 56, 64, 108, 124)
+
+# Marcas ("brands") da caixa ftyp de fotos HEIF que o OpenCV não decodifica
+MARCAS_HEIF = {b'heic': 'HEIC', b'heix': 'HEIC', b'heim': 'HEIC', b'heis': 'HEIC',
+               b'hevc': 'HEIC', b'hevx': 'HEIC', b'mif1': 'HEIF', b'msf1': 'HEIF',
+               b'avif': 'AVIF', b'avis': 'AVIF'}
+
+# Arquivos ignorados citados pelo nome na mensagem de resumir_ignorados
+NOMES_IGNORADOS_MOSTRADOS = 5
+
+
+def identificar_formato(cabecalho):
+    """Formato da imagem pelos primeiros bytes do arquivo ('jpeg', 'png',
+    'bmp' ou 'webp') - None se não for uma imagem aceita"""
+    if cabecalho[:3] == b'\xff\xd8\xff':
+        return 'jpeg'
+    if cabecalho[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'png'
+    if cabecalho[:4] == b'RIFF' and cabecalho[8:12] == b'WEBP':
+        return 'webp'
+    # "BM" sozinho é fraco demais (qualquer texto pode começar assim): confere
+    # também o tamanho do cabeçalho DIB
+    if cabecalho[:2] == b'BM' and len(cabecalho) >= 18 and \
+            int.from_bytes(cabecalho[14:18], 'little') in TAMANHOS_CABECALHO_BMP:
+        return 'bmp'
+    return None
+
+
+def identificar_formato_nao_suportado(cabecalho):
+    """Nome de um formato de imagem reconhecido mas não aceito ('HEIC', 'HEIF'
+    ou 'AVIF' - fotos de celular que o OpenCV não abre), ou None"""
+    if cabecalho[4:8] == b'ftyp':
+        return MARCAS_HEIF.get(cabecalho[8:12])
+    return None
+
+
+def resumir_ignorados(caminhos):
+    """Texto com os arquivos ignorados (os primeiros pelo nome, com o formato
+    quando ele é conhecido), para os avisos do console"""
+    nomes = []
+    for caminho in caminhos[:NOMES_IGNORADOS_MOSTRADOS]:
+        try:
+            with open(caminho, 'rb') as arquivo:
+                formato = identificar_formato_nao_suportado(arquivo.read(BYTES_CABECALHO))
+        except OSError:
+            formato = None
+        nome = os.path.basename(caminho)
+        nomes.append(f"{nome} ({formato} - converta para JPEG)" if formato else nome)
+    if len(caminhos) > NOMES_IGNORADOS_MOSTRADOS:
+        nomes.append(f"e mais {len(caminhos) - NOMES_IGNORADOS_MOSTRADOS}")
+    return ', '.join(nomes)
+
+
+def _ler_arquivo(caminho, calcular_hash=True):
+    """Lê o arquivo uma vez: retorna (formato, hash do conteúdo). O hash só é
+    calculado se o arquivo for uma imagem (e calcular_hash for True)."""
+    with open(caminho, 'rb') as arquivo:
+        cabecalho = arquivo.read(BYTES_CABECALHO)
+        formato = identificar_formato(cabecalho)
+        if formato is None or not calcular_hash:
+            return formato, None
+        sha1 = hashlib.sha1(cabecalho)
+        for bloco in iter(lambda: arquivo.read(1024 * 1024), b''):
+            sha1.update(bloco)
+    return formato, sha1.hexdigest()
+
+
+def listar_fotos(pasta, ignorados=None):
+    """Lista (ordenadas) as imagens da pasta, reconhecidas pelo conteúdo.
+    Sem manifesto: lê só o cabeçalho de cada arquivo.
+
+    Args:
+        ignorados: lista que recebe (ordenados) os arquivos que não foram
+                   reconhecidos como imagem (None = não guarda)
+    """
+    fotos = []
+    with os.scandir(pasta) as entradas:
+        for entrada in entradas:
+            try:
+                if not entrada.is_file():
+                    continue
+                if _ler_arquivo(entrada.path, calcular_hash=False)[0]:
+                    fotos.append(entrada.path)
+                elif ignorados is not None:
+                    ignorados.append(entrada.path)
+            except OSError:
+                continue  # Sumiu ou não pode ser lido: não é uma foto utilizável
+    if ignorados is not None:
+        ignorados.sort()
+    return sorted(fotos)
+
+
+class ManifestoFotos:
+    """
+    Arquivos de uma pasta de fotos (tamanho, mtime, formato e hash) e o que
+    mudou desde a execução anterior.
+
+    Depois de atualizar():
+        caminhos: fotos da pasta, ordenadas
+        novas / alteradas / removidas: caminhos de cada tipo de mudança
+        ignorados: arquivos da pasta que não são imagens aceitas, ordenados
+    """
+
+    def __init__(self, pasta, caminho_arquivo=None):
+        """
+        Args:
+            pasta: Pasta das fotos
+            caminho_arquivo: JSON onde o manifesto fica entre execuções (None =
+                             não guarda: todos os arquivos são lidos e contam como novos)
+        """
+        self.pasta = pasta
+        self.caminho_arquivo = caminho_arquivo
+        self._chave_pasta = os.path.abspath(pasta)
+        self._outras_pastas = {}  # Manifestos de outras pastas no mesmo arquivo (preservados)
+        self._anteriores = {}  # nome -> entrada da execução anterior
+        self._entradas = {}  # nome -> {'tamanho', 'mtime_ns', 'formato', 'hash'}
+        self._modificado = False
+        self.caminhos = []
+        self.novas = []
+        self.alteradas = []
+        self.removidas = []
+        self.ignorados = []
+        self.arquivos_lidos = 0
+        self._carregar()
+
+    def _carregar(self):
+        if not self.caminho_arquivo or not os.path.exists(self.caminho_arquivo):
+            return
+        try:
+            with open(self.caminho_arquivo, 'r', encoding='utf-8') as arquivo:
+                dados = json.load(arquivo)
+        except (OSError, ValueError):
+            return  # Arquivo corrompido: começa do zero (será regravado)
+        if dados.get('versao') != VERSAO_FORMATO_MANIFESTO_FOTOS:
+            return
+        self._outras_pastas = dados.get('pastas', {})
+        self._anteriores = self._outras_pastas.pop(self._chave_pasta, {})
+
+    def atualizar(self):
+        """Lista a pasta (uma passada de os.scandir), lê só os arquivos novos ou
+        modificados e separa as fotos novas, alteradas e removidas. Retorna self."""
+        entradas = {}
+        self.novas, self.alteradas = [], []
+        self.arquivos_lidos = 0
+        with os.scandir(self.pasta) as listagem:
+            for item in listagem:
+                try:
+                    if not item.is_file():
+                        continue
+                    info = item.stat()
+                    anterior = self._anteriores.get(item.name)
+                    if anterior is not None and anterior['tamanho'] == info.st_size and \
+                            anterior['mtime_ns'] == info.st_mtime_ns:
+                        entradas[item.name] = anterior
+                        continue
+                    formato, hash_conteudo = _ler_arquivo(item.path)
+                    self.arquivos_lidos += 1
+                except OSError:
+                    continue  # Sumiu durante a listagem ou não pode ser lido
+                # Arquivos que não são imagens também entram (com formato None):
+                # assim não são abertos de novo na próxima execução
+                entradas[item.name] = {'tamanho': info.st_size, 'mtime_ns': info.st_mtime_ns,
+                                       'formato': formato, 'hash': hash_conteudo}
+                if formato is None:
+                    continue
+                if anterior is None or anterior['formato'] is None:
+                    self.novas.append(item.path)
+                elif anterior['hash'] != hash_conteudo:
+                    self.alteradas.append(item.path)
+                # Mesmo conteúdo com outra data (arquivo copiado ou "tocado"): nada a refazer
+
+        self.removidas = sorted(os.path.join(self.pasta, nome) for nome, anterior in self._anteriores.items()
+                                if anterior['formato'] is not None and
+                                (nome not in entradas or entradas[nome]['formato'] is None))
+        self.novas.sort()
+        self.alteradas.sort()
+        self.caminhos = sorted(os.path.join(self.pasta, nome) for nome, entrada in entradas.items()
+                               if entrada['formato'] is not None)
+        self.ignorados = sorted(os.path.join(self.pasta, nome) for nome, entrada in entradas.items()
+                                if entrada['formato'] is None)
+        self._modificado = self._modificado or entradas != self._anteriores
+        self._entradas = entradas
+        self._anteriores = entradas
+        return self
+
+    def hashes(self):
+        """Retorna {(caminho, tamanho, mtime_ns): hash} de todas as fotos"""
+        return {
+            (os.path.join(self.pasta, nome), entrada['tamanho'], entrada['mtime_ns']): entrada['hash']
+            for nome, entrada in self._entradas.items() if entrada['formato'] is not None
+        }
+
+    def salvar(self):
+        """Grava o manifesto no disco (só se mudou). A escrita é atômica: grava em
+        um arquivo temporário e o renomeia, para nunca deixar um JSON pela metade."""
+        if not self._modificado or not self.caminho_arquivo:
+            return
+        pasta = os.path.dirname(self.caminho_arquivo)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        pastas = dict(self._outras_pastas)
+        pastas[self._chave_pasta] = self._entradas
+        temporario = self.caminho_arquivo + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump({'versao': VERSAO_FORMATO_MANIFESTO_FOTOS, 'pastas': pastas}, arquivo)
+        os.replace(temporario, self.caminho_arquivo)
+        self._modificado = False
+
+    def estatisticas(self):
+        """Retorna um dicionário com o resumo da última atualização"""
+        return {
+            'fotos': len(self.caminhos),
+            'novas': len(self.novas),
+            'alteradas': len(self.alteradas),
+            'removidas': len(self.removidas),
+            'ignorados': len(self.ignorados),
+            'arquivos_lidos': self.arquivos_lidos,
+        }
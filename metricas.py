@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Métricas de desempenho do criar_video_album.py (tempos, contadores e memória).
+
+Com as métricas ligadas (--metricas), os pontos quentes do código -
+decodificação, detecção de rosto, redimensionamento, mistura da máscara,
+warp, composição, conversão de cores e escrita do vídeo - acumulam o tempo
+gasto e quantas vezes rodaram; cada frame guarda o seu tempo de renderização,
+quantas fotos desenhou e quantos pixels passaram pelo warp. No fim, um
+relatório JSON é gravado ao lado do vídeo (<nome>.metricas.json) com o tempo
+de cada fase, os percentis do tempo por frame, as taxas de acerto dos caches
+e o pico de memória.
+
+Desligadas (o padrão), `registro` é None: medir() devolve sempre o mesmo
+contexto vazio e as demais funções do módulo retornam na hora - o custo é
+uma chamada de função por ponto medido.
+"""
+
+import contextlib
+import json
+import sys
+import time
+
+import numpy as np
+
+try:
+    import resource  # Pico de memória (não existe no Windows)
+except ImportError:
+    resource = None
+
+
+# Versão do formato do relatório
+VERSAO_FORMATO_METRICAS = 1
+
+# Registro ativo do processo (None = métricas desligadas)
+registro = None
+
+_CONTEXTO_VAZIO = contextlib.nullcontext()
+
+
+def pico_rss_mb():
+    """Pico de memória residente (RSS) deste processo e dos seus filhos já
+    encerrados, em MB (None onde o módulo resource não existe)"""
+    if resource is None:
+        return None
+    # ru_maxrss: kilobytes no Linux, bytes no macOS
+    unidade = 1 if sys.platform == 'darwin' else 1024
+    proprio = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    filhos = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(proprio, filhos) * unidade / (1024 * 1024)
+
+
+class _Medicao:
+    """Contexto que soma o tempo do bloco em registro.tempos[nome]"""
+
+    __slots__ = ('registro', 'nome', 'inicio')
+
+    def __init__(self, registro_ativo, nome):
+        self.registro = registro_ativo
+        self.nome = nome
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+
+    def __exit__(self, *_):
+        self.registro.adicionar_tempo(self.nome, time.perf_counter() - self.inicio)
+
+
+class RegistroMetricas:
+    """Tempos por ponto quente, contadores e dados por frame de um processo"""
+
+    def __init__(self):
+        self.tempos = {}  # nome -> [segundos, chamadas]
+        self.contadores = {}  # nome -> total
+        self.fases = {}  # nome da fase -> segundos (tempo de parede)
+        self.frames = []  # (segundos, fotos desenhadas, pixels no warp) de cada frame
+        self.anotacoes = {}  # Estatísticas prontas (caches, fila de escrita...) -> vão direto para o relatório
+        self._inicio_frame = None
+
+    def adicionar_tempo(self, nome, segundos, chamadas=1):
+        total = self.tempos.get(nome)
+        if total is None:
+            self.tempos[nome] = [segundos, chamadas]
+        else:
+            total[0] += segundos
+            total[1] += chamadas
+
+    def contar(self, nome, quantidade=1):
+        self.contadores[nome] = self.contadores.get(nome, 0) + quantidade
+
+    def iniciar_frame(self):
+        """Marca o início de um frame (tempo e contadores de fotos e pixels)"""
+        self._inicio_frame = (time.perf_counter(), self.contadores.get('fotos_desenhadas', 0),
+                              self.contadores.get('pixels_warp', 0))
+
+    def fechar_frame(self):
+        """Encerra o frame iniciado: guarda o tempo, as fotos desenhadas e os pixels do warp dele"""
+        inicio, fotos, pixels = self._inicio_frame
+        self.frames.append((time.perf_counter() - inicio, self.contadores.get('fotos_desenhadas', 0) - fotos,
+                            self.contadores.get('pixels_warp', 0) - pixels))
+
+    def exportar(self):
+        """Dados brutos (para juntar os registros dos processos de renderização)"""
+        return {'tempos': self.tempos, 'contadores': self.contadores, 'frames': self.frames}
+
+    def incorporar(self, dados):
+        """Soma os dados exportados por outro processo a este registro"""
+        for nome, (segundos, chamadas) in dados['tempos'].items():
+            self.adicionar_tempo(nome, segundos, chamadas)
+        for nome, quantidade in dados['contadores'].items():
+            self.contar(nome, quantidade)
+        self.frames.extend(dados['frames'])
+
+    def relatorio(self, extras=None):
+        """Relatório completo (dicionário pronto para JSON)"""
+        relatorio = {
+            'versao': VERSAO_FORMATO_METRICAS,
+            'fases_segundos': dict(self.fases),
+            'pontos_quentes': {
+                nome: {'segundos': segundos, 'chamadas': chamadas,
+                       'ms_por_chamada': segundos * 1000 / chamadas if chamadas else 0.0}
+                for nome, (segundos, chamadas) in sorted(self.tempos.items(), key=lambda item: -item[1][0])
+            },
+            'contadores': dict(self.contadores),
+            'frames': _resumir_frames(self.frames),
+            'pico_rss_mb': pico_rss_mb(),
+        }
+        relatorio.update(self.anotacoes)
+        relatorio.update(extras or {})
+        return relatorio
+
+
+def _resumir_frames(frames):
+    if not frames:
+        return None
+    dados = np.asarray(frames, dtype=np.float64)
+    tempos_ms = dados[:, 0] * 1000
+    return {
+        'quantidade': len(frames),
+        'ms_media': float(tempos_ms.mean()),
+        'ms_p50': float(np.percentile(tempos_ms, 50)),
+        'ms_p90': float(np.percentile(tempos_ms, 90)),
+        'ms_p99': float(np.percentile(tempos_ms, 99)),
+        'ms_max': float(tempos_ms.max()),
+        'fotos_por_frame_media': float(dados[:, 1].mean()),
+        'fotos_por_frame_max': int(dados[:, 1].max()),
+        'pixels_warp_por_frame_media': float(dados[:, 2].mean()),
+        'pixels_warp_por_frame_max': int(dados[:, 2].max()),
+    }
+
+
+def ativar():
+    """Liga as métricas neste processo (com um registro novo) e o retorna"""
+    global registro
+    registro = RegistroMetricas()
+    return registro
+
+
+def desativar():
+    global registro
+    registro = None
+
+
+def medir(nome):
+    """Contexto que mede o bloco como o ponto quente `nome` (vazio se desligado)"""
+    if registro is None:
+        return _CONTEXTO_VAZIO
+    return _Medicao(registro, nome)
+
+
+def contar(nome, quantidade=1):
+    if registro is not None:
+        registro.contar(nome, quantidade)
+
+
+def marcar_fase(nome, inicio):
+    """Registra o tempo de parede da fase `nome`, iniciada em `inicio` (time.perf_counter())"""
+    if registro is not None:
+        registro.fases[nome] = time.perf_counter() - inicio
+
+
+def anotar(nome, valor):
+    """Guarda estatísticas já calculadas em outro lugar (vão como estão para o relatório)"""
+    if registro is not None and valor is not None:
+        registro.anotacoes[nome] = valor
+
+
+def salvar_relatorio(caminho, relatorio):
+    """Grava o relatório JSON"""
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
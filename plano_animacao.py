@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Plano da animação do mosaico em formato "estrutura de arrays" (NumPy).
+
+Em vez de uma lista de dicionários (um por foto), cada característica das
+fotos fica num array próprio, na ordem de entrada (onda por onda). Assim o
+estado de TODAS as fotos ativas em um frame (posição, ângulo, escala,
+opacidade e transição de máscara) sai de poucas operações vetorizadas, e o
+custo em Python por frame não cresce com o número de fotos do grid.
+
+O plano pode ser salvo em um arquivo .npz compacto (PlanoAnimacao.salvar) e
+recarregado depois (PlanoAnimacao.carregar) para renderizar de novo o mesmo
+vídeo sem refazer o planejamento.
+"""
+
+import hashlib
+from collections import namedtuple
+
+import numpy as np
+
+
+# Categorias de tamanho das fotos
+TIPO_NORMAL = 0
+TIPO_DESTAQUE = 1
+TIPO_GIGANTE = 2
+NOMES_TIPOS = {TIPO_NORMAL: 'normal', TIPO_DESTAQUE: 'destaque', TIPO_GIGANTE: 'gigante'}
+
+# Versão do formato do arquivo de plano (.npz)
+VERSAO_FORMATO_PLANO = 1
+
+# Arrays por foto gravados no arquivo (os demais são derivados deles)
+CAMPOS_FOTOS = ('indice', 'x_origem', 'y_origem', 'x_final', 'y_final', 'direcao',
+                'angulo_inicial', 'escala_inicial', 'escala_final_gigante', 'tipo', 'onda')
+CAMPOS_ESCALARES = ('frames_por_onda', 'delay_frames',
+                    'largura_foto', 'altura_foto', 'largura_video', 'altura_video')
+
+# Estado das fotos ativas em um frame (um array por campo, na ordem de desenho)
+EstadoFotos = namedtuple('EstadoFotos', [
+    'indices',     # Índice da foto/célula (aponta para as fotos preparadas)
+    'x', 'y',      # Posição atual (canto superior esquerdo da célula, em pixels)
+    'angulo',      # Ângulo atual (graus)
+    'escala',      # Escala atual (1.0 = tamanho da célula)
+    'mistura',     # Transição de máscara: 0.0 = original, 1.0 = com máscara
+    'opacidade',   # 0.0 = invisível, 1.0 = opaca (fade das fotos gigantes)
+    'progresso',   # Progresso do movimento (0.0 a 1.0, já com easing)
+])
+
+
+class PlanoAnimacao:
+    """
+    Plano completo da animação: um array por característica das fotos.
+
+    Todos os arrays estão na ordem de entrada (a mesma da saída): as fotos de
+    cada onda ficam juntas e as ondas aparecem em ordem. Como todas as ondas
+    têm a mesma duração, frame_inicio e frame_fim são crescentes, e as fotos
+    ativas em qualquer frame formam sempre um trecho contíguo dos arrays.
+    """
+
+    def __init__(self, indice, x_origem, y_origem, x_final, y_final, direcao,
+                 angulo_inicial, escala_inicial, escala_final_gigante, tipo, onda,
+                 frames_por_onda, delay_frames,
+                 largura_foto, altura_foto, largura_video, altura_video,
+                 imagens=None, semente=None):
+        """
+        Args:
+            imagens: Caminho da imagem de cada célula do grid (indexado por indice)
+            semente: Semente do random usada para sortear o plano (None = desconhecida)
+        """
+        self.indice = np.asarray(indice, dtype=np.int32)
+        self.x_origem = np.asarray(x_origem, dtype=np.int32)
+        self.y_origem = np.asarray(y_origem, dtype=np.int32)
+        self.x_final = np.asarray(x_final, dtype=np.int32)
+        self.y_final = np.asarray(y_final, dtype=np.int32)
+        self.direcao = np.asarray(direcao, dtype=np.int8)
+        self.angulo_inicial = np.asarray(angulo_inicial, dtype=np.float64)
+        self.escala_inicial = np.asarray(escala_inicial, dtype=np.float64)
+        self.escala_final_gigante = np.asarray(escala_final_gigante, dtype=np.float64)
+        self.tipo = np.asarray(tipo, dtype=np.int8)
+        self.onda = np.asarray(onda, dtype=np.int32)
+
+        self.frames_por_onda = int(frames_por_onda)
+        self.delay_frames = int(delay_frames)
+        self.largura_foto = int(largura_foto)
+        self.altura_foto = int(altura_foto)
+        self.largura_video = int(largura_video)
+        self.altura_video = int(altura_video)
+        self.imagens = list(imagens) if imagens is not None else None
+        self.semente = semente
+
+        # Agenda das ondas (derivada): cada onda começa delay_frames depois da anterior
+        self.frame_inicio = self.onda * self.delay_frames
+        self.frame_fim = self.frame_inicio + self.frames_por_onda
+        self.eh_gigante = self.tipo == TIPO_GIGANTE
+
+        # Curvas de easing pré-calculadas para cada frame local de uma onda
+        # Linha 0: fotos normais/destaque (quintic) | Linha 1: gigantes (quadrático - mais "pesado")
+        progresso = np.arange(self.frames_por_onda) / self.frames_por_onda
+        self.easing_entrada = np.stack([1 - (1 - progresso) ** 5, 1 - (1 - progresso) ** 2])
+        self.easing_saida = np.stack([progresso ** 5, progresso ** 2])
+
+        # Opacidade das gigantes: sem divisão por zero para as demais categorias
+        self._faixa_fade = np.where(self.eh_gigante,
+                                    self.escala_inicial - self.escala_final_gigante, 1.0)
+
+    @property
+    def num_fotos(self):
+        return len(self.indice)
+
+    @property
+    def num_ondas(self):
+        return int(self.onda[-1]) + 1 if len(self.onda) else 0
+
+    @property
+    def frames_animacao(self):
+        """Duração (em frames) da entrada - e também da saída"""
+        return int(self.frame_fim.max()) if len(self.frame_fim) else 0
+
+    def posicoes_celulas(self):
+        """Posição final (x, y) de cada célula, indexada pelo índice da foto"""
+        posicoes = [None] * self.num_fotos
+        for indice, x, y in zip(self.indice.tolist(), self.x_final.tolist(), self.y_final.tolist()):
+            posicoes[indice] = (x, y)
+        return posicoes
+
+    def redimensionado(self, largura_foto, altura_foto, largura_video, altura_video):
+        """Cópia do plano para outra resolução (ex.: o rascunho do modo proxy).
+
+        Ondas, tempos, ângulos, escalas e direções continuam os mesmos; só as
+        posições (origem e destino de cada foto) são reescaladas na proporção
+        da nova célula - a animação é a mesma, em outro tamanho."""
+        fator_x = largura_foto / self.largura_foto
+        fator_y = altura_foto / self.altura_foto
+        campos = {campo: getattr(self, campo) for campo in CAMPOS_FOTOS}
+        for campo, fator in (('x_origem', fator_x), ('x_final', fator_x), ('y_origem', fator_y), ('y_final', fator_y)):
+            campos[campo] = np.round(campos[campo] * fator).astype(np.int32)
+        return PlanoAnimacao(frames_por_onda=self.frames_por_onda, delay_frames=self.delay_frames,
+                             largura_foto=largura_foto, altura_foto=altura_foto,
+                             largura_video=largura_video, altura_video=altura_video,
+                             imagens=self.imagens, semente=self.semente, **campos)
+
+    def assinatura(self):
+        """Hash (SHA-1) de tudo o que define a animação: arrays por foto, tempos e tamanhos"""
+        sha1 = hashlib.sha1()
+        for campo in CAMPOS_FOTOS:
+            sha1.update(np.ascontiguousarray(getattr(self, campo)).tobytes())
+        sha1.update(repr(tuple(getattr(self, campo) for campo in CAMPOS_ESCALARES)).encode('utf-8'))
+        return sha1.hexdigest()
+
+    def salvar(self, caminho):
+        """Salva o plano (agenda das ondas, parâmetros de cada foto e lista de
+        imagens) em um arquivo .npz compactado"""
+        arrays = {campo: getattr(self, campo) for campo in CAMPOS_FOTOS}
+        arrays.update({campo: np.int64(getattr(self, campo)) for campo in CAMPOS_ESCALARES})
+        np.savez_compressed(
+            caminho,
+            versao=np.int64(VERSAO_FORMATO_PLANO),
+            imagens=np.array(self.imagens if self.imagens is not None else [], dtype=str),
+            semente=np.int64(self.semente if self.semente is not None else -1),
+            **arrays
+        )
+
+    @classmethod
+    def carregar(cls, caminho):
+        """Carrega um plano salvo com salvar()"""
+        with np.load(caminho, allow_pickle=False) as dados:
+            versao = int(dados['versao'])
+            if versao != VERSAO_FORMATO_PLANO:
+                raise ValueError(f"Formato de plano não suportado: versão {versao} "
+                                 f"(esperada {VERSAO_FORMATO_PLANO})")
+            campos = {campo: dados[campo] for campo in CAMPOS_FOTOS}
+            campos.update({campo: int(dados[campo]) for campo in CAMPOS_ESCALARES})
+            imagens = dados['imagens'].tolist()
+            semente = int(dados['semente'])
+        return cls(imagens=imagens or None, semente=semente if semente >= 0 else None, **campos)
+
+    def tamanhos_ondas(self):
+        """Número de fotos em cada onda"""
+        return np.bincount(self.onda, minlength=self.num_ondas)
+
+    def contar_tipos(self):
+        """Número de fotos em cada categoria (dicionário nome -> quantidade)"""
+        return {nome: int(np.count_nonzero(self.tipo == tipo)) for tipo, nome in NOMES_TIPOS.items()}
+
+    def fotos_concluidas(self, frame):
+        """Quantas fotos (as primeiras do plano) já terminaram o movimento neste frame
+        (na entrada: já assentaram na posição final; na saída: já saíram da tela)"""
+        return int(np.searchsorted(self.frame_fim, frame, side='right'))
+
+    def fotos_iniciadas(self, frame):
+        """Quantas fotos (as primeiras do plano) já começaram a se mover neste frame"""
+        return int(np.searchsorted(self.frame_inicio, frame, side='right'))
+
+    def _opacidade(self, fatia, escala):
+        """Fade das fotos gigantes: invisíveis quando muito grandes, opacas ao
+        atingirem escala_final_gigante. Demais fotos: sempre opacas."""
+        escala_final = self.escala_final_gigante[fatia]
+        opacidade = 1 - (escala - escala_final) / self._faixa_fade[fatia]
+        return np.where(self.eh_gigante[fatia] & (escala > escala_final),
+                        np.clip(opacidade, 0.0, 1.0), 1.0)
+
+    def estado_entrada(self, frame):
+        """Estado de todas as fotos em movimento num frame da ENTRADA (ordem de desenho)"""
+        fatia = slice(self.fotos_concluidas(frame), self.fotos_iniciadas(frame))
+        frame_local = frame - self.frame_inicio[fatia]
+        progresso = self.easing_entrada[self.eh_gigante[fatia].astype(np.intp), frame_local]
+
+        # Posição: da origem (fora da tela) até a posição final
+        x = (self.x_origem[fatia] + (self.x_final[fatia] - self.x_origem[fatia]) * progresso).astype(np.int64)
+        y = (self.y_origem[fatia] + (self.y_final[fatia] - self.y_origem[fatia]) * progresso).astype(np.int64)
+        # Rotação: do ângulo inicial até 0° | Escala: da escala inicial até 1.0
+        angulo = self.angulo_inicial[fatia] * (1 - progresso)
+        escala = self.escala_inicial[fatia] + (1.0 - self.escala_inicial[fatia]) * progresso
+        # Máscara: foto original até 80% do movimento, depois fade até a versão com máscara
+        mistura = np.where(progresso < 0.80, 0.0, (progresso - 0.80) / 0.20)
+
+        return EstadoFotos(self.indice[fatia], x, y, angulo, escala, mistura,
+                           self._opacidade(fatia, escala), progresso)
+
+    def estado_saida(self, frame):
+        """Estado das fotos saindo num frame da SAÍDA (movimento reverso da entrada).
+        As fotos vêm ordenadas por progresso: mais progresso = desenhada por último (por cima)."""
+        fatia = slice(self.fotos_concluidas(frame), self.fotos_iniciadas(frame))
+        frame_local = frame - self.frame_inicio[fatia]
+        progresso = self.easing_saida[self.eh_gigante[fatia].astype(np.intp), frame_local]
+
+        # Posição reversa: da posição final para a origem
+        x = (self.x_final[fatia] + (self.x_origem[fatia] - self.x_final[fatia]) * progresso).astype(np.int64)
+        y = (self.y_final[fatia] + (self.y_origem[fatia] - self.y_final[fatia]) * progresso).astype(np.int64)
+        # Rotação: de 0° até o ângulo inicial | Escala: de 1.0 até a escala inicial
+        angulo = self.angulo_inicial[fatia] * progresso
+        escala = 1.0 + (self.escala_inicial[fatia] - 1.0) * progresso
+        # Máscara: fade de com máscara para original nos primeiros 20%
+        mistura = 1.0 - np.where(progresso < 0.20, progresso / 0.20, 1.0)
+
+        estado = EstadoFotos(self.indice[fatia], x, y, angulo, escala, mistura,
+                             self._opacidade(fatia, escala), progresso)
+        ordem = np.argsort(progresso, kind='stable')
+        return EstadoFotos(*(campo[ordem] for campo in estado))
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Manifesto da renderização em segmentos (--segmentos N).
+
+O vídeo é dividido em trechos de frames independentes, cada um gravado num
+arquivo próprio (um codificador por segmento: cada arquivo começa num
+quadro-chave e não depende dos outros - GOPs fechados). O manifesto, um JSON
+na pasta dos segmentos, registra quais já estão prontos. Se a execução for
+interrompida, a próxima (com o mesmo plano, fotos, máscara e codificador)
+pula os segmentos prontos e recomeça do primeiro que falta. No fim, os
+segmentos são juntados no vídeo final sem re-codificar
+(codificador_video.concatenar_segmentos).
+
+A assinatura identifica o vídeo: se qualquer coisa que muda os frames mudar,
+o manifesto antigo é descartado e tudo é renderizado de novo.
+"""
+
+import json
+import os
+
+
+# Versão do formato do manifesto
+VERSAO_FORMATO_MANIFESTO = 1
+
+ARQUIVO_MANIFESTO = 'manifesto.json'
+
+
+class ManifestoSegmentos:
+    """
+    Segmentos (inicio, fim, arquivo) de um vídeo e quais já foram concluídos.
+
+    Um segmento só é marcado como concluído depois que o seu arquivo foi
+    fechado e renomeado para o nome final; o manifesto é regravado de forma
+    atômica a cada segmento, então nunca aponta para um arquivo pela metade.
+    """
+
+    def __init__(self, pasta, assinatura, total_frames, frames_por_segmento, passo_frames=1, extensao='.mp4'):
+        """
+        Args:
+            pasta: Pasta dos segmentos (criada se não existir)
+            assinatura: Identifica o vídeo (plano, fotos, máscara, resolução, codificador)
+            total_frames: Frames da linha do tempo completa
+            frames_por_segmento: Frames escritos em cada segmento
+            passo_frames: Renderiza 1 a cada N frames da linha do tempo (modo proxy)
+            extensao: Extensão dos arquivos dos segmentos (a do codificador)
+        """
+        self.pasta = pasta
+        self.assinatura = assinatura
+        self.caminho_arquivo = os.path.join(pasta, ARQUIVO_MANIFESTO)
+        os.makedirs(pasta, exist_ok=True)
+
+        tamanho = max(1, int(frames_por_segmento)) * passo_frames
+        self.passo_frames = passo_frames
+        self.segmentos = [
+            {'indice': i, 'inicio': inicio, 'fim': min(inicio + tamanho, total_frames),
+             'arquivo': f"segmento_{i:04d}{extensao}", 'concluido': False, 'bytes': 0}
+            for i, inicio in enumerate(range(0, total_frames, tamanho))
+        ]
+        self.retomados = self._carregar()
+
+    def _carregar(self):
+        """Reaproveita os segmentos concluídos de uma execução anterior do MESMO vídeo.
+        Retorna quantos foram reaproveitados."""
+        if not os.path.exists(self.caminho_arquivo):
+            return 0
+        try:
+            with open(self.caminho_arquivo, 'r', encoding='utf-8') as arquivo:
+                dados = json.load(arquivo)
+        except (OSError, ValueError):
+            return 0  # Manifesto corrompido: começa do zero (será regravado)
+        if dados.get('versao') != VERSAO_FORMATO_MANIFESTO or dados.get('assinatura') != self.assinatura:
+            return 0
+        anteriores = {(s['inicio'], s['fim'], s['arquivo']): s for s in dados.get('segmentos', [])}
+        retomados = 0
+        for segmento in self.segmentos:
+            anterior = anteriores.get((segmento['inicio'], segmento['fim'], segmento['arquivo']))
+            # Só vale se o arquivo ainda estiver lá, inteiro
+            if anterior is not None and anterior.get('concluido') and \
+                    self._tamanho(segmento['arquivo']) == anterior.get('bytes'):
+                segmento.update(concluido=True, bytes=anterior['bytes'])
+                retomados += 1
+        return retomados
+
+    def _tamanho(self, arquivo):
+        try:
+            return os.path.getsize(os.path.join(self.pasta, arquivo))
+        except OSError:
+            return None
+
+    def caminho(self, segmento):
+        return os.path.join(self.pasta, segmento['arquivo'])
+
+    def pendentes(self):
+        """Segmentos que ainda precisam ser renderizados, em ordem"""
+        return [segmento for segmento in self.segmentos if not segmento['concluido']]
+
+    def marcar_concluido(self, indice):
+        """Registra o segmento como pronto (o arquivo final já deve existir) e grava o manifesto"""
+        segmento = self.segmentos[indice]
+        segmento.update(concluido=True, bytes=self._tamanho(segmento['arquivo']))
+        self.salvar()
+
+    def completo(self):
+        return all(segmento['concluido'] for segmento in self.segmentos)
+
+    def arquivos(self):
+        """Caminhos de todos os segmentos, na ordem do vídeo"""
+        return [self.caminho(segmento) for segmento in self.segmentos]
+
+    def salvar(self):
+        """Grava o manifesto (escrita atômica: arquivo temporário + rename)"""
+        temporario = self.caminho_arquivo + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump({
+                'versao': VERSAO_FORMATO_MANIFESTO,
+                'assinatura': self.assinatura,
+                'passo_frames': self.passo_frames,
+                'segmentos': self.segmentos,
+            }, arquivo, indent=1)
+        os.replace(temporario, self.caminho_arquivo)
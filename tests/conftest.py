@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Dados comuns aos testes: a raiz do projeto no sys.path e uma cena pequena
+(fotos sintéticas num vídeo de 336x112, células de 28 px) já preparada pelas
+FASES 1 e 2, pronta para ser renderizada.
+"""
+
+import os
+import random
+import sys
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import criar_video_album as album  # noqa: E402
+
+LARGURA_VIDEO, ALTURA_VIDEO = 336, 112
+CELULA = 28
+NUM_FOTOS = 12
+
+
+def gravar_fotos_sinteticas(pasta, quantidade, semente=0):
+    """Grava `quantidade` JPEGs com manchas de cor (tamanhos variados) e retorna os caminhos"""
+    gerador = np.random.default_rng(semente)
+    caminhos = []
+    for i in range(quantidade):
+        altura, largura = int(gerador.integers(60, 140)), int(gerador.integers(60, 140))
+        manchas = gerador.integers(0, 256, size=(4, 4, 3), dtype=np.uint8)
+        foto = cv2.resize(manchas, (largura, altura), interpolation=cv2.INTER_CUBIC)
+        caminho = os.path.join(pasta, f"foto_{i:02d}.jpg")
+        cv2.imwrite(caminho, foto)
+        caminhos.append(caminho)
+    return caminhos
+
+
+@pytest.fixture(scope='session')
+def cena(tmp_path_factory):
+    """Plano e células de um vídeo pequeno (animação encurtada, sem caches em disco)"""
+    pasta = tmp_path_factory.mktemp('fotos')
+    gravar_fotos_sinteticas(str(pasta), NUM_FOTOS)
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(album, 'ARQUIVO_CACHE_ROSTOS', None)
+        patch.setattr(album, 'PASTA_ATLAS', None)
+        patch.setattr(album, 'ARQUIVO_MANIFESTO_FOTOS', None)
+        patch.setattr(album, 'DURACAO_POR_ONDA', 0.5)
+        patch.setattr(album, 'DELAY_ENTRE_ONDAS', 0.2)
+        patch.setattr(album, 'DURACAO_PAUSA_MEIO', 0.1)
+        patch.setattr(album, 'NUM_FOTOS_GIGANTES', 3)
+        random.seed(42)
+        fotos_por_linha, fotos_por_coluna = LARGURA_VIDEO // CELULA, ALTURA_VIDEO // CELULA
+        acervo = album.AcervoFotos(str(pasta))
+        lista_imagens = album.ajustar_lista_ao_grid(list(acervo.imagens), fotos_por_linha * fotos_por_coluna)
+        posicoes = album.calcular_posicoes_grid(fotos_por_linha, fotos_por_coluna, CELULA, CELULA)
+        mascara = album.carregar_mascara(os.path.join(RAIZ, 'fundoalto.png'), LARGURA_VIDEO, ALTURA_VIDEO)
+        fotos_originais, fotos_com_mascara, _ = album.preparar_celulas(
+            acervo, lista_imagens, CELULA, CELULA, posicoes, mascara)
+        frame_final = album.montar_frame_final(fotos_com_mascara, posicoes, LARGURA_VIDEO, ALTURA_VIDEO)
+        plano = album.planejar_animacao(posicoes, CELULA, CELULA, LARGURA_VIDEO, ALTURA_VIDEO)
+        yield SimpleNamespace(plano=plano, fotos_originais=fotos_originais,
+                              fotos_com_mascara=fotos_com_mascara, frame_final=frame_final)
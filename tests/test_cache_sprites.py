@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Testes do cache LRU de sprites (cache_sprites.py)"""
+
+import cache_sprites
+from cache_sprites import CacheSprites
+
+MB = 1024 * 1024
+
+
+def test_descarta_o_usado_ha_mais_tempo():
+    cache = CacheSprites(1)
+    cache.guardar('a', 'sprite a', MB // 4)
+    cache.guardar('b', 'sprite b', MB // 4)
+    cache.guardar('c', 'sprite c', MB // 4)
+    assert cache.obter('a') == 'sprite a'  # 'a' passa a ser o mais recente
+    cache.guardar('d', 'sprite d', MB // 4)
+    cache.guardar('e', 'sprite e', MB // 4)
+
+    assert cache.obter('b') is None
+    assert [cache.obter(chave) for chave in 'acde'] == ['sprite a', 'sprite c', 'sprite d', 'sprite e']
+    assert cache.bytes_usados == MB
+    assert cache.descartes == 1
+    assert cache.estatisticas()['itens'] == 4
+
+
+def test_guardar_de_novo_nao_conta_o_tamanho_duas_vezes():
+    cache = CacheSprites(1)
+    cache.guardar('a', 'velho', 1000)
+    cache.guardar('a', 'novo', 3000)
+    assert cache.obter('a') == 'novo'
+    assert cache.bytes_usados == 3000
+    assert len(cache) == 1
+
+
+def test_cabe_ate_um_quarto_do_orcamento():
+    cache = CacheSprites(1)
+    assert cache.cabe(MB // 4)
+    assert not cache.cabe(MB // 4 + 1)
+    cache.guardar('grande', 'sprite', MB // 4 + 1)
+    assert len(cache) == 0 and cache.bytes_usados == 0
+
+
+def test_admite_so_na_segunda_vez():
+    cache = CacheSprites(1)
+    assert not cache.admitir('a')
+    assert not cache.admitir('b')
+    assert cache.admitir('a')
+    assert not cache.admitir('a')  # Admitida: volta a contar do zero
+    assert cache.admitir('b')
+
+
+def test_pedidos_lembrados_sao_limitados(monkeypatch):
+    monkeypatch.setattr(cache_sprites, 'MAXIMO_PEDIDOS', 2)
+    cache = CacheSprites(1)
+    for chave in 'abc':
+        assert not cache.admitir(chave)
+    assert not cache.admitir('a')  # Esquecida quando 'c' entrou
+    assert cache.admitir('c')
+
+
+def test_estatisticas_e_taxa_de_acertos():
+    cache = CacheSprites(2)
+    assert cache.taxa_acertos == 0.0
+    cache.guardar('a', 'sprite', 100)
+    cache.obter('a')
+    cache.obter('x')
+    cache.obter('a')
+    estatisticas = cache.estatisticas()
+    assert (estatisticas['acertos'], estatisticas['falhas']) == (2, 1)
+    assert estatisticas['taxa_acertos'] == 2 / 3
+    assert estatisticas['mb_limite'] == 2
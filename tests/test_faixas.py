@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Testes da divisão do orçamento de memória da renderização em faixas
+(criar_video_album.planejar_faixas). Os frames desenhados em faixas são
+testados em test_renderizacao.py"""
+
+import pytest
+
+import criar_video_album as album
+
+MB = 1024 * 1024
+
+
+def test_frame_pequeno_cabe_com_folga():
+    memoria = album.planejar_faixas(336, 112, workers=1, altura_faixa=16, memoria_mb=64)
+    assert memoria['altura_faixa'] == 16
+    assert memoria['frames_na_fila'] == album.FRAMES_NA_FILA_ESCRITA
+    assert memoria['frames_por_trecho'] == album.FRAMES_POR_TRECHO
+    assert memoria['cabe']
+
+
+def test_faixa_nao_passa_da_altura_do_video():
+    assert album.planejar_faixas(336, 112, workers=2, altura_faixa=500, memoria_mb=64)['altura_faixa'] == 112
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+@pytest.mark.parametrize('memoria_mb', [32, 128, 256, 1024])
+def test_faixas_e_filas_encolhem_ate_caber(workers, memoria_mb):
+    largura, altura = 6384, 1344
+    memoria = album.planejar_faixas(largura, altura, workers, altura_faixa=256, memoria_mb=memoria_mb)
+    bytes_linha = largura * album.BYTES_RASCUNHO_POR_PIXEL * workers
+    # Os rascunhos das faixas ficam com no máximo metade do orçamento
+    assert 1 <= memoria['altura_faixa'] <= 256
+    assert memoria['altura_faixa'] * bytes_linha <= memoria_mb * MB // 2
+    assert 0 <= memoria['frames_na_fila'] <= album.FRAMES_NA_FILA_ESCRITA
+    assert 1 <= memoria['frames_por_trecho'] <= album.FRAMES_POR_TRECHO
+    assert memoria['cabe'] == (memoria['mb_estimados'] <= memoria_mb)
+
+
+def test_orcamento_pequeno_demais_e_avisado():
+    memoria = album.planejar_faixas(7680, 4320, workers=8, altura_faixa=256, memoria_mb=16)
+    assert (memoria['frames_na_fila'], memoria['frames_por_trecho']) == (0, 1)
+    assert not memoria['cabe']
+
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Testes do manifesto da pasta de fotos (manifesto_fotos.py)"""
+
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from manifesto_fotos import (ManifestoFotos, identificar_formato, identificar_formato_nao_suportado,
+                             listar_fotos, resumir_ignorados)
+
+CABECALHO_HEIC = b'\x00\x00\x00\x18ftypheic\x00\x00\x00\x00mif1heic'
+
+
+def codificar(extensao, cor=0):
+    imagem = np.full((8, 8, 3), cor, dtype=np.uint8)
+    return cv2.imencode(extensao, imagem)[1].tobytes()
+
+
+@pytest.mark.parametrize('extensao, formato', [('.jpg', 'jpeg'), ('.png', 'png'), ('.bmp', 'bmp'), ('.webp', 'webp')])
+def test_identifica_o_formato_pelo_conteudo(extensao, formato):
+    assert identificar_formato(codificar(extensao)[:32]) == formato
+
+
+def test_rejeita_o_que_nao_e_imagem_aceita():
+    assert identificar_formato(b'BM - texto que comeca como bitmap') is None
+    assert identificar_formato(b'') is None
+    assert identificar_formato(CABECALHO_HEIC) is None
+    assert identificar_formato_nao_suportado(CABECALHO_HEIC) == 'HEIC'
+    assert identificar_formato_nao_suportado(codificar('.jpg')[:32]) is None
+
+
+@pytest.fixture
+def pasta(tmp_path):
+    pasta = tmp_path / 'fotos'
+    pasta.mkdir()
+    (pasta / 'a.jpg').write_bytes(codificar('.jpg', 10))
+    (pasta / 'b.png').write_bytes(codificar('.png', 20))
+    (pasta / 'sem_extensao').write_bytes(codificar('.jpg', 30))  # Reconhecida pelo conteúdo
+    (pasta / 'Edy').write_bytes(CABECALHO_HEIC)
+    (pasta / 'leia-me.txt').write_text('não é foto', encoding='utf-8')
+    (pasta / 'subpasta').mkdir()
+    return pasta
+
+
+def atualizar(pasta, caminho_arquivo):
+    manifesto = ManifestoFotos(str(pasta), str(caminho_arquivo)).atualizar()
+    manifesto.salvar()
+    return manifesto
+
+
+def nomes(caminhos):
+    return [os.path.basename(caminho) for caminho in caminhos]
+
+
+def test_primeira_execucao_le_tudo(pasta, tmp_path):
+    manifesto = atualizar(pasta, tmp_path / 'fotos.json')
+    assert nomes(manifesto.caminhos) == ['a.jpg', 'b.png', 'sem_extensao']
+    assert manifesto.novas == manifesto.caminhos
+    assert nomes(manifesto.ignorados) == ['Edy', 'leia-me.txt']
+    assert manifesto.caminhos == listar_fotos(str(pasta))
+    assert manifesto.estatisticas()['arquivos_lidos'] == 5
+
+
+def test_sem_mudancas_nao_le_nenhum_arquivo(pasta, tmp_path):
+    atualizar(pasta, tmp_path / 'fotos.json')
+    manifesto = atualizar(pasta, tmp_path / 'fotos.json')
+    assert (manifesto.novas, manifesto.alteradas, manifesto.removidas) == ([], [], [])
+    assert manifesto.arquivos_lidos == 0
+    assert nomes(manifesto.ignorados) == ['Edy', 'leia-me.txt']
+
+
+def test_fotos_novas_alteradas_e_removidas(pasta, tmp_path):
+    anterior = atualizar(pasta, tmp_path / 'fotos.json')
+    (pasta / 'a.jpg').write_bytes(codificar('.jpg', 200) + b'\0')
+    (pasta / 'b.png').unlink()
+    (pasta / 'c.webp').write_bytes(codificar('.webp', 40))
+    info = os.stat(pasta / 'sem_extensao')
+    os.utime(pasta / 'sem_extensao', ns=(info.st_atime_ns, info.st_mtime_ns + 10 ** 9))  # Só "tocada"
+
+    manifesto = atualizar(pasta, tmp_path / 'fotos.json')
+    assert nomes(manifesto.novas) == ['c.webp']
+    assert nomes(manifesto.alteradas) == ['a.jpg']
+    assert nomes(manifesto.removidas) == ['b.png']
+    assert nomes(manifesto.caminhos) == ['a.jpg', 'c.webp', 'sem_extensao']
+    assert manifesto.arquivos_lidos == 3
+    # A foto só "tocada" mantém o hash; a alterada ganha outro
+    hashes_antes = {os.path.basename(c): h for (c, _, _), h in anterior.hashes().items()}
+    hashes_depois = {os.path.basename(c): h for (c, _, _), h in manifesto.hashes().items()}
+    assert hashes_depois['sem_extensao'] == hashes_antes['sem_extensao']
+    assert hashes_depois['a.jpg'] != hashes_antes['a.jpg']
+
+
+def test_outras_pastas_no_mesmo_arquivo_sao_preservadas(pasta, tmp_path):
+    outra = tmp_path / 'outra'
+    outra.mkdir()
+    (outra / 'x.jpg').write_bytes(codificar('.jpg'))
+    atualizar(pasta, tmp_path / 'fotos.json')
+    atualizar(outra, tmp_path / 'fotos.json')
+    assert atualizar(pasta, tmp_path / 'fotos.json').arquivos_lidos == 0
+    assert atualizar(outra, tmp_path / 'fotos.json').arquivos_lidos == 0
+
+
+def test_sem_arquivo_tudo_conta_como_novo(pasta):
+    manifesto = ManifestoFotos(str(pasta)).atualizar()
+    manifesto.salvar()
+    assert manifesto.novas == manifesto.caminhos
+    assert ManifestoFotos(str(pasta)).atualizar().novas == manifesto.caminhos
+
+
+def test_resumo_dos_ignorados_nomeia_o_heic(pasta):
+    ignorados = []
+    listar_fotos(str(pasta), ignorados)
+    assert resumir_ignorados(ignorados) == 'Edy (HEIC - converta para JPEG), leia-me.txt'
+    muitos = [str(pasta / 'leia-me.txt')] * 7
+    assert resumir_ignorados(muitos).endswith(', e mais 2')
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Testes do plano da animação (plano_animacao.py)"""
+
+import numpy as np
+import pytest
+
+from plano_animacao import CAMPOS_ESCALARES, CAMPOS_FOTOS, PlanoAnimacao
+
+
+def copiar_plano(plano, **mudancas):
+    campos = {campo: getattr(plano, campo) for campo in CAMPOS_FOTOS + CAMPOS_ESCALARES}
+    campos.update(imagens=plano.imagens, semente=plano.semente)
+    campos.update(mudancas)
+    return PlanoAnimacao(**campos)
+
+
+def test_salvar_e_carregar_preservam_o_plano(cena, tmp_path):
+    imagens = [f"MOSAIC/foto_{i % 5}.jpg" for i in range(cena.plano.num_fotos)]
+    plano = copiar_plano(cena.plano, imagens=imagens, semente=42)
+    caminho = tmp_path / 'plano.npz'
+    plano.salvar(caminho)
+    carregado = PlanoAnimacao.carregar(caminho)
+
+    assert carregado.assinatura() == plano.assinatura()
+    assert carregado.imagens == imagens
+    assert carregado.semente == 42
+    for frame in (0, plano.frames_animacao // 2, plano.frames_animacao - 1):
+        for esperado, obtido in zip(plano.estado_entrada(frame), carregado.estado_entrada(frame)):
+            assert np.array_equal(esperado, obtido)
+
+
+def test_plano_sem_imagens_nem_semente(cena, tmp_path):
+    plano = copiar_plano(cena.plano, imagens=None, semente=None)
+    plano.salvar(tmp_path / 'plano.npz')
+    carregado = PlanoAnimacao.carregar(tmp_path / 'plano.npz')
+    assert carregado.imagens is None
+    assert carregado.semente is None
+
+
+def test_versao_desconhecida_e_recusada(cena, tmp_path):
+    caminho = tmp_path / 'plano.npz'
+    cena.plano.salvar(caminho)
+    with np.load(caminho) as dados:
+        arrays = dict(dados)
+    arrays['versao'] = np.int64(99)
+    np.savez_compressed(caminho, **arrays)
+    with pytest.raises(ValueError, match='versão 99'):
+        PlanoAnimacao.carregar(caminho)
+
+
+def test_redimensionado_reescala_so_as_posicoes(cena):
+    plano = cena.plano
+    metade = plano.redimensionado(plano.largura_foto // 2, plano.altura_foto // 2,
+                                  plano.largura_video // 2, plano.altura_video // 2)
+
+    assert (metade.largura_foto, metade.largura_video) == (plano.largura_foto // 2, plano.largura_video // 2)
+    for campo in ('x_origem', 'y_origem', 'x_final', 'y_final'):
+        assert np.array_equal(getattr(metade, campo), np.round(getattr(plano, campo) / 2))
+    for campo in ('indice', 'direcao', 'angulo_inicial', 'escala_inicial', 'tipo', 'onda'):
+        assert np.array_equal(getattr(metade, campo), getattr(plano, campo))
+    assert metade.frames_animacao == plano.frames_animacao
+    assert metade.num_ondas == plano.num_ondas
+
+
+def test_redimensionado_no_mesmo_tamanho_e_o_mesmo_plano(cena):
+    plano = cena.plano
+    igual = plano.redimensionado(plano.largura_foto, plano.altura_foto, plano.largura_video, plano.altura_video)
+    assert igual.assinatura() == plano.assinatura()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Testes da renderização (criar_video_album.RenderizadorAlbum) sobre a cena
+pequena do conftest: os atalhos de desempenho não podem mudar os frames."""
+
+import numpy as np
+import pytest
+
+import criar_video_album as album
+
+
+def montar_renderizador(cena, workers=1, faixas=None):
+    renderizador, _ = album.configurar_renderizador(cena.plano, cena.fotos_originais, cena.fotos_com_mascara,
+                                                    cena.frame_final, workers, faixas)
+    return renderizador
+
+
+class VideoNaMemoria:
+    """Codificador falso: guarda uma cópia de cada frame escrito"""
+
+    caminho = None
+    descricao = "memória (testes)"
+
+    def __init__(self):
+        self.frames = []
+
+    def escrever(self, frame):
+        self.frames.append(frame.copy())
+
+    def fechar(self):
+        pass
+
+
+def renderizar_todos(renderizador):
+    """Todos os frames, em ordem, cada um num array novo"""
+    return [renderizador.renderizar(i) for i in range(renderizador.total_frames)]
+
+
+def test_frames_nao_dependem_do_que_esta_no_cache(cena, monkeypatch):
+    monkeypatch.setattr(album, 'MEMORIA_CACHE_SPRITES_MB', 64)
+    renderizador = montar_renderizador(cena)
+    em_ordem = renderizar_todos(renderizador)
+    assert renderizador.estatisticas_cache()['acertos'] > 0
+
+    # Cada frame de novo num renderizador com o cache vazio (sprites desenhados direto)
+    for indice in range(0, len(em_ordem), 7):
+        assert np.array_equal(montar_renderizador(cena).renderizar(indice), em_ordem[indice]), indice
+
+
+def test_processos_em_paralelo_geram_os_mesmos_frames(cena):
+    sequencial = renderizar_todos(montar_renderizador(cena))
+    video = VideoNaMemoria()
+    album.escrever_frames(montar_renderizador(cena, workers=2), video, workers=2, frames_por_trecho=5)
+    assert len(video.frames) == len(sequencial)
+    assert all(np.array_equal(a, b) for a, b in zip(video.frames, sequencial))
+
+
+@pytest.mark.parametrize('frames_na_fila', [0, 2])
+def test_restauracao_delta_nos_buffers_reusados(cena, frames_na_fila):
+    referencia = renderizar_todos(montar_renderizador(cena))
+    renderizador = montar_renderizador(cena)
+    video = VideoNaMemoria()
+    album.escrever_frames(renderizador, video, frames_na_fila=frames_na_fila)
+    assert all(np.array_equal(a, b) for a, b in zip(video.frames, referencia))
+    # O atalho foi usado: parte dos frames repintou menos que o frame inteiro
+    area_frame = renderizador.largura_video * renderizador.altura_video
+    assert min(renderizador.areas_repintadas) < area_frame
+
+
+@pytest.mark.parametrize('altura_faixa', [16, 50])
+def test_frames_em_faixas_ficam_a_1_nivel_do_frame_inteiro(cena, altura_faixa):
+    """A warpAffine arredonda de outro jeito quando a origem da saída muda:
+    fora isso, os frames em faixas são os do frame inteiro (ver --faixas)"""
+    inteiro = renderizar_todos(montar_renderizador(cena))
+    renderizador = montar_renderizador(cena, faixas={'altura': altura_faixa, 'memoria_mb': 64})
+    assert renderizador.altura_faixa == altura_faixa
+    em_faixas = renderizar_todos(renderizador)
+
+    diferencas = [np.abs(a.astype(np.int16) - b) for a, b in zip(inteiro, em_faixas)]
+    assert max(int(diferenca.max()) for diferenca in diferencas) <= 1
+    bytes_diferentes = sum(int(np.count_nonzero(diferenca)) for diferenca in diferencas)
+    assert bytes_diferentes <= sum(frame.size for frame in inteiro) // 10000
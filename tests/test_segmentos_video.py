@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Testes da renderização em segmentos: manifesto (segmentos_video.py) e
+junção sem re-codificação dos segmentos Y4M (codificador_video.py)"""
+
+import numpy as np
+
+from codificador_video import CodificadorY4M, concatenar_segmentos
+from segmentos_video import ManifestoSegmentos
+
+
+def gravar_segmentos_prontos(manifesto, indices):
+    for indice in indices:
+        with open(manifesto.caminho(manifesto.segmentos[indice]), 'wb') as arquivo:
+            arquivo.write(b'x' * (100 + indice))
+        manifesto.marcar_concluido(indice)
+
+
+def test_divide_a_linha_do_tempo_em_segmentos(tmp_path):
+    manifesto = ManifestoSegmentos(tmp_path, 'a', total_frames=50, frames_por_segmento=20)
+    assert [(s['inicio'], s['fim']) for s in manifesto.segmentos] == [(0, 20), (20, 40), (40, 50)]
+    # Modo proxy: 10 frames escritos por segmento = 20 frames da linha do tempo
+    proxy = ManifestoSegmentos(tmp_path / 'proxy', 'a', total_frames=50, frames_por_segmento=10, passo_frames=2)
+    assert [(s['inicio'], s['fim']) for s in proxy.segmentos] == [(0, 20), (20, 40), (40, 50)]
+
+
+def test_retoma_os_segmentos_concluidos(tmp_path):
+    manifesto = ManifestoSegmentos(tmp_path, 'a', total_frames=50, frames_por_segmento=20)
+    gravar_segmentos_prontos(manifesto, [0, 1])
+
+    retomado = ManifestoSegmentos(tmp_path, 'a', total_frames=50, frames_por_segmento=20)
+    assert retomado.retomados == 2
+    assert [s['indice'] for s in retomado.pendentes()] == [2]
+    assert not retomado.completo()
+    gravar_segmentos_prontos(retomado, [2])
+    assert retomado.completo()
+    assert retomado.arquivos() == [str(tmp_path / f"segmento_{i:04d}.mp4") for i in range(3)]
+
+
+def test_outro_video_descarta_os_segmentos(tmp_path):
+    manifesto = ManifestoSegmentos(tmp_path, 'a', total_frames=50, frames_por_segmento=20)
+    gravar_segmentos_prontos(manifesto, [0, 1, 2])
+    assert ManifestoSegmentos(tmp_path, 'b', total_frames=50, frames_por_segmento=20).retomados == 0
+    # Outra divisão: nenhum segmento coincide
+    assert ManifestoSegmentos(tmp_path, 'a', total_frames=50, frames_por_segmento=25).retomados == 0
+
+
+def test_segmento_alterado_ou_apagado_e_refeito(tmp_path):
+    manifesto = ManifestoSegmentos(tmp_path, 'a', total_frames=50, frames_por_segmento=20)
+    gravar_segmentos_prontos(manifesto, [0, 1, 2])
+    with open(manifesto.caminho(manifesto.segmentos[0]), 'ab') as arquivo:
+        arquivo.write(b'lixo')  # Tamanho diferente do registrado
+    (tmp_path / 'segmento_0002.mp4').unlink()
+
+    retomado = ManifestoSegmentos(tmp_path, 'a', total_frames=50, frames_por_segmento=20)
+    assert retomado.retomados == 1
+    assert [s['indice'] for s in retomado.pendentes()] == [0, 2]
+
+
+def test_manifesto_corrompido_recomeca(tmp_path):
+    manifesto = ManifestoSegmentos(tmp_path, 'a', total_frames=50, frames_por_segmento=20)
+    gravar_segmentos_prontos(manifesto, [0])
+    (tmp_path / 'manifesto.json').write_text('{"versao": 1, "segm', encoding='utf-8')
+    assert ManifestoSegmentos(tmp_path, 'a', total_frames=50, frames_por_segmento=20).retomados == 0
+
+
+def gravar_y4m(caminho, frames):
+    video = CodificadorY4M(caminho, 16, 8, 30)
+    for frame in frames:
+        video.escrever(frame)
+    video.fechar()
+
+
+def test_concatenar_y4m_e_igual_ao_video_inteiro(tmp_path):
+    gerador = np.random.default_rng(0)
+    frames = [gerador.integers(0, 256, size=(8, 16, 3), dtype=np.uint8) for _ in range(5)]
+    gravar_y4m(tmp_path / 'inteiro.y4m', frames)
+    gravar_y4m(tmp_path / 'segmento_0000.y4m', frames[:3])
+    gravar_y4m(tmp_path / 'segmento_0001.y4m', frames[3:])
+
+    sem_recodificar = concatenar_segmentos([str(tmp_path / 'segmento_0000.y4m'),
+                                            str(tmp_path / 'segmento_0001.y4m')], str(tmp_path / 'junto.y4m'))
+    assert sem_recodificar
+    assert (tmp_path / 'junto.y4m').read_bytes() == (tmp_path / 'inteiro.y4m').read_bytes()